@@ -10,21 +10,73 @@ Usage:
 """
 
 import os
+import sys
+import csv
 import json
+import atexit
+import argparse
 import re
+import codecs
+import heapq
+import html
+import itertools
+import math
+import ctypes
+import ctypes.util
+import select
+import shutil
+import socket
+import socketserver
+import struct
+import subprocess
+import hashlib
+import http.client
+import http.server
+import tempfile
+import gzip
+import lzma
+import time
 import uuid
+import urllib.parse
+import zlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, timedelta
-from pathlib import Path
+from pathlib import Path, PureWindowsPath
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None  # POSIX
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Optional: fleet report falls back to pure Python
 
 # ============================================
 # CONFIGURATION
 # ============================================
 
+_store_state = {"root": None}  # set by use_store_dir()
+
 def get_analytics_dir():
-    """Get analytics directory path (~/.vibecoding)"""
+    """Get analytics directory path (~/.vibecoding, or the root set by use_store_dir)"""
+    if _store_state["root"] is not None:
+        return _store_state["root"]
     home = Path.home()
     return home / ".vibecoding"
 
+def use_store_dir(path):
+    """Point every analytics path of this process at another store (the team collector's)."""
+    _store_state["root"] = Path(path).expanduser().resolve() if path else None
+
 def get_analytics_path():
     """Get analytics JSON file path"""
     return get_analytics_dir() / "analytics.json"
@@ -34,524 +86,5434 @@ def get_analytics_path():
 # ============================================
 
 # Error log file
+ERROR_LOG_MAX_BYTES = 1024 * 1024  # rotate when errors.log would exceed this
+ERROR_LOG_BACKUPS = 3  # errors.log.1 ... errors.log.3
+ERROR_LOG_BUFFER_LIMIT = 1000  # distinct messages held before an early flush
+
+# Buffered entries keyed by (message, error text), in first-seen order
+_log_entries = {}
+_log_state = {"atexit_registered": False}
+_log_lock = threading.Lock()
+
 def get_error_log_path():
     """Get error log file path."""
     return get_analytics_dir() / "errors.log"
 
 def log_error(message, error=None):
-    """Log error to file for debugging."""
+    """
+    Log error for debugging.
+    
+    Entries are buffered in memory and written in one batch by
+    flush_error_log() (registered with atexit). Identical messages
+    within a run are collapsed into one entry with a repeat count.
+    """
+    try:
+        error_text = f"{type(error).__name__}: {error}" if error else None
+        timestamp = datetime.now().isoformat()
+        
+        with _log_lock:
+            entry = _log_entries.get((message, error_text))
+            if entry:
+                entry["count"] += 1
+                entry["last"] = timestamp
+            else:
+                _log_entries[(message, error_text)] = {"first": timestamp, "last": timestamp, "count": 1}
+            
+            if not _log_state["atexit_registered"]:
+                atexit.register(flush_error_log)
+                _log_state["atexit_registered"] = True
+            
+            buffer_full = len(_log_entries) >= ERROR_LOG_BUFFER_LIMIT
+        
+        if buffer_full:
+            flush_error_log()
+    except:
+        pass  # Silently fail - logging should never break the app
+
+def _rotate_error_log(log_path, incoming_bytes):
+    """Shift errors.log -> errors.log.1 -> ... when it would grow past the cap."""
+    try:
+        size = log_path.stat().st_size
+    except FileNotFoundError:
+        return
+    if size + incoming_bytes <= ERROR_LOG_MAX_BYTES:
+        return
+    
+    for i in range(ERROR_LOG_BACKUPS - 1, 0, -1):
+        older = log_path.with_name(f"{log_path.name}.{i}")
+        if older.exists():
+            os.replace(older, log_path.with_name(f"{log_path.name}.{i + 1}"))
+    if ERROR_LOG_BACKUPS > 0:
+        os.replace(log_path, log_path.with_name(f"{log_path.name}.1"))
+    else:
+        log_path.unlink()
+
+def flush_error_log():
+    """Write all buffered error entries to errors.log in a single append."""
+    with _log_lock:
+        if not _log_entries:
+            return
+        entries = list(_log_entries.items())
+        _log_entries.clear()
+    
+    lines = []
+    for (message, error_text), info in entries:
+        lines.append(f"[{info['first']}] {message}\n")
+        if error_text:
+            lines.append(f"  Error: {error_text}\n")
+        if info["count"] > 1:
+            lines.append(f"  (repeated {info['count']} times, last at {info['last']})\n")
+    text = "".join(lines)
+    
     try:
         log_path = get_error_log_path()
         log_path.parent.mkdir(parents=True, exist_ok=True)
-        timestamp = datetime.now().isoformat()
+        _rotate_error_log(log_path, len(text.encode('utf-8')))
         with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(f"[{timestamp}] {message}\n")
-            if error:
-                f.write(f"  Error: {type(error).__name__}: {error}\n")
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
     except:
         pass  # Silently fail - logging should never break the app
 
-def load_analytics():
-    """Load analytics data from JSON file with robust error handling."""
-    path = get_analytics_path()
+def _empty_analytics():
+    """Return an empty analytics structure."""
+    return {"projects": [], "version": "1.0"}
+
+def _compression_for(path):
+    """Detect compression from file name: 'gzip', 'lzma' or None."""
+    name = Path(path).name
+    if name.endswith('.gz'):
+        return "gzip"
+    if name.endswith('.xz'):
+        return "lzma"
+    return None
+
+def _open_data_file(path, mode='r', compression=None, encoding='utf-8', errors='strict'):
+    """Open a JSON data file as text, transparently (de)compressing it."""
+    if compression == "gzip":
+        return gzip.open(path, mode + 't', encoding=encoding, errors=errors)
+    if compression == "lzma":
+        return lzma.open(path, mode + 't', encoding=encoding, errors=errors)
+    return open(path, mode, encoding=encoding, errors=errors)
+
+def _open_binary_file(path, compression=None):
+    """Open a data file for raw (decompressed) byte reads."""
+    if compression == "gzip":
+        return gzip.open(path, 'rb')
+    if compression == "lzma":
+        return lzma.open(path, 'rb')
+    return open(path, 'rb')
+
+# ============================================
+# SPAN TIMINGS
+# ============================================
+#
+# Opt-in phase timing (`--timings`). `with span("copy"):` times a block;
+# spans nest into paths such as "wizard/copy/skills". While timing is off
+# span() hands back one shared no-op context manager, so instrumented
+# code pays a function call and a dict lookup. Spans opened on other
+# threads (serve handlers, indexer) are not recorded.
+
+_timings = {"enabled": False, "stack": [], "spans": []}  # spans: [(path, seconds)]
+_NO_SPAN = nullcontext()
+
+def enable_timings():
+    """Start recording spans (clears earlier ones)."""
+    _timings.update(enabled=True, stack=[], spans=[])
+
+def timings_enabled():
+    return _timings["enabled"]
+
+def span(name):
+    """Context manager timing a block as `name` (nested under the open spans)."""
+    if not _timings["enabled"] or threading.current_thread() is not threading.main_thread():
+        return _NO_SPAN
+    return _timed_span(name)
+
+@contextmanager
+def _timed_span(name):
+    stack = _timings["stack"]
+    stack.append(name)
+    path = "/".join(stack)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timings["spans"].append((path, time.perf_counter() - started))
+        stack.pop()
+
+def timing_summary():
+    """{span path: [total ms, calls]}, parents before children."""
+    totals = {}
+    for path, seconds in _timings["spans"]:
+        total = totals.setdefault(path, [0.0, 0])
+        total[0] += seconds * 1000
+        total[1] += 1
+    # Spans are recorded as they close (children first); list each parent
+    # before its children. Spans whose parent is still open count as roots.
+    ordered = {}
+    def add(path):
+        ordered[path] = [round(totals[path][0], 1), totals[path][1]]
+        for child in totals:
+            if child.rpartition("/")[0] == path and child not in ordered:
+                add(child)
+    for path in totals:
+        if path.rpartition("/")[0] not in totals and path not in ordered:
+            add(path)
+    return ordered
+
+def render_timings(summary=None):
+    """Render timing_summary() as an indented breakdown (lines)."""
+    summary = timing_summary() if summary is None else summary
+    roots = [path for path in summary if path.rpartition("/")[0] not in summary]
+    whole = sum(summary[path][0] for path in roots)
+    base = min((path.count("/") for path in roots), default=0)
+    lines = ["", "  THOI GIAN (ms)"]
+    for path, (ms, calls) in summary.items():
+        depth = path.count("/") - base
+        label = "  " * depth + path.rpartition("/")[2] + (f" x{calls}" if calls > 1 else "")
+        share = f"{ms / whole * 100:4.0f}%" if whole else ""
+        lines.append(f"  {label:<40}{ms:>10.1f}  {share}")
+    if not summary:
+        lines.append("  (khong co span nao)")
+    lines.append("")
+    return lines
+
+# ============================================
+# ENCODING SNIFFING & SALVAGE
+# ============================================
+
+SNIFF_SIZE = 4096  # bytes
+SALVAGE_CHUNK_SIZE = 64 * 1024  # chars per read
+SALVAGE_MAX_RECORD = 256 * 1024  # chars; anything larger is not a project record
+
+_JSON_DECODER = json.JSONDecoder()
+_SALVAGE_TOKEN = re.compile(r'[{}"]')
+_SALVAGE_STRING_REST = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+
+def _sniff_encoding(head):
+    """Guess a file's text encoding from its BOM or first few KB."""
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    # final=False: a multi-byte char cut at the end of head is fine
+    text = codecs.getincrementaldecoder('utf-8')(errors='replace').decode(head, final=False)
+    invalid = text.count('\ufffd')
+    multibyte = sum(1 for c in text if ord(c) > 0x7f) - invalid
+    if invalid == 0 or multibyte > invalid:
+        return 'utf-8'  # Valid UTF-8, or UTF-8 with a few damaged bytes
+    try:
+        head.decode('cp1252')
+        return 'cp1252'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+def _read_salvage_chunk(f):
+    """Read the next chunk; a decompression/IO error just ends the stream."""
+    try:
+        return f.read(SALVAGE_CHUNK_SIZE)
+    except Exception as e:
+        log_error("Salvage read stopped early", e)
+        return ""
+
+def _is_project_record(obj):
+    """True if a decoded object looks like a tracked project record."""
+    return (isinstance(obj, dict) and "projects" not in obj
+            and ("id" in obj or "project_name" in obj))
+
+def iter_salvaged_records(f):
+    """
+    Stream every intact project record out of a damaged analytics file.
+    
+    f: text file object. Scans for balanced {...} candidates (string-aware),
+    decodes each one on its own and resynchronises on the next brace after
+    a bad or truncated candidate. Memory stays bounded by SALVAGE_MAX_RECORD
+    plus one chunk, whatever the file size.
+    """
+    buf = ""
+    pos = 0
+    eof = False
+    
+    while True:
+        # Drop consumed text so the buffer never grows with the file
+        if pos > SALVAGE_CHUNK_SIZE:
+            buf = buf[pos:]
+            pos = 0
+        
+        start = buf.find('{', pos)
+        if start < 0:
+            if eof:
+                return
+            buf, pos = "", 0
+            chunk = _read_salvage_chunk(f)
+            eof = not chunk
+            buf = chunk
+            continue
+        
+        # Fast path: an intact record fully inside the buffer
+        try:
+            obj, end = _JSON_DECODER.raw_decode(buf, start)
+            if _is_project_record(obj):
+                yield obj
+                pos = end
+                continue
+        except ValueError:
+            pass
+        
+        # Slow path: find the matching closing brace, reading more if needed
+        depth = 0
+        i = start
+        end = None
+        while end is None:
+            m = _SALVAGE_TOKEN.search(buf, i)
+            string_end = None
+            if m and m.group() == '"':
+                string_end = _SALVAGE_STRING_REST.match(buf, m.end())
+            
+            if not m or (m.group() == '"' and not string_end):
+                # Candidate continues past the buffer
+                if eof or len(buf) - start > SALVAGE_MAX_RECORD:
+                    break
+                chunk = _read_salvage_chunk(f)
+                eof = not chunk
+                buf += chunk
+                continue
+            
+            if string_end:
+                i = string_end.end()
+            elif m.group() == '{':
+                depth += 1
+                i = m.end()
+            else:
+                depth -= 1
+                i = m.end()
+                if depth == 0:
+                    end = i
+        
+        obj = None
+        if end is not None:
+            try:
+                obj = json.loads(buf[start:end])
+            except ValueError:
+                pass
+        
+        if _is_project_record(obj):
+            yield obj
+            pos = end
+        else:
+            # Truncated, corrupted or not a record: resync inside it
+            pos = start + 1
+
+def salvage_analytics_file(path, encoding='utf-8'):
+    """
+    Recover intact project records from a damaged analytics file.
+    A copy of the damaged file is kept as <name>.corrupted.
+    """
+    path = Path(path)
+    
+    try:
+        shutil.copy(path, path.with_name(path.name + '.corrupted'))
+    except Exception as e:
+        log_error(f"Could not back up corrupted file: {path}", e)
+    
+    records = []
+    seen_ids = set()
+    try:
+        with _open_data_file(path, 'r', _compression_for(path), encoding, errors='replace') as f:
+            for record in iter_salvaged_records(f):
+                record_id = record.get("id")
+                if record_id is not None:
+                    if record_id in seen_ids:
+                        continue
+                    seen_ids.add(record_id)
+                records.append(record)
+    except Exception as e:
+        log_error(f"Salvage aborted: {path}", e)
+    
+    log_error(f"Recovered {len(records)} project records from damaged file: {path}")
+    return {"projects": records, "version": "1.0"}
+
+def _load_analytics_file(path):
+    """
+    Load one analytics-format file ({"projects": [...]}).
+    
+    The encoding is sniffed once from the BOM / first bytes. If the file
+    does not decode or parse, intact records are salvaged instead.
+    I/O errors (permissions, sharing violations, EIO) are raised: the file
+    may be fine, so it must not be treated as damaged.
+    Returns (data, salvaged).
+    """
+    path = Path(path)
+    compression = _compression_for(path)
     
     if not path.exists():
-        return {"projects": [], "version": "1.0"}
+        return _empty_analytics(), False
     
-    # Try multiple encodings
-    encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
+    encoding = 'utf-8'
+    try:
+        with _open_binary_file(path, compression) as f:
+            encoding = _sniff_encoding(f.read(SNIFF_SIZE))
     
-    for encoding in encodings:
-        try:
-            with open(path, 'r', encoding=encoding) as f:
-                content = f.read()
+        with _open_data_file(path, 'r', compression, encoding) as f:
+            data = json.load(f)
                 
-            # Validate JSON structure
-            data = json.loads(content)
+        # Ensure required keys exist
+        if not isinstance(data, dict):
+            log_error(f"Analytics file is not a dict: {type(data)}")
+            return _empty_analytics(), False
             
-            # Ensure required keys exist
-            if not isinstance(data, dict):
-                log_error(f"Analytics file is not a dict: {type(data)}")
-                return {"projects": [], "version": "1.0"}
+        if "projects" not in data:
+            data["projects"] = []
             
-            if "projects" not in data:
-                data["projects"] = []
+        if not isinstance(data["projects"], list):
+            log_error(f"Projects is not a list: {type(data['projects'])}")
+            data["projects"] = []
             
-            if not isinstance(data["projects"], list):
-                log_error(f"Projects is not a list: {type(data['projects'])}")
-                data["projects"] = []
+        return data, False
             
-            return data
+    except (ValueError, EOFError, gzip.BadGzipFile, zlib.error, lzma.LZMAError) as e:
+        # JSONDecodeError / UnicodeDecodeError are ValueErrors; the others
+        # come from truncated or damaged compressed shards
+        log_error(f"Damaged analytics file ({encoding}), salvaging: {path}", e)
+    except OSError as e:
+        log_error(f"Could not read analytics file: {path}", e)
+        raise
             
-        except json.JSONDecodeError as e:
-            log_error(f"JSON decode error with {encoding} encoding", e)
-            continue
-        except UnicodeDecodeError as e:
-            log_error(f"Unicode decode error with {encoding} encoding", e)
-            continue
-        except Exception as e:
-            log_error(f"Unexpected error loading analytics", e)
-            continue
+    return salvage_analytics_file(path, encoding), True
     
-    # All encodings failed - backup corrupted file and start fresh
-    log_error("All encodings failed, backing up corrupted file")
-    try:
-        backup_path = path.with_suffix('.json.corrupted')
-        if path.exists():
-            import shutil
-            shutil.copy(path, backup_path)
-    except:
-        pass
+def _read_analytics_file(path):
+    """Load one analytics-format file, salvaging intact records if damaged."""
+    return _load_analytics_file(path)[0]
+
+WRITE_BUFFER_SIZE = 256 * 1024  # bytes buffered before each write
+
+def _iter_json_chunks(data):
+    """
+    Serialize a document compactly, one piece at a time.
+    Each project record is encoded on its own (C encoder), so the whole
+    document never exists as one big string.
+    """
+    projects = data.get("projects")
+    if not isinstance(projects, list) and not hasattr(projects, "__next__"):
+        yield json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        return
     
-    return {"projects": [], "version": "1.0"}
+    yield '{'
+    for key, value in data.items():
+        if key != "projects":
+            yield json.dumps(key, ensure_ascii=False) + ':'
+            yield json.dumps(value, ensure_ascii=False, separators=(',', ':')) + ','
+    yield '"projects":['
+    for i, record in enumerate(projects):
+        if i:
+            yield ','
+        yield json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+    yield ']}'
 
-def save_analytics(data):
-    """Save analytics data to JSON file with error handling."""
-    path = get_analytics_path()
+def _fsync_dir(directory):
+    """fsync a directory so a rename inside it survives a crash (no-op on Windows)."""
+    if os.name == 'nt':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _file_checksum(path):
+    """SHA-256 of a data file's (decompressed) content."""
+    digest = hashlib.sha256()
+    with _open_binary_file(path, _compression_for(path)) as f:
+        for block in iter(lambda: f.read(WRITE_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_json_file(path, data):
+    """
+    Durably write a JSON document to path (compressed if it ends in .gz/.xz).
+    
+    Streams compact JSON to a temp file while hashing it, fsyncs the file,
+    os.replace()s it over the destination and fsyncs the directory.
+    Returns the SHA-256 of the JSON content, or None on failure.
+    """
+    path = Path(path)
+    compression = _compression_for(path)
+    temp_path = path.with_name(path.name + '.tmp')
     
     try:
         # Validate data before saving
         if not isinstance(data, dict):
             log_error(f"Attempted to save non-dict data: {type(data)}")
-            return False
+            return None
         
         # Create directory if not exists
         path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Write to temp file first, then rename (atomic write)
-        temp_path = path.with_suffix('.json.tmp')
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        digest = hashlib.sha256()
+        with open(temp_path, 'wb') as raw:
+            if compression == "gzip":
+                out = gzip.GzipFile(filename='', mode='wb', fileobj=raw)
+            elif compression == "lzma":
+                out = lzma.LZMAFile(raw, mode='wb')
+            else:
+                out = raw
         
-        # Verify the temp file is valid JSON before replacing
-        with open(temp_path, 'r', encoding='utf-8') as f:
-            json.load(f)  # Will raise if invalid
+            pending, pending_size = [], 0
+            for chunk in _iter_json_chunks(data):
+                block = chunk.encode('utf-8')
+                digest.update(block)
+                pending.append(block)
+                pending_size += len(block)
+                if pending_size >= WRITE_BUFFER_SIZE:
+                    out.write(b''.join(pending))
+                    pending, pending_size = [], 0
+            out.write(b''.join(pending))
         
-        # Replace original with temp
-        if path.exists():
-            path.unlink()
-        temp_path.rename(path)
-        return True
+            if out is not raw:
+                out.close()  # Flushes the compressor, leaves raw open
+            raw.flush()
+            os.fsync(raw.fileno())
+        
+        # Atomic swap: readers see either the old or the new file, never none
+        os.replace(temp_path, path)
+        _fsync_dir(path.parent)
+        return digest.hexdigest()
         
     except Exception as e:
-        log_error("Error saving analytics", e)
+        log_error(f"Error saving {path.name}", e)
         # Clean up temp file if it exists
         try:
             if temp_path.exists():
                 temp_path.unlink()
         except:
             pass
+        return None
+
+# ============================================
+# WRITE LOCKING
+# ============================================
+# Every analytics write happens under one cross-process lock:
+# fcntl.flock on POSIX, msvcrt.locking on Windows, and an
+# O_EXCL lock file everywhere else. All three are polled and give up with
+# TimeoutError after LOCK_TIMEOUT; an O_EXCL file older than that is only
+# broken when the PID written in it is no longer running.
+
+LOCK_TIMEOUT = 30  # seconds
+LOCK_POLL_INTERVAL = 0.01  # seconds
+
+_lock_state = {"depth": 0, "handle": None}
+_thread_lock = threading.RLock()
+
+def get_lock_path():
+    """Get analytics write lock file path."""
+    return get_analytics_dir() / "analytics.lock"
+
+def _lock_holder_alive(marker):
+    """True if the PID written in an O_EXCL lock file is a running process."""
+    try:
+        pid = int(marker.read_text() or 0)
+    except (OSError, ValueError):
         return False
+    if pid <= 0:
+        return False
+    if os.name == 'nt':
+        return True  # os.kill would terminate it; this fallback is not used there anyway
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # Exists but not ours (EPERM), or cannot tell: assume alive
+    return True
 
-def track_project(project_data):
-    """
-    Track a new project creation with validation.
+def _acquire_file_lock(timeout):
+    """Acquire the cross-process lock. Returns a handle for _release_file_lock."""
+    path = get_lock_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    deadline = time.monotonic() + timeout
     
-    project_data: dict with keys:
-        - project_name: str
-        - project_path: str
-        - project_types: list[str]
-        - tech_stack: dict
-        - environment: dict (optional)
+    if fcntl is not None:
+        f = open(path, 'a+')
+        while True:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return ("fcntl", f)
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    f.close()
+                    raise TimeoutError(f"Timed out waiting for {path}")
+                time.sleep(LOCK_POLL_INTERVAL)
     
-    Returns: project ID on success, None on failure
-    """
+    if msvcrt is not None:
+        f = open(path, 'a+')
+        while True:
+            try:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return ("msvcrt", f)
+            except OSError:
+                if time.monotonic() > deadline:
+                    f.close()
+                    raise TimeoutError(f"Timed out waiting for {path}")
+                time.sleep(LOCK_POLL_INTERVAL)
+    
+    # Portable fallback: exclusive creation of a marker file
+    marker = path.with_name(path.name + '.excl')
+    while True:
+        try:
+            fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return ("excl", marker)
+        except FileExistsError:
+            # Break locks left behind by crashed processes (never a live holder)
+            try:
+                if time.time() - marker.stat().st_mtime > timeout and not _lock_holder_alive(marker):
+                    marker.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for {marker}")
+            time.sleep(LOCK_POLL_INTERVAL)
+
+def _release_file_lock(handle):
+    """Release a lock returned by _acquire_file_lock."""
+    kind, obj = handle
     try:
-        analytics = load_analytics()
-        
-        # Validate required fields
-        project_name = str(project_data.get("project_name", "Unknown"))
-        project_path = str(project_data.get("project_path", ""))
-        
-        if not project_name or project_name == "Unknown":
-            log_error("Track project called with invalid project_name")
-        
-        record = {
-            "id": str(uuid.uuid4()),
-            "timestamp": datetime.now().isoformat(),
-            "project_name": project_name,
-            "project_path": project_path,
-            "project_types": list(project_data.get("project_types", [])),
-            "tech_stack": dict(project_data.get("tech_stack", {})),
-            "environment": dict(project_data.get("environment", {}))
-        }
-        
-        analytics["projects"].append(record)
-        
-        if save_analytics(analytics):
-            return record["id"]
+        if kind == "fcntl":
+            fcntl.flock(obj.fileno(), fcntl.LOCK_UN)
+            obj.close()
+        elif kind == "msvcrt":
+            obj.seek(0)
+            msvcrt.locking(obj.fileno(), msvcrt.LK_UNLCK, 1)
+            obj.close()
         else:
-            log_error("Failed to save analytics after tracking project")
-            return None
-            
+            obj.unlink()
     except Exception as e:
-        log_error("Error tracking project", e)
-        return None
+        log_error("Error releasing analytics lock", e)
+
+@contextmanager
+def analytics_lock(timeout=LOCK_TIMEOUT):
+    """
+    Exclusive cross-process lock around analytics writes.
+    Re-entrant within a process, so locked helpers can call each other.
+    """
+    with _thread_lock:
+        if _lock_state["depth"] == 0:
+            _lock_state["handle"] = _acquire_file_lock(timeout)
+        _lock_state["depth"] += 1
+        try:
+            yield
+        finally:
+            _lock_state["depth"] -= 1
+            if _lock_state["depth"] == 0:
+                handle, _lock_state["handle"] = _lock_state["handle"], None
+                _release_file_lock(handle)
 
 # ============================================
-# PROGRESS TRACKER
+# SHARDED STORAGE
 # ============================================
+# Records live in one file per month (shards/2025-01.json[.gz|.xz]).
+# shards/index.json keeps count + min/max timestamp per shard so that
+# date-bounded queries only open the shards they actually need.
 
-def validate_context_content(content):
-    """
-    Validate CONTEXT.md content structure.
-    Returns (is_valid, issues_list)
-    """
-    issues = []
+SHARD_COMPRESSION_SUFFIXES = {"gzip": ".gz", "lzma": ".xz"}
+UNDATED_SHARD = "undated"
+SHARD_FILE_PATTERN = re.compile(r"^(\d{4}-\d{2}|undated)\.json(\.gz|\.xz)?$")
+
+def get_shards_dir():
+    """Get directory holding the monthly analytics shards."""
+    return get_analytics_dir() / "shards"
+
+def get_shard_index_path():
+    """Get shard index file path."""
+    return get_shards_dir() / "index.json"
+
+def get_shard_key(timestamp):
+    """Map an ISO timestamp to its shard key ('YYYY-MM', or 'undated')."""
+    try:
+        moment = datetime.fromisoformat(str(timestamp))
+        return f"{moment.year:04d}-{moment.month:02d}"
+    except (TypeError, ValueError):
+        return UNDATED_SHARD
+
+def _shard_file_name(key, compression=None):
+    """Build shard file name, e.g. '2025-01.json' or '2025-01.json.gz'."""
+    return f"{key}.json{SHARD_COMPRESSION_SUFFIXES.get(compression, '')}"
+
+def _describe_shard(file_name, records, checksum=None):
+    """Build the index entry for a shard."""
+    timestamps = [str(r.get("timestamp")) for r in records if r.get("timestamp")]
+    return {
+        "file": file_name,
+        "count": len(records),
+        "min_ts": min(timestamps) if timestamps else None,
+        "max_ts": max(timestamps) if timestamps else None,
+        "checksum": checksum,
+        "tombstones": sorted(r["deleted_at"] for r in records if r.get("deleted_at"))
+    }
+
+def _partition_by_shard(projects):
+    """Group records by shard key, keeping their original order."""
+    shards = {}
+    for record in projects:
+        key = get_shard_key(record.get("timestamp"))
+        shards.setdefault(key, []).append(record)
+    return shards
+
+def save_shard_index(index):
+    """Save the shard index."""
+    with analytics_lock():
+        return _write_json_file(get_shard_index_path(), index) is not None
+
+def rebuild_shard_index():
+    """Rebuild the shard index by scanning every shard file."""
+    index = {"version": "1.0", "shards": {}}
+    shards_dir = get_shards_dir()
     
-    # Check if content is too short (likely empty or corrupted)
-    if len(content) < 50:
-        issues.append("File too short (< 50 chars)")
+    if not shards_dir.exists():
+        return index
     
-    # Check for required sections
-    required_sections = ["Project Status", "Completed", "Current Focus"]
-    for section in required_sections:
-        if section.lower() not in content.lower():
-            issues.append(f"Missing section: {section}")
+    for path in sorted(shards_dir.iterdir()):
+        match = SHARD_FILE_PATTERN.match(path.name)
+        if not match:
+            continue
+        records = _read_analytics_file(path)["projects"]
+        index["shards"][match.group(1)] = _describe_shard(path.name, records, _file_checksum(path))
+    
+    save_shard_index(index)
+    return index
+
+def migrate_legacy_analytics():
+    """Split a legacy single-file analytics.json into monthly shards (one-time)."""
+    legacy_path = get_analytics_path()
+    
+    with analytics_lock():
+        # Another process may have migrated while we waited for the lock
+        if not legacy_path.exists():
+            return load_shard_index()
+    
+        data = _read_analytics_file(legacy_path)
+        
+        index = {"version": "1.0", "shards": {}}
+        for key, records in _partition_by_shard(data["projects"]).items():
+            save_shard(key, records, index)
+        save_shard_index(index)
+        
+        # Keep the original around as a backup
+        try:
+            legacy_path.rename(legacy_path.with_name(legacy_path.name + '.migrated'))
+        except Exception as e:
+            log_error("Could not rename legacy analytics file after migration", e)
+    
+    return index
+
+def load_shard_index():
+    """Load the shard index, migrating or rebuilding it when needed."""
+    path = get_shard_index_path()
+    
+    if not path.exists():
+        if get_analytics_path().exists():
+            return migrate_legacy_analytics()
+        return rebuild_shard_index()
     
-    # Check for binary/garbage content
     try:
-        # Count printable vs non-printable chars
-        printable = sum(1 for c in content if c.isprintable() or c in '\n\r\t')
-        ratio = printable / len(content) if content else 0
-        if ratio < 0.9:
-            issues.append(f"Too many non-printable chars ({ratio:.0%} printable)")
-    except:
-        issues.append("Could not validate content characters")
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if isinstance(index, dict) and isinstance(index.get("shards"), dict):
+            return index
+        log_error("Shard index has invalid structure, rebuilding")
+    except Exception as e:
+        log_error("Error loading shard index, rebuilding", e)
     
-    return (len(issues) == 0, issues)
+    return rebuild_shard_index()
 
-def calculate_progress(context_path):
+def load_shard(key, index=None):
+    """Load the records of a single shard."""
+    if index is None:
+        index = load_shard_index()
+    entry = index["shards"].get(key)
+    if not entry:
+        return []
+    
+    data, salvaged = _load_analytics_file(get_shards_dir() / entry["file"])
+    if salvaged and data["projects"]:
+        # Persist what could be recovered so the next load is clean again.
+        # Nothing recovered: leave the file alone (the .corrupted copy and
+        # the original stay for manual repair).
+        with analytics_lock():
+            fresh = load_shard_index()
+            if fresh["shards"].get(key) == entry:  # Not rewritten meanwhile
+                save_shard(key, data["projects"], fresh)
+            index["shards"][key] = fresh["shards"].get(key, entry)
+    return data["projects"]
+
+def save_shard(key, records, index=None, compression=None):
     """
-    Parse CONTEXT.md to calculate project progress.
+    Write one shard and update its index entry.
     
-    Returns dict with:
-        - progress: int (0-100)
-        - done: int (completed tasks)
-        - total: int (total tasks)
-        - current_phase: str
-        - status: str ('complete', 'in-progress', 'paused', 'error')
-        - error: str (optional, only if status is 'error')
+    compression: 'gzip', 'lzma' or None (None keeps the shard's current format).
+    An empty record list removes the shard.
     """
-    context_path = Path(context_path)
+    with analytics_lock():
+        if index is None:
+            index = load_shard_index()
     
-    # Check file exists
-    if not context_path.exists():
-        return {
-            "progress": 0,
-            "status": "no-context",
-            "current_phase": "No CONTEXT.md",
-            "done": 0,
-            "total": 0
-        }
+        shards_dir = get_shards_dir()
+        entry = index["shards"].get(key)
+        old_file = entry["file"] if entry else None
     
-    # Check file is readable and not too large
-    try:
-        file_size = context_path.stat().st_size
-        if file_size > 1024 * 1024:  # > 1MB is suspicious
-            log_error(f"CONTEXT.md too large: {file_size} bytes at {context_path}")
-            return {
-                "progress": 0,
-                "status": "error",
-                "current_phase": "File too large",
-                "error": f"File size: {file_size} bytes",
-                "done": 0,
-                "total": 0
-            }
-    except Exception as e:
+        if compression is None and old_file:
+            compression = _compression_for(old_file)
+        file_name = _shard_file_name(key, compression)
+    
+        if not records:
+            index["shards"].pop(key, None)
+        else:
+            checksum = _write_json_file(shards_dir / file_name, {"shard": key, "projects": records})
+            if checksum is None:
+                return False
+            index["shards"][key] = _describe_shard(file_name, records, checksum)
+    
+        # Drop the previous file if the format changed (or the shard was emptied)
+        if old_file and (old_file != file_name or not records):
+            try:
+                (shards_dir / old_file).unlink()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                log_error(f"Could not remove old shard file: {old_file}", e)
+    
+        return save_shard_index(index)
+
+def iter_projects(since=None, until=None, include_expired=False):
+    """
+    Yield project records in chronological shard order.
+    
+    since/until: optional datetime bounds (inclusive). Shards whose
+    [min_ts, max_ts] range falls outside the bounds are never opened,
+    and only one shard is held in memory at a time.
+    include_expired: also yield tombstones past their grace period
+    (see compact_analytics).
+    """
+    expire_before = _tombstone_cutoff()
+    index = load_shard_index()
+    since_ts = since.isoformat() if since else None
+    until_ts = until.isoformat() if until else None
+    bounded = since_ts is not None or until_ts is not None
+    
+    for key in sorted(index["shards"]):
+        entry = index["shards"][key]
+        
+        if bounded and not entry.get("min_ts"):
+            continue  # Undated records never match a date range
+        if since_ts and entry["max_ts"] < since_ts:
+            continue
+        if until_ts and entry["min_ts"] > until_ts:
+            continue
+        
+        for record in load_shard(key, index):
+            if not include_expired and record.get("deleted_at") and record["deleted_at"] < expire_before:
+                continue
+            if bounded:
+                ts = str(record.get("timestamp", ""))
+                if (since_ts and ts < since_ts) or (until_ts and ts > until_ts):
+                    continue
+            yield record
+
+def compress_old_shards(older_than_months=3, method="gzip"):
+    """
+    Compress shards older than N months with gzip or lzma.
+    Returns number of shards compressed.
+    """
+    if method not in SHARD_COMPRESSION_SUFFIXES:
+        log_error(f"Unknown shard compression method: {method}")
+        return 0
+    
+    now = datetime.now()
+    months = now.year * 12 + now.month - 1 - older_than_months
+    cutoff_key = f"{months // 12:04d}-{months % 12 + 1:02d}"
+    
+    compressed = 0
+    
+    with analytics_lock():
+        index = load_shard_index()
+        for key in sorted(index["shards"]):
+            entry = index["shards"][key]
+            if key == UNDATED_SHARD or key >= cutoff_key or _compression_for(entry["file"]):
+                continue
+            records = load_shard(key, index)
+            if save_shard(key, records, index, compression=method):
+                compressed += 1
+    
+    return compressed
+
+def verify_shards():
+    """
+    Check every shard against the checksum recorded when it was written.
+    Returns list of shard keys whose content no longer matches.
+    """
+    index = load_shard_index()
+    mismatched = []
+    for key in sorted(index["shards"]):
+        entry = index["shards"][key]
+        if not entry.get("checksum"):
+            continue
+        try:
+            if _file_checksum(get_shards_dir() / entry["file"]) != entry["checksum"]:
+                mismatched.append(key)
+        except Exception as e:
+            log_error(f"Cannot verify shard {key}", e)
+            mismatched.append(key)
+    return mismatched
+
+# ============================================
+# MATERIALIZED SUMMARY
+# ============================================
+#
+# shards/summary.json keeps per-shard counters (total, type and tech
+# counts) tagged with the checksum of the shard they were computed from,
+# plus their merged totals. commit_pending() adds new records to it
+# incrementally; a shard rewritten any other way (save_analytics,
+# compression, repair) no longer matches its checksum and is recounted
+# on the next read.
+
+def get_summary_path():
+    """Get materialized summary file path."""
+    return get_shards_dir() / "summary.json"
+
+SUMMARY_VERSION = "1.1"  # 1.1: tombstones count until they expire
+
+def _empty_summary():
+    return {"version": SUMMARY_VERSION, "shards": {}, "totals": None}
+
+def _summarize_records(records, partial=None):
+    """
+    Add records to a per-shard counter dict (created when None).
+    Tombstoned projects count until they expire, as in iter_projects();
+    "oldest_tombstone" marks when the counters go stale.
+    """
+    if partial is None:
+        partial = {"total": 0, "type_counts": {}, "tech_counts": {}}
+    type_counts = partial["type_counts"]
+    cutoff = _tombstone_cutoff()
+    for r in records:
+        if r.get("deleted_at"):
+            if r["deleted_at"] < cutoff:
+                continue  # Expired: hidden until compaction drops it
+            partial["oldest_tombstone"] = min(r["deleted_at"], partial.get("oldest_tombstone") or r["deleted_at"])
+        partial["total"] += 1
+        for t in r.get("project_types", []):
+            type_counts[t] = type_counts.get(t, 0) + 1
+        _count_stack(r.get("tech_stack") or {}, partial["tech_counts"])
+    return partial
+
+def _merge_summary(summary):
+    """Merge per-shard counters into fleet totals (month_counts keyed by shard)."""
+    totals = {"total": 0, "type_counts": {}, "tech_counts": {}, "month_counts": {}}
+    for key in sorted(summary["shards"]):
+        partial = summary["shards"][key]
+        totals["total"] += partial["total"]
+        totals["month_counts"][key] = partial["total"]
+        for field in ("type_counts", "tech_counts"):
+            counts = totals[field]
+            for name, count in partial[field].items():
+                counts[name] = counts.get(name, 0) + count
+    return totals
+
+def _read_summary():
+    """Read summary.json, or an empty summary if missing or unreadable."""
+    path = get_summary_path()
+    if not path.exists():
+        return _empty_summary()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        if isinstance(summary, dict) and isinstance(summary.get("shards"), dict):
+            return summary if summary.get("version") == SUMMARY_VERSION else _empty_summary()
+        log_error("Summary file has invalid structure, rebuilding")
+    except Exception as e:
+        log_error("Error loading summary file, rebuilding", e)
+    return _empty_summary()
+
+def _partial_is_current(partial, entry, cutoff):
+    """A shard's counters match its checksum and none of their tombstones expired since."""
+    return bool(partial and entry.get("checksum") and partial.get("checksum") == entry["checksum"]
+                and not (partial.get("oldest_tombstone") and partial["oldest_tombstone"] < cutoff))
+
+def _summary_is_current(summary, index):
+    """True when every per-shard counter is current (see _partial_is_current)."""
+    shards = summary["shards"]
+    if set(shards) != set(index["shards"]):
+        return False
+    cutoff = _tombstone_cutoff()
+    return all(_partial_is_current(shards[key], entry, cutoff) for key, entry in index["shards"].items())
+
+def _save_summary(summary):
+    """Recompute the merged totals and write summary.json."""
+    summary["totals"] = _merge_summary(summary)
+    return _write_json_file(get_summary_path(), summary) is not None
+
+def update_summary(key, added, records, previous_checksum, index, summary=None):
+    """
+    Record a shard write in the materialized summary.
+    
+    added: records appended by this write; records: the full shard after it;
+    previous_checksum: the shard's checksum before the write. Counters are
+    bumped by `added` when that previous state was summarized, otherwise the
+    shard is recounted from `records`. Call under analytics_lock() after
+    save_shard(); pass `summary` to batch several shards and save it yourself.
+    """
+    save = summary is None
+    if save:
+        summary = _read_summary()
+    partial = summary["shards"].get(key)
+    checksum = index["shards"].get(key, {}).get("checksum")
+    
+    if not records:
+        summary["shards"].pop(key, None)
+    elif partial and previous_checksum and partial.get("checksum") == previous_checksum:
+        _summarize_records(added, partial)
+        partial["checksum"] = checksum
+    else:
+        partial = _summarize_records(records)
+        partial["checksum"] = checksum
+        summary["shards"][key] = partial
+    
+    return _save_summary(summary) if save else True
+
+def load_summary():
+    """
+    Get materialized fleet totals: total, type_counts, tech_counts, month_counts.
+    
+    Served straight from summary.json when it matches the shard index;
+    stale or missing shards are recounted (and saved) first.
+    """
+    try:
+        index = load_shard_index()
+        summary = _read_summary()
+        if summary.get("totals") and _summary_is_current(summary, index):
+            count_metric("summary_hits")
+            return summary["totals"]
+        
+        count_metric("summary_misses")
+        with analytics_lock():
+            index = load_shard_index()
+            summary = _read_summary()
+            for key in list(summary["shards"]):
+                if key not in index["shards"]:
+                    del summary["shards"][key]
+            cutoff = _tombstone_cutoff()
+            for key, entry in index["shards"].items():
+                if _partial_is_current(summary["shards"].get(key), entry, cutoff):
+                    continue
+                partial = _summarize_records(load_shard(key, index))
+                # load_shard may have repaired the shard and updated the index
+                partial["checksum"] = index["shards"].get(key, {}).get("checksum")
+                summary["shards"][key] = partial
+            if not _save_summary(summary):
+                log_error("Could not save materialized summary")
+            return summary["totals"]
+    
+    except Exception as e:
+        log_error("Error loading materialized summary", e)
+        return None
+
+def rebuild_summary():
+    """Recount the materialized summary from every shard. Returns totals or None."""
+    with analytics_lock():
+        try:
+            get_summary_path().unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log_error("Could not remove old summary file", e)
+            return None
+        return load_summary()
+
+# ============================================
+# PROJECT LOOKUP
+# ============================================
+#
+# Hash index from id, name and normalized path to a record's position:
+# shards/lookup/NN.json buckets map "id:<id>" / "name:<name>" /
+# "path:<path>" to [shard key, position, id] entries, so a lookup reads
+# one bucket and one shard. commit_pending() adds new records to it.
+# Shards whose checksum differs from the one the index was built against
+# (rewritten by compaction, re-path, another writer, ...) are scanned
+# directly instead, and a background process rebuilds the index.
+
+LOOKUP_BUCKETS = 256
+_lookup_state = {"rebuild_started": False}
+
+def get_lookup_dir():
+    """Get directory of the project lookup index."""
+    return get_shards_dir() / "lookup"
+
+def _normalize_path(path):
+    """Comparable form of a project path ('~/x/../y' -> '/home/u/y')."""
+    return os.path.normcase(os.path.normpath(os.path.abspath(os.path.expanduser(str(path)))))
+
+def _lookup_keys(record):
+    """Index keys of a record."""
+    keys = []
+    if record.get("id"):
+        keys.append("id:" + str(record["id"]))
+    if record.get("project_name"):
+        keys.append("name:" + str(record["project_name"]).strip().casefold())
+    if record.get("project_path"):
+        keys.append("path:" + _normalize_path(record["project_path"]))
+    return keys
+
+def _lookup_bucket_path(key):
+    return get_lookup_dir() / f"{zlib.crc32(key.encode('utf-8')) % LOOKUP_BUCKETS:03d}.json"
+
+def _load_lookup_file(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        log_error(f"Error loading lookup file {path.name}", e)
+        return {}
+
+def _add_lookup_entries(entries_by_key):
+    """Append {key: [[shard, pos, id], ...]} to the bucket files (under the lock)."""
+    by_bucket = {}
+    for key, entries in entries_by_key.items():
+        by_bucket.setdefault(_lookup_bucket_path(key), {})[key] = entries
+    get_lookup_dir().mkdir(parents=True, exist_ok=True)
+    for path, additions in by_bucket.items():
+        bucket = _load_lookup_file(path)
+        for key, entries in additions.items():
+            bucket.setdefault(key, []).extend(entries)
+        if _write_json_file(path, bucket) is None:
+            return False
+    return True
+
+def update_lookup_index(key, start, added, previous_checksum, index):
+    """
+    Register records appended to shard `key` at positions start.. (called by
+    commit_pending under the lock). Skipped when the index was already behind
+    that shard; the next miss rebuilds it.
+    """
+    meta_path = get_lookup_dir() / "meta.json"
+    meta = _load_lookup_file(meta_path)
+    shards = meta.get("shards", {})
+    if shards.get(key) != previous_checksum:
+        return False
+    
+    entries_by_key = {}
+    for pos, record in enumerate(added, start):
+        for lookup_key in _lookup_keys(record):
+            entries_by_key.setdefault(lookup_key, []).append([key, pos, record.get("id")])
+    if not _add_lookup_entries(entries_by_key):
+        return False
+    shards[key] = index["shards"][key].get("checksum")
+    return _write_json_file(meta_path, {"version": "1.0", "shards": shards}) is not None
+
+def rebuild_lookup_index():
+    """Rebuild the lookup index from every shard."""
+    with analytics_lock():
+        index = load_shard_index()
+        buckets = {}
+        for key in sorted(index["shards"]):
+            for pos, record in enumerate(load_shard(key, index)):
+                for lookup_key in _lookup_keys(record):
+                    buckets.setdefault(_lookup_bucket_path(lookup_key), {}) \
+                        .setdefault(lookup_key, []).append([key, pos, record.get("id")])
+        
+        lookup_dir = get_lookup_dir()
+        lookup_dir.mkdir(parents=True, exist_ok=True)
+        for path in lookup_dir.glob("[0-9]*.json"):
+            if path not in buckets:
+                path.unlink(missing_ok=True)
+        for path, bucket in buckets.items():
+            if _write_json_file(path, bucket) is None:
+                log_error("Could not save lookup index")
+                return False
+        shards = {key: entry.get("checksum") for key, entry in index["shards"].items()}
+        return _write_json_file(lookup_dir / "meta.json", {"version": "1.0", "shards": shards}) is not None
+
+def _lookup_is_current(index):
+    shards = _load_lookup_file(get_lookup_dir() / "meta.json").get("shards")
+    return shards == {key: entry.get("checksum") for key, entry in index["shards"].items()}
+
+def schedule_lookup_rebuild():
+    """Rebuild the lookup index in a detached process (once per process)."""
+    if _lookup_state["rebuild_started"]:
+        return
+    _lookup_state["rebuild_started"] = True
+    
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    try:
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "--rebuild-lookup"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            close_fds=True, **kwargs
+        )
+    except OSError as e:
+        log_error("Could not start lookup index rebuild", e)
+
+def find_projects(query):
+    """
+    Find project records by id, path or name (case-insensitive), in that order
+    of precedence. Returns a list of records (several when a name is shared).
+    """
+    query = str(query).strip()
+    if not query:
+        return []
+    keys = ["id:" + query, "path:" + _normalize_path(query), "name:" + query.casefold()]
+    
+    index = load_shard_index()
+    indexed = _load_lookup_file(get_lookup_dir() / "meta.json").get("shards", {})
+    # Shards the index is behind on: their entries are not trusted, the shard is scanned
+    changed = {key for key, entry in index["shards"].items() if indexed.get(key) != entry.get("checksum")}
+    shards = {}
+    scanned = {}  # changed shard -> [(pos, record, its lookup keys)]
+        
+    def records_of(shard_key):
+        if shard_key not in shards:
+            shards[shard_key] = load_shard(shard_key, index)
+        return shards[shard_key]
+    
+    for lookup_key in keys:
+        hits = {}  # (shard, pos) -> record
+        for shard_key, pos, record_id in _load_lookup_file(_lookup_bucket_path(lookup_key)).get(lookup_key, []):
+            if shard_key in changed or shard_key not in index["shards"]:
+                continue
+            records = records_of(shard_key)
+            record = records[pos] if pos < len(records) else None
+            if record is None or record.get("id") != record_id or lookup_key not in _lookup_keys(record):
+                changed.add(shard_key)  # Stale entry: fall back to a scan of that shard
+                continue
+            hits[(shard_key, pos)] = record
+        
+        hits = {at: record for at, record in hits.items() if at[0] not in changed}
+        for shard_key in changed:
+            if shard_key not in scanned:
+                scanned[shard_key] = [(pos, record, set(_lookup_keys(record)))
+                                      for pos, record in enumerate(records_of(shard_key))]
+            for pos, record, record_keys in scanned[shard_key]:
+                if lookup_key in record_keys:
+                    hits[(shard_key, pos)] = record
+        
+        found = [record for _, record in sorted(hits.items(), key=lambda item: item[0])
+                 if not (record.get("deleted_at") and record["deleted_at"] < _tombstone_cutoff())]
+        if found:
+            break
+    else:
+        found = []
+    
+    if changed:
+        schedule_lookup_rebuild()
+    return found
+
+def get_project_detail(query):
+    """
+    Full detail for one project: record fields, progress, trend, git state
+    and parsed CONTEXT.md sections. Returns (detail or None, candidates)
+    where candidates lists the matches when the query is ambiguous.
+    """
+    matches = find_projects(query)
+    if len(matches) != 1:
+        return None, matches
+    record = matches[0]
+    
+    detail = get_project_progress(record)
+    get_git_activity([detail])
+    detail["tech_stack"] = record.get("tech_stack", {})
+    detail["environment"] = record.get("environment", {})
+    if record.get("deleted_at"):
+        detail["deleted_at"] = record["deleted_at"]
+    if record.get("timings"):
+        detail["timings"] = record["timings"]
+    detail["context"] = get_context_details([record]).get(record.get("id"))
+    return detail, matches
+
+# ============================================
+# ANALYTICS API
+# ============================================
+
+def load_analytics():
+    """Load analytics data from every shard into a single structure."""
+    data = _empty_analytics()
+    try:
+        data["projects"] = list(iter_projects())
+    except Exception as e:
+        log_error("Unexpected error loading analytics", e)
+    return data
+
+def save_analytics(data):
+    """Save a full analytics structure, re-partitioning it into shards."""
+    try:
+        # Validate data before saving
+        if not isinstance(data, dict) or not isinstance(data.get("projects"), list):
+            log_error(f"Attempted to save invalid analytics data: {type(data)}")
+            return False
+        
+        partitioned = _partition_by_shard(data["projects"])
+        
+        with analytics_lock():
+            index = load_shard_index()
+            ok = True
+            for key in sorted(set(index["shards"]) | set(partitioned)):
+                ok = save_shard(key, partitioned.get(key, []), index) and ok
+        return ok
+    
+    except Exception as e:
+        log_error("Error saving analytics", e)
+        return False
+
+def get_pending_dir():
+    """Get directory of records queued for the next group commit."""
+    return get_analytics_dir() / "pending"
+
+def _queue_record(record, queue_dir=None):
+    """Queue a record for group commit (or in queue_dir). Returns the queued file path."""
+    pending_dir = queue_dir or get_pending_dir()
+    pending_dir.mkdir(parents=True, exist_ok=True)
+    path = pending_dir / f"{record['id']}.json"
+    temp_path = path.with_suffix('.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+    return path
+
+def commit_pending():
+    """
+    Group commit: write every queued record with one atomic write per
+    affected shard, then drop the queue entries.
+    Records already present in a shard (by id) are not duplicated, so a
+    commit interrupted between the shard write and the cleanup is safe to redo.
+    """
+    with analytics_lock():
+        files = sorted(get_pending_dir().glob("*.json"))
+        if not files:
+            return True
+        
+        records = []
+        for path in list(files):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    records.append(json.load(f))
+            except Exception as e:
+                log_error(f"Unreadable pending record, moving aside: {path}", e)
+                files.remove(path)
+                try:
+                    os.replace(path, path.with_name(path.name + '.corrupted'))
+                except OSError:
+                    pass
+        records.sort(key=lambda r: str(r.get("timestamp", "")))
+        
+        index = load_shard_index()
+        summary = _read_summary()
+        for key, queued in _partition_by_shard(records).items():
+            shard = load_shard(key, index)
+            previous_checksum = index["shards"].get(key, {}).get("checksum")
+            known_ids = {r.get("id") for r in shard}
+            added = [r for r in queued if r.get("id") not in known_ids]
+            start = len(shard)
+            shard.extend(added)
+            if not save_shard(key, shard, index):
+                return False
+            update_summary(key, added, shard, previous_checksum, index, summary)
+            update_lookup_index(key, start, added, previous_checksum, index)
+        if not _save_summary(summary):
+            log_error("Could not update materialized summary")
+        
+        for path in files:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        return True
+
+def track_project(project_data):
+    """
+    Track a new project creation with validation.
+    
+    project_data: dict with keys:
+        - project_name: str
+        - project_path: str
+        - project_types: list[str]
+        - tech_stack: dict
+        - environment: dict (optional)
+        - timings: dict (optional) span path -> [ms, calls], see timing_summary()
+    
+    Returns: project ID on success, None on failure
+    """
+    with span("track_project"):
+        return _track_project(project_data)
+
+def _track_project(project_data):
+    try:
+        # Validate required fields
+        project_name = str(project_data.get("project_name", "Unknown"))
+        project_path = str(project_data.get("project_path", ""))
+        
+        if not project_name or project_name == "Unknown":
+            log_error("Track project called with invalid project_name")
+        
+        record = {
+            "id": str(uuid.uuid4()),
+            "timestamp": datetime.now().isoformat(),
+            "project_name": project_name,
+            "project_path": project_path,
+            "project_types": list(project_data.get("project_types", [])),
+            "tech_stack": dict(project_data.get("tech_stack", {})),
+            "environment": dict(project_data.get("environment", {}))
+        }
+        if project_data.get("timings"):
+            record["timings"] = dict(project_data["timings"])
+        
+        # Queue the record, then commit under the lock. Whoever gets the
+        # lock first commits every queued record (group commit), so waiting
+        # writers usually find theirs already written.
+        pending_path = _queue_record(record)
+        
+        with analytics_lock():
+            if pending_path.exists() and not commit_pending():
+                log_error("Failed to save analytics after tracking project")
+                return None
+        maybe_compact()
+        queue_for_collector(record)
+        return record["id"]
+            
+    except Exception as e:
+        log_error("Error tracking project", e)
+        return None
+
+def update_project_record(project_id, fields):
+    """
+    Set fields on one stored project record, e.g. the wizard's timings once
+    its spans have closed. Returns True on success.
+    """
+    try:
+        return _update_records({project_id: dict(fields)})
+    except Exception as e:
+        log_error(f"Error updating project record {project_id}", e)
+        return False
+
+def get_export_path():
+    """Get default path for the human-readable analytics export."""
+    return get_analytics_dir() / "analytics-export.json"
+
+def export_analytics(path=None):
+    """
+    Export the full history as one pretty-printed JSON file
+    (same layout as the legacy analytics.json). Returns the path or None.
+    """
+    path = Path(path) if path else get_export_path()
+    temp_path = path.with_name(path.name + '.tmp')
+    try:
+        data = load_analytics()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, path)
+        return path
+    except Exception as e:
+        log_error(f"Error exporting analytics to {path}", e)
+        try:
+            if temp_path.exists():
+                temp_path.unlink()
+        except:
+            pass
+        return None
+
+def get_recent_projects(days=30):
+    """Get projects created in the last N days (opens only the matching shards)."""
+    return list(iter_projects(since=datetime.now() - timedelta(days=days)))
+
+def get_quarter_start(now=None):
+    """Get the first moment of the current calendar quarter."""
+    now = now or datetime.now()
+    return datetime(now.year, (now.month - 1) // 3 * 3 + 1, 1)
+
+# tech_stack keys that describe how the stack was picked, not a technology
+TECH_STACK_META_KEYS = {"type", "preset_name"}
+
+def _count_stack(stack, tech_counts):
+    """Add one tech stack's main technology names to tech_counts."""
+    for key, value in stack.items():
+        if key in TECH_STACK_META_KEYS or not isinstance(value, str):
+            continue
+        if value and value != "None" and not value.startswith("TBD"):
+            # Extract main tech name
+            tech_name = value.split("+")[0].strip()
+            tech_counts[tech_name] = tech_counts.get(tech_name, 0) + 1
+
+def count_tech(projects):
+    """Count main technology names across project tech stacks."""
+    tech_counts = {}
+    for p in projects:
+        _count_stack(p.get("tech_stack") or {}, tech_counts)
+    return tech_counts
+
+def get_top_tech(since=None, until=None, limit=5):
+    """
+    Most used technologies within an optional date range.
+    e.g. get_top_tech(since=get_quarter_start()) -> top tech this quarter
+    """
+    tech_counts = count_tech(iter_projects(since=since, until=until))
+    return sorted(tech_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+# ============================================
+# TOMBSTONES & COMPACTION
+# ============================================
+#
+# Read paths never write: a project whose directory is gone is shown as
+# deleted from a stat at read time and still counted. `--compact` records
+# "deleted_at" on such records (or clears it when the directory came
+# back); TOMBSTONE_GRACE_DAYS later they are hidden and counted nowhere,
+# until compaction drops them for good. Set AUTO_COMPACT_RATIO to also
+# compact after new projects are tracked once expired tombstones pass that
+# share of all records. A record is only tombstoned while its parent
+# directory is there: a missing drive, share or mount says nothing about
+# the project.
+
+TOMBSTONE_GRACE_DAYS = 30
+AUTO_COMPACT_RATIO = None  # e.g. 0.25 to compact automatically (opt-in)
+AUTO_COMPACT_MIN_RECORDS = 20
+
+def _tombstone_cutoff(now=None):
+    """Tombstones older than this (ISO time) are expired."""
+    now = now or datetime.now()
+    return (now - timedelta(days=TOMBSTONE_GRACE_DAYS)).isoformat()
+
+def _location_available(path):
+    """True when the directory that should hold a project is reachable."""
+    if os.name != 'nt' and PureWindowsPath(path).drive:
+        return False  # A Windows path (D:\Projects\...) seen from Linux / WSL
+    return Path(path).parent.is_dir()
+
+def mark_project_presence(record, now=None):
+    """
+    Set (or clear) a record's deleted_at from whether its directory exists.
+    Returns True when the record changed. Imported records, and records
+    whose drive or mount is not reachable, are left alone.
+    """
+    path = record.get("project_path", "")
+    if not record.get("id") or not path or record.get("imported_from"):
+        return False  # An imported path belongs to the machine it came from
+    exists = Path(path).exists()
+    if exists == (not record.get("deleted_at")) or not (exists or _location_available(path)):
+        return False
+    if exists:
+        record.pop("deleted_at", None)
+    else:
+        record["deleted_at"] = now or datetime.now().isoformat()
+    return True
+
+def dead_ratio(index=None):
+    """Share of stored records that are expired tombstones (from the shard index)."""
+    index = index or load_shard_index()
+    cutoff = _tombstone_cutoff()
+    total = sum(entry.get("count", 0) for entry in index["shards"].values())
+    dead = sum(1 for entry in index["shards"].values() for ts in entry.get("tombstones", []) if ts < cutoff)
+    return dead / total if total else 0.0
+
+def compact_analytics(purge=False):
+    """
+    Record tombstones (see mark_project_presence), then rewrite every
+    shard without expired tombstones or duplicates.
+    
+    purge: drop all tombstones, including those still in their grace period.
+    Duplicates: one record per id (the last written). Records sharing a
+    path but not an id are kept (recreated or imported projects).
+    Returns (records before, records after), or None on failure.
+    """
+    with analytics_lock():
+        index = load_shard_index()
+        records = [r for key in sorted(index["shards"]) for r in load_shard(key, index)]
+        before = len(records)
+        now = datetime.now().isoformat()
+        marked = sum(mark_project_presence(r, now) for r in records)
+        # purge: everything tombstoned so far, including what was just marked
+        cutoff = datetime.now().isoformat() if purge else _tombstone_cutoff()
+        
+        by_id = {}
+        for r in records:
+            by_id[r.get("id") or id(r)] = r
+        survivors = sorted((r for r in by_id.values()
+                            if not (r.get("deleted_at") and r["deleted_at"] < cutoff)),
+                           key=lambda r: str(r.get("timestamp", "")))
+        if len(survivors) == before and not marked:
+            return before, before
+        partitioned = _partition_by_shard(survivors)
+        for key in sorted(set(index["shards"]) | set(partitioned)):
+            if not save_shard(key, partitioned.get(key, []), index):
+                return None
+        return before, len(survivors)
+
+def maybe_compact():
+    """Compact when expired tombstones exceed AUTO_COMPACT_RATIO. Returns result or None."""
+    if AUTO_COMPACT_RATIO is None:
+        return None
+    index = load_shard_index()
+    total = sum(entry.get("count", 0) for entry in index["shards"].values())
+    if total < AUTO_COMPACT_MIN_RECORDS or dead_ratio(index) <= AUTO_COMPACT_RATIO:
+        return None
+    return compact_analytics()
+
+# ============================================
+# IMPORT & MERGE
+# ============================================
+#
+# Combines analytics from several machines. Each input (an export, a legacy
+# analytics.json or another machine's .vibecoding / shards directory) is
+# streamed and cut into timestamp-sorted runs of MERGE_RUN_SIZE records
+# spilled to a temp directory; the runs are k-way merged with heapq.merge.
+# Records are deduplicated by id only: a local record always keeps its
+# place, otherwise the first copy of an id in merge order wins. Two
+# records with different ids are two projects even when they share a path
+# (a recreated project, or another machine's default D:\Projects\app).
+# The survivors are written out one month (shard) at a time; between
+# records only 8-byte digests of ids are kept.
+
+MERGE_RUN_SIZE = 20000  # records sorted in memory before a run is spilled
+
+def _merge_key(record):
+    """
+    Merge order: by shard (month, 'undated' last), then timestamp, then id.
+    The shard comes first because raw timestamps do not always sort by month
+    ('20250110T100000' and '2025-01-10T...' both map to 2025-01).
+    """
+    timestamp = str(record.get("timestamp", ""))
+    return (get_shard_key(timestamp), timestamp, str(record.get("id", "")))
+
+def _digest(value):
+    return hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+
+def _record_digest(record):
+    """Identity of a record: its id, or its content when it has none."""
+    if record.get("id"):
+        return _digest(record["id"])
+    return _digest(json.dumps({k: v for k, v in record.items() if k != "imported_from"}, sort_keys=True))
+
+def _source_files(source):
+    """Analytics files making up one merge source."""
+    source = Path(source).expanduser()
+    if not source.is_dir():
+        return [source]
+    shards_dir = source / "shards" if (source / "shards").is_dir() else source
+    files = sorted(p for p in shards_dir.iterdir() if SHARD_FILE_PATTERN.match(p.name))
+    if not files and (source / "analytics.json").is_file():
+        files = [source / "analytics.json"]
+    return files
+
+def _iter_source_records(source):
+    """Stream every record of a merge source (damaged files are salvaged on the fly)."""
+    for path in _source_files(source):
+        compression = _compression_for(path)
+        with _open_binary_file(path, compression) as f:
+            encoding = _sniff_encoding(f.read(SNIFF_SIZE))
+        with _open_data_file(path, 'r', compression, encoding, errors='replace') as f:
+            yield from iter_salvaged_records(f)
+
+def _spill_runs(records, temp_dir):
+    """Write a record stream as sorted JSON-lines runs. Returns the run paths."""
+    runs = []
+    for chunk in iter(lambda: list(itertools.islice(records, MERGE_RUN_SIZE)), []):
+        chunk.sort(key=_merge_key)
+        path = Path(temp_dir) / f"run-{len(os.listdir(temp_dir)):06d}.jsonl"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in chunk)
+        runs.append(path)
+    return runs
+
+def _iter_run(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+def _iter_local_records():
+    """Stored records in merge order, one shard in memory at a time."""
+    index = load_shard_index()
+    for key in sorted(index["shards"]):
+        yield from sorted(load_shard(key, index), key=_merge_key)
+
+def _tag_source(source, records):
+    for record in records:
+        yield source, record
+
+def _merged_stream(streams):
+    """k-way merge of [(source number, records)] into (source number, record) pairs."""
+    return heapq.merge(*(_tag_source(source, records) for source, records in streams),
+                       key=lambda item: _merge_key(item[1]))
+
+def _iter_survivors(streams, stats, reserved=frozenset()):
+    """
+    The merged stream with one record per id. Ids in `reserved` (the local
+    store, source 0) keep their local copy; otherwise the first copy wins.
+    Counts read / duplicates into stats.
+    """
+    seen = set()
+    for source, record in _merged_stream(streams):
+        stats["read"] += 1
+        record_digest = _record_digest(record)
+        if record_digest in seen or (source and record_digest in reserved):
+            stats["duplicates"] += 1
+            continue
+        seen.add(record_digest)
+        yield source, record
+
+def merge_analytics(sources, output=None):
+    """
+    Merge analytics from other machines, deduplicated by record id.
+    
+    sources: export / analytics.json files (.gz/.xz too) or .vibecoding /
+    shards directories. Without output they are imported into the local
+    store (imported records get an "imported_from" field and are never
+    tombstoned here); with output the sources alone are merged into a new
+    export file.
+    Returns dict with read / duplicates / written counts
+    (plus added when importing), or None on failure.
+    """
+    try:
+        with tempfile.TemporaryDirectory(prefix="vibecoding-merge-") as temp_dir:
+            runs = [_spill_runs(_iter_source_records(source), temp_dir) for source in sources]
+            
+            if output:
+                def streams():
+                    return [(n, _iter_run(path)) for n, paths in enumerate(runs) for path in paths]
+                stats = {"read": 0, "duplicates": 0}
+                survivors = (record for _, record in _iter_survivors(streams(), stats))
+                checksum = _write_json_file(output, {"version": "1.0", "projects": survivors})
+                if checksum is None:
+                    return None
+                stats["written"] = stats["read"] - stats["duplicates"]
+                return stats
+            
+            with analytics_lock():
+                commit_pending()
+                
+                def streams():
+                    return [(0, _iter_local_records())] + \
+                        [(n, _iter_run(path)) for n, paths in enumerate(runs, 1) for path in paths]
+                stats = {"read": 0, "duplicates": 0, "written": 0, "added": 0}
+                local_ids = {_record_digest(record) for record in _iter_local_records()}
+                
+                index = load_shard_index()
+                local_counts = {key: entry.get("count", 0) for key, entry in index["shards"].items()}
+                survivors = _iter_survivors(streams(), stats, local_ids)
+                written_keys = set()
+                for key, group in itertools.groupby(survivors, key=lambda item: get_shard_key(item[1].get("timestamp"))):
+                    # A month seen twice would overwrite its first part
+                    if key in written_keys:
+                        raise ValueError(f"Merge stream out of shard order at {key}")
+                    written_keys.add(key)
+                    records = []
+                    added = 0
+                    for source, record in group:
+                        if source:
+                            record.setdefault("imported_from", str(sources[source - 1]))
+                            added += 1
+                        records.append(record)
+                    stats["added"] += added
+                    stats["written"] += len(records)
+                    stored = local_counts.pop(key, 0)
+                    if added or len(records) != stored:
+                        if not save_shard(key, records, index):
+                            return None
+                # Months whose every record was a duplicate id of an earlier one
+                for key in local_counts:
+                    if not save_shard(key, [], index):
+                        return None
+                return stats
+    
+    except Exception as e:
+        log_error("Error merging analytics", e)
+        return None
+
+def run_merge_cli(sources, output=None):
+    """Print a merge / import summary. Returns exit code."""
+    missing = [source for source in sources if not Path(source).expanduser().exists()]
+    if missing:
+        print(f"Not found: {', '.join(missing)}")
+        return 2
+    
+    stats = merge_analytics(sources, output)
+    if stats is None:
+        print("Merge failed, see ~/.vibecoding/errors.log")
+        return 1
+    print(f"Read {stats['read']} records from {len(sources)} source(s)")
+    print(f"  Duplicates (same id): {stats['duplicates']}")
+    if output:
+        print(f"  Written to {output}: {stats['written']}")
+    else:
+        print(f"  Imported: {stats['added']} new, store now holds {stats['written']}")
+    return 0
+
+# ============================================
+# PROJECT DISCOVERY
+# ============================================
+#
+# Finds VibeCoding projects (a directory holding .agent/GEMINI.md or
+# .agent/CONTEXT.md) that analytics does not know about: copied, moved or
+# created before tracking existed. Top-level subdirectories are crawled in
+# parallel with os.scandir. discovery_cache.json keeps each directory's
+# mtime and subdirectory list, so a re-crawl only re-lists directories
+# whose entries changed.
+
+DISCOVERY_PRUNE = {
+    "node_modules", ".git", ".hg", ".svn", "venv", ".venv", "env", "__pycache__",
+    "dist", "build", "target", "out", ".next", ".nuxt", ".cache", ".tox", ".idea",
+    ".vscode", "vendor", "bower_components", "site-packages", ".gradle", "Pods",
+    ".mypy_cache", ".pytest_cache", ".terraform", "coverage"
+}
+DISCOVERY_MAX_DEPTH = 5
+DISCOVERY_WORKERS = 8
+_GEMINI_FOOTER_PATTERN = re.compile(
+    r"\*Generated by VibeCoding Project Creator\*\s*\n\*Types: (.*?)\*\s*\n\*Created: (.*?)\*")
+_TECH_LINE_PATTERN = re.compile(r"^\s*-\s*(Frontend|Backend|Database|Styling|Hosting):\s*(.+?)\s*$")
+
+def get_discovery_cache_path():
+    """Get cache of directory listings from the previous crawl."""
+    return get_analytics_dir() / "discovery_cache.json"
+
+def _is_project_dir(directory):
+    agent = Path(directory) / ".agent"
+    return (agent / "GEMINI.md").is_file() or (agent / "CONTEXT.md").is_file()
+
+def _crawl(top, depth, cache, fresh):
+    """Walk one subtree iteratively. Returns list of project directories."""
+    found = []
+    stack = [(top, depth)]
+    while stack:
+        directory, level = stack.pop()
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            continue
+        
+        cached = cache.get(directory)
+        if cached and cached["mtime"] == mtime:
+            subdirs, has_agent = cached["subdirs"], cached["agent"]
+        else:
+            subdirs, has_agent = [], False
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if not entry.is_dir(follow_symlinks=False):
+                                continue
+                        except OSError:
+                            continue
+                        if entry.name == ".agent":
+                            has_agent = True
+                        elif entry.name not in DISCOVERY_PRUNE and not entry.name.startswith("."):
+                            subdirs.append(entry.name)
+            except OSError:
+                continue
+        fresh[directory] = {"mtime": mtime, "subdirs": subdirs, "agent": has_agent}
+        
+        # Projects do not nest: stop at the first project directory
+        if has_agent and _is_project_dir(directory):
+            found.append(directory)
+        elif level < DISCOVERY_MAX_DEPTH:
+            stack.extend((os.path.join(directory, name), level + 1) for name in subdirs)
+    return found
+
+def _crawl_subtree(top, cache):
+    """Worker: crawl one subdirectory into its own listing dict."""
+    listed = {}
+    return _crawl(top[0], top[1], cache, listed), listed
+
+def crawl_projects(roots):
+    """Return the sorted list of project directories under the given roots."""
+    path = get_discovery_cache_path()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if not isinstance(cache, dict):
+            cache = {}
+    except FileNotFoundError:
+        cache = {}
+    except Exception as e:
+        log_error("Error loading discovery cache, crawling from scratch", e)
+        cache = {}
+    
+    fresh = {}
+    found = []
+    tops = []
+    for root in roots:
+        root = os.path.abspath(str(root))
+        if not os.path.isdir(root):
+            log_error(f"Discovery root is not a directory: {root}")
+            continue
+        # The root itself is checked here (at max depth, so no descent);
+        # its subdirectories go to the pool
+        if _crawl(root, DISCOVERY_MAX_DEPTH, cache, fresh):
+            found.append(root)
+        elif root in fresh:
+            tops += [(os.path.join(root, name), 1) for name in fresh[root]["subdirs"]]
+    
+    with ThreadPoolExecutor(max_workers=DISCOVERY_WORKERS) as pool:
+        parts = list(pool.map(lambda top: _crawl_subtree(top, cache), tops))
+    for projects, listed in parts:
+        found += projects
+        fresh.update(listed)
+    
+    # Keep listings from other roots crawled earlier
+    scanned = tuple(os.path.join(os.path.abspath(str(r)), "") for r in roots)
+    for directory, entry in cache.items():
+        if directory not in fresh and not os.path.join(directory, "").startswith(scanned):
+            fresh[directory] = entry
+    if fresh != cache and _write_json_file(path, fresh) is None:
+        log_error("Could not save discovery cache")
+    return sorted(set(found))
+
+def read_project_metadata(project_dir):
+    """
+    Recover name, types, creation time and tech stack of a generated project
+    from its .agent/GEMINI.md header/footer and CONTEXT.md tech stack lines.
+    """
+    agent = Path(project_dir) / ".agent"
+    meta = {"project_name": Path(project_dir).name, "project_types": [], "created": None, "tech_stack": {}}
+    
+    try:
+        gemini = (agent / "GEMINI.md").read_text(encoding='utf-8', errors='replace')
+        header = re.search(r"^# GEMINI\.md - (.+?)\s*$", gemini, re.MULTILINE)
+        if header:
+            meta["project_name"] = header.group(1)
+        footer = _GEMINI_FOOTER_PATTERN.search(gemini)
+        if footer:
+            meta["project_types"] = [t.strip() for t in footer.group(1).split(",") if t.strip()]
+            try:
+                meta["created"] = datetime.strptime(footer.group(2).strip(), "%Y-%m-%d %H:%M").isoformat()
+            except ValueError:
+                pass
+    except OSError:
+        pass
+    
+    try:
+        for section, line in _read_sections(agent / "CONTEXT.md"):
+            if section == "tech stack":
+                match = _TECH_LINE_PATTERN.match(line)
+                if match:
+                    meta["tech_stack"][match.group(1).lower()] = match.group(2)
+            elif section == "project status" and not meta["created"] and "**Started**" in line:
+                started = _table_cells(line)[1] if len(_table_cells(line)) > 1 else ""
+                if re.fullmatch(r"\d{4}-\d{2}-\d{2}", started):
+                    meta["created"] = started + "T00:00:00"
+    except OSError:
+        pass
+    if meta["tech_stack"]:
+        meta["tech_stack"] = {"type": "discovered", **meta["tech_stack"], "extras": []}
+    return meta
+
+def _update_records(changes):
+    """Apply {record id: {field: value}} to stored records, one write per affected shard."""
+    with analytics_lock():
+        index = load_shard_index()
+        for key in sorted(index["shards"]):
+            records = load_shard(key, index)
+            touched = False
+            for record in records:
+                if record.get("id") in changes:
+                    record.update(changes[record["id"]])
+                    touched = True
+            if touched and not save_shard(key, records, index):
+                return False
+    return True
+
+def discover_projects(roots, dry_run=False):
+    """
+    Crawl roots and bring analytics in line with what is on disk.
+    
+    - projects already tracked at that path are left alone
+    - a tracked project whose path vanished is re-pathed when exactly one
+      discovered project has the same name
+    - everything else is registered (in one group commit)
+    Returns dict with found / tracked / repathed / registered lists of paths.
+    """
+    found = crawl_projects(roots)
+    records = list(iter_projects())
+    by_path = {os.path.normcase(os.path.abspath(r.get("project_path", ""))) for r in records if r.get("project_path")}
+    missing_by_name = {}
+    for r in records:
+        path = r.get("project_path", "")
+        if path and not os.path.exists(path):
+            missing_by_name.setdefault(r.get("project_name"), []).append(r)
+    
+    result = {"found": found, "tracked": [], "repathed": [], "registered": []}
+    new_by_name = {}
+    repaths = {}
+    for directory in found:
+        if os.path.normcase(directory) in by_path:
+            result["tracked"].append(directory)
+            continue
+        meta = read_project_metadata(directory)
+        new_by_name.setdefault(meta["project_name"], []).append((directory, meta))
+    
+    for name, candidates in new_by_name.items():
+        missing = missing_by_name.get(name, [])
+        if len(candidates) == 1 and len(missing) == 1:
+            repaths[missing[0]["id"]] = {"project_path": candidates[0][0]}
+            result["repathed"].append(candidates[0][0])
+            continue
+        for directory, meta in candidates:
+            result["registered"].append(directory)
+            if not dry_run:
+                _queue_record({
+                    "id": str(uuid.uuid4()),
+                    "timestamp": meta["created"] or datetime.fromtimestamp(os.stat(directory).st_mtime).isoformat(),
+                    "project_name": meta["project_name"],
+                    "project_path": directory,
+                    "project_types": meta["project_types"],
+                    "tech_stack": meta["tech_stack"],
+                    "environment": {"discovered": datetime.now().isoformat(timespec="seconds")}
+                })
+    
+    if not dry_run:
+        if repaths and not _update_records(repaths):
+            log_error("Failed to re-path discovered projects")
+        if result["registered"] and not commit_pending():
+            log_error("Failed to register discovered projects")
+    return result
+
+def run_discover_cli(roots, dry_run=False):
+    """Print a discovery summary. Returns exit code."""
+    started = time.perf_counter()
+    result = discover_projects(roots, dry_run)
+    elapsed = time.perf_counter() - started
+    
+    prefix = "(dry run) " if dry_run else ""
+    print(f"{prefix}Found {len(result['found'])} project(s) in {elapsed:.2f}s: "
+          f"{len(result['registered'])} new, {len(result['repathed'])} moved, "
+          f"{len(result['tracked'])} already tracked")
+    for label, key in (("+", "registered"), ("~", "repathed")):
+        for directory in result[key]:
+            print(f"  {label} {directory}")
+    return 0
+
+# ============================================
+# PROGRESS TRACKER
+# ============================================
+
+def validate_context_content(content):
+    """
+    Validate CONTEXT.md content structure.
+    Returns (is_valid, issues_list)
+    """
+    issues = []
+    
+    # Check if content is too short (likely empty or corrupted)
+    if len(content) < 50:
+        issues.append("File too short (< 50 chars)")
+    
+    # Check for required sections
+    required_sections = ["Project Status", "Completed", "Current Focus"]
+    for section in required_sections:
+        if section.lower() not in content.lower():
+            issues.append(f"Missing section: {section}")
+    
+    # Check for binary/garbage content
+    try:
+        # Count printable vs non-printable chars
+        printable = sum(1 for c in content if c.isprintable() or c in '\n\r\t')
+        ratio = printable / len(content) if content else 0
+        if ratio < 0.9:
+            issues.append(f"Too many non-printable chars ({ratio:.0%} printable)")
+    except:
+        issues.append("Could not validate content characters")
+    
+    return (len(issues) == 0, issues)
+
+def calculate_progress(context_path):
+    """
+    Parse CONTEXT.md to calculate project progress.
+    
+    Returns dict with:
+        - progress: int (0-100)
+        - done: int (completed tasks)
+        - total: int (total tasks)
+        - current_phase: str
+        - status: str ('complete', 'in-progress', 'paused', 'error')
+        - error: str (optional, only if status is 'error')
+    """
+    context_path = Path(context_path)
+    
+    # Check file exists
+    if not context_path.exists():
+        return {
+            "progress": 0,
+            "status": "no-context",
+            "current_phase": "No CONTEXT.md",
+            "done": 0,
+            "total": 0
+        }
+    
+    # Check file is readable and not too large
+    try:
+        file_stat = context_path.stat()
+        file_size = file_stat.st_size
+        updated = datetime.fromtimestamp(file_stat.st_mtime).isoformat(timespec="seconds")
+        if file_size > 1024 * 1024:  # > 1MB is suspicious
+            log_error(f"CONTEXT.md too large: {file_size} bytes at {context_path}")
+            return {
+                "progress": 0,
+                "status": "error",
+                "current_phase": "File too large",
+                "error": f"File size: {file_size} bytes",
+                "done": 0,
+                "total": 0
+            }
+    except Exception as e:
         log_error(f"Cannot stat file: {context_path}", e)
         return {
             "progress": 0,
-            "status": "error", 
-            "current_phase": "Cannot access file",
+            "status": "error", 
+            "current_phase": "Cannot access file",
+            "done": 0,
+            "total": 0
+        }
+    
+    # Try multiple encodings
+    content = None
+    encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
+    
+    for encoding in encodings:
+        try:
+            with open(context_path, 'r', encoding=encoding) as f:
+                content = f.read()
+            break  # Success
+        except UnicodeDecodeError:
+            continue
+        except PermissionError as e:
+            log_error(f"Permission denied: {context_path}", e)
+            return {
+                "progress": 0,
+                "status": "error",
+                "current_phase": "Permission denied",
+                "done": 0,
+                "total": 0
+            }
+        except Exception as e:
+            log_error(f"Error reading {context_path}", e)
+            continue
+    
+    if content is None:
+        log_error(f"Could not read CONTEXT.md with any encoding: {context_path}")
+        return {
+            "progress": 0,
+            "status": "error",
+            "current_phase": "Cannot read file",
+            "done": 0,
+            "total": 0
+        }
+    
+    # Validate content
+    is_valid, issues = validate_context_content(content)
+    if not is_valid:
+        log_error(f"Invalid CONTEXT.md at {context_path}: {issues}")
+        # Continue anyway - try to extract what we can
+    
+    # Count checkboxes with error handling
+    try:
+        done = content.count("[x]") + content.count("[X]")
+        pending = content.count("[ ]")
+        in_progress = content.count("[/]")
+        total = done + pending + in_progress
+    except Exception as e:
+        log_error(f"Error counting checkboxes", e)
+        done, pending, in_progress, total = 0, 0, 0, 0
+    
+    # Calculate percentage safely
+    try:
+        progress = round((done / total * 100)) if total > 0 else 0
+        progress = max(0, min(100, progress))  # Clamp to 0-100
+    except Exception:
+        progress = 0
+    
+    # Determine status
+    if progress >= 100:
+        status = "complete"
+    elif in_progress > 0 or done > 0:
+        status = "in-progress"
+    else:
+        status = "paused"
+    
+    # Find Current Focus with error handling
+    current_phase = "Unknown"
+    try:
+        patterns = [
+            r"## 🎯 Current Focus\s*\n+>\s*\*?\*?(.+?)(?:\*?\*?)(?:\n|$)",
+            r"## Current Focus\s*\n+>\s*(.+?)(?:\n|$)",
+            r"\*\*Current Focus\*\*[:\s]+(.+?)(?:\n|$)"
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, content, re.IGNORECASE)
+            if match:
+                current_phase = match.group(1).strip()
+                # Clean up markdown
+                current_phase = re.sub(r'\*+', '', current_phase).strip()
+                # Limit length
+                if len(current_phase) > 50:
+                    current_phase = current_phase[:47] + "..."
+                break
+    except Exception as e:
+        log_error("Error extracting current phase", e)
+        current_phase = "Parse error"
+    
+    return {
+        "progress": progress,
+        "done": done,
+        "total": total,
+        "in_progress": in_progress,
+        "current_phase": current_phase,
+        "status": status,
+        "updated": updated
+    }
+
+def get_project_progress(project):
+    """Get progress entry for one tracked project record."""
+    try:
+        path = project.get("project_path", "")
+        context_path = Path(path) / ".agent" / "CONTEXT.md"
+    
+        # Check if project directory still exists
+        exists = bool(path) and Path(path).exists()
+        if not exists:
+            status_info = {
+                "progress": 0,
+                "status": "deleted",
+                "current_phase": "Project not found",
+                "done": 0,
+                "total": 0
+            }
+        else:
+            count_metric("progress_parsed")
+            status_info = calculate_progress(context_path)
+            if status_info.get("status") in ("complete", "in-progress", "paused") and project.get("id"):
+                history = record_progress_snapshot(project["id"], status_info["done"], status_info["total"])
+                status_info.update(progress_trend(history, status_info["status"]))
+    
+        return {
+            "id": project.get("id", "unknown"),
+            "name": project.get("project_name", "Unknown"),
+            "path": path,
+            "types": project.get("project_types", []),
+            "created": project.get("timestamp", ""),
+            **status_info
+        }
+    
+    except Exception as e:
+        log_error(f"Error processing project: {project.get('project_name', 'unknown')}", e)
+        # Placeholder for this project
+        return {
+            "id": project.get("id", "unknown"),
+            "name": project.get("project_name", "Unknown"),
+            "path": project.get("project_path", ""),
+            "types": [],
+            "created": "",
+            "progress": 0,
+            "status": "error",
+            "current_phase": "Error loading",
             "done": 0,
             "total": 0
         }
+
+def get_all_projects_progress(projects=None):
+    """
+    Get progress for all tracked projects (or the given records) with error handling.
+    Served from the indexer daemon when it is running.
+    """
+    if projects is None:
+        indexed = query_indexer("progress")
+        if indexed is not None:
+            return indexed
+        try:
+            started = time.perf_counter()
+            with span("progress_scan"):
+                progress_data = [get_project_progress(project) for project in iter_projects()]
+            observe_scan(time.perf_counter() - started)
+            return progress_data
+        except Exception as e:
+            log_error("Error loading analytics for progress", e)
+            return []
+    
+    with span("progress_scan"):
+        return [get_project_progress(project) for project in projects]
+
+# ============================================
+# PROGRESS HISTORY
+# ============================================
+#
+# One append-only file per project under ~/.vibecoding/history/, made of
+# fixed-width 8-byte snapshots: uint32 unix time, uint16 done, uint16 total.
+# A snapshot is only appended when done/total changed since the last one,
+# so the time of the last snapshot is also the time of the last change.
+# Files are named by the record id when it is a UUID, else by its hash.
+
+HISTORY_RECORD = struct.Struct("<IHH")
+VELOCITY_WINDOW_DAYS = 14
+STALL_DAYS = 7
+
+def get_history_dir():
+    """Get directory of per-project progress history files."""
+    return get_analytics_dir() / "history"
+
+def _history_path(project_id):
+    """<uuid>.bin; other ids (e.g. from imported files) are hashed, never used as a path."""
+    try:
+        if str(uuid.UUID(str(project_id))) == project_id:
+            return get_history_dir() / f"{project_id}.bin"
+    except ValueError:
+        pass
+    return get_history_dir() / f"id-{hashlib.sha256(str(project_id).encode('utf-8')).hexdigest()[:32]}.bin"
+
+def read_progress_history(project_id):
+    """Return the list of (timestamp, done, total) snapshots for a project."""
+    try:
+        data = _history_path(project_id).read_bytes()
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        log_error(f"Cannot read progress history: {project_id}", e)
+        return []
+    # A torn trailing write leaves a partial record; ignore it
+    usable = len(data) - len(data) % HISTORY_RECORD.size
+    return list(HISTORY_RECORD.iter_unpack(data[:usable]))
+
+def record_progress_snapshot(project_id, done, total, now=None):
+    """
+    Append a snapshot unless done/total are unchanged. Returns the history.
+    """
+    history = read_progress_history(project_id)
+    done, total = min(done, 0xFFFF), min(total, 0xFFFF)
+    if history and history[-1][1:] == (done, total):
+        return history
+    
+    snapshot = (int(now if now is not None else time.time()), done, total)
+    try:
+        get_history_dir().mkdir(parents=True, exist_ok=True)
+        # O_APPEND: concurrent 8-byte appends never interleave
+        fd = os.open(_history_path(project_id), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            torn = os.fstat(fd).st_size % HISTORY_RECORD.size
+            if torn:
+                os.ftruncate(fd, os.fstat(fd).st_size - torn)
+            os.write(fd, HISTORY_RECORD.pack(*snapshot))
+        finally:
+            os.close(fd)
+        history.append(snapshot)
+    except Exception as e:
+        log_error(f"Cannot record progress snapshot: {project_id}", e)
+    return history
+
+def progress_trend(history, status, now=None):
+    """
+    Velocity, stall flag and projected completion date from a history.
+    
+    velocity: tasks completed per day over the last VELOCITY_WINDOW_DAYS;
+    stalled: unfinished and unchanged for STALL_DAYS;
+    eta: projected completion date (ISO) at the current velocity, or None.
+    """
+    now = now if now is not None else time.time()
+    if not history:
+        return {"velocity": 0.0, "stalled": False, "eta": None}
+    
+    last_time, done, total = history[-1]
+    
+    # Baseline: the last snapshot at or before the window start (else the first)
+    window_start = now - VELOCITY_WINDOW_DAYS * 86400
+    baseline = history[0]
+    for snapshot in history:
+        if snapshot[0] > window_start:
+            break
+        baseline = snapshot
+    days = max((now - max(baseline[0], window_start)) / 86400, 1)
+    velocity = max(done - baseline[1], 0) / days
+    
+    finished = status == "complete" or (total and done >= total)
+    eta = None
+    if finished:
+        eta = datetime.fromtimestamp(last_time).date().isoformat()
+    elif velocity > 0:
+        eta = (datetime.fromtimestamp(now) + timedelta(days=(total - done) / velocity)).date().isoformat()
+    
+    return {
+        "velocity": round(velocity, 2),
+        "stalled": not finished and now - last_time >= STALL_DAYS * 86400,
+        "eta": eta
+    }
+
+# ============================================
+# GIT ACTIVITY
+# ============================================
+#
+# Branch, last commit time and dirty state per project, read straight from
+# .git (HEAD, loose refs, packed-refs, loose commit objects, reflogs).
+# Only the dirty check needs git itself: every repo that needs one goes
+# through a single `git for-each-repo ... status` call. Results are cached
+# in ~/.vibecoding/git_cache.json and reused while HEAD, the branch ref,
+# packed-refs and the index keep their mtimes (dirty state at most
+# GIT_DIRTY_TTL seconds old, since editing files touches none of them).
+
+GIT_DIRTY_TTL = 300
+GIT_BATCH_SIZE = 200  # repos per git call (keeps the command line short)
+GIT_TIMEOUT = 60
+
+def get_git_cache_path():
+    """Get cache file of per-project git activity."""
+    return get_analytics_dir() / "git_cache.json"
+
+def _find_git_dir(project_path):
+    """Return the .git directory of a project (following 'gitdir:' files) or None."""
+    git = Path(project_path) / ".git"
+    try:
+        if git.is_dir():
+            return git
+        if git.is_file():
+            target = git.read_text(encoding='utf-8').strip()
+            if target.startswith("gitdir:"):
+                git_dir = Path(project_path) / target[len("gitdir:"):].strip()
+                return git_dir if git_dir.is_dir() else None
+    except OSError:
+        pass
+    return None
+
+def _git_common_dir(git_dir):
+    """Refs and objects of linked worktrees live in the main repository."""
+    try:
+        common = (git_dir / "commondir").read_text(encoding='utf-8').strip()
+        return (git_dir / common).resolve()
+    except OSError:
+        return git_dir
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+def _read_head(git_dir):
+    """Return (branch ref or None, sha or None) from HEAD."""
+    head = (git_dir / "HEAD").read_text(encoding='utf-8').strip()
+    if head.startswith("ref:"):
+        return head[4:].strip(), None
+    return None, head
+
+def _resolve_ref(common_dir, ref):
+    """Loose ref file first, then packed-refs. Returns sha or None."""
+    try:
+        return (common_dir / ref).read_text(encoding='utf-8').strip()
+    except OSError:
+        pass
+    try:
+        with open(common_dir / "packed-refs", 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref:
+                    return parts[0]
+    except OSError:
+        pass
+    return None
+
+def _commit_time(common_dir, sha):
+    """Committer time of a loose commit object (None when packed or missing)."""
+    try:
+        with open(common_dir / "objects" / sha[:2] / sha[2:], 'rb') as f:
+            data = zlib.decompressobj().decompress(f.read(), 4096)
+    except (OSError, zlib.error, TypeError):
+        return None
+    for line in data.split(b"\n"):
+        if line.startswith(b"committer "):
+            try:
+                return int(line.rsplit(b" ", 2)[1])
+            except (ValueError, IndexError):
+                return None
+        if not line:
+            break
+    return None
+
+def _reflog_time(git_dir, common_dir, ref):
+    """Time of the newest reflog entry for ref (or HEAD)."""
+    for path in ([common_dir / "logs" / ref] if ref else []) + [git_dir / "logs" / "HEAD"]:
+        try:
+            with open(path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - 4096))
+                last = f.read().rstrip(b"\n").rsplit(b"\n", 1)[-1]
+            return int(last.split(b"\t", 1)[0].rsplit(b" ", 2)[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    return None
+
+# Shell alias run by for-each-repo in every repo: a marker line before each
+# status output (so a repo that fails cannot shift later results onto the
+# wrong repo) and a failure marker instead of a non-zero exit (which would
+# stop for-each-repo).
+GIT_REPO_MARKER = "# vibecoding.repo"
+GIT_FAILED_MARKER = "# vibecoding.failed"
+GIT_STATUS_ALIAS = (f'!echo "{GIT_REPO_MARKER}"; '
+                    f'git status --porcelain=v2 --branch --ignore-submodules || echo "{GIT_FAILED_MARKER}"')
+
+def _git_batch_status(repos):
+    """
+    Dirty flag for many repos with one git process per GIT_BATCH_SIZE repos.
+    Returns {work tree: bool}; repos whose status failed stay unknown.
+    """
+    dirty = {}
+    for start in range(0, len(repos), GIT_BATCH_SIZE):
+        batch = repos[start:start + GIT_BATCH_SIZE]
+        cmd = ["git", "-c", f"alias.vibecoding-status={GIT_STATUS_ALIAS}"]
+        for repo in batch:
+            cmd += ["-c", f"vibecoding.repo={repo}"]
+        cmd += ["for-each-repo", "--config=vibecoding.repo", "vibecoding-status"]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8',
+                                    errors='replace', timeout=GIT_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            log_error("git status batch failed", e)
+            return dirty
+        
+        # Every repo's output starts with GIT_REPO_MARKER, in config order
+        position = -1
+        for line in result.stdout.splitlines():
+            if line == GIT_REPO_MARKER:
+                position += 1
+                if position < len(batch):
+                    dirty[batch[position]] = False
+            elif position < 0 or position >= len(batch):
+                continue
+            elif line == GIT_FAILED_MARKER:
+                dirty.pop(batch[position], None)
+            elif line and not line.startswith("#"):
+                dirty[batch[position]] = True
+        if result.returncode != 0 or position + 1 != len(batch):
+            log_error(f"git for-each-repo answered for {position + 1} of {len(batch)} repos: "
+                      f"{result.stderr.strip()[:200]}")
+    return dirty
+
+def get_git_activity(progress_data, partial=False):
+    """
+    Add branch, last_commit (ISO) and dirty to progress entries in place.
+    Projects that are not git repositories get None values.
+    partial: progress_data is a subset (one dashboard page); the cache keeps
+    the other projects instead of being pruned to this list.
+    """
+    path = get_git_cache_path()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if not isinstance(cache, dict):
+            cache = {}
+    except FileNotFoundError:
+        cache = {}
+    except Exception as e:
+        log_error("Error loading git cache, rebuilding", e)
+        cache = {}
+    
+    now = time.time()
+    fresh = {}
+    need_status = {}  # work tree -> cache key
+    for entry in progress_data:
+        entry.update({"branch": None, "last_commit": None, "dirty": None})
+        project_path = entry.get("path")
+        git_dir = _find_git_dir(project_path) if project_path else None
+        if git_dir is None:
+            continue
+        try:
+            common_dir = _git_common_dir(git_dir)
+            ref, sha = _read_head(git_dir)
+            signature = [_mtime_ns(git_dir / "HEAD"), _mtime_ns(common_dir / "packed-refs"),
+                         _mtime_ns(common_dir / ref) if ref else 0, _mtime_ns(git_dir / "index")]
+            
+            cached = cache.get(project_path)
+            if not cached or cached["signature"] != signature:
+                sha = sha or (_resolve_ref(common_dir, ref) if ref else None)
+                when = (_commit_time(common_dir, sha) if sha else None) or _reflog_time(git_dir, common_dir, ref)
+                cached = {
+                    "signature": signature,
+                    "branch": ref.rsplit("refs/heads/", 1)[-1] if ref else (sha or "")[:7],
+                    "last_commit": datetime.fromtimestamp(when).isoformat(timespec="seconds") if when else None,
+                    "dirty": None,
+                    "checked": 0
+                }
+            if cached["dirty"] is None or now - cached["checked"] > GIT_DIRTY_TTL:
+                need_status[project_path] = cached
+            fresh[project_path] = cached
+        except Exception as e:
+            log_error(f"Cannot read git state of {project_path}", e)
+    
+    if need_status:
+        for work_tree, is_dirty in _git_batch_status(list(need_status)).items():
+            need_status[work_tree]["dirty"] = is_dirty
+            need_status[work_tree]["checked"] = now
+    
+    for entry in progress_data:
+        cached = fresh.get(entry.get("path"))
+        if cached:
+            entry.update(branch=cached["branch"], last_commit=cached["last_commit"], dirty=cached["dirty"])
+    
+    if partial:
+        fresh = {**cache, **fresh}
+    if fresh != cache and _write_json_file(path, fresh) is None:
+        log_error("Could not save git cache")
+    return progress_data
+
+def _git_label(entry):
+    """Short 'branch* 3d' label for dashboard rows ('' outside git)."""
+    if not entry.get("branch"):
+        return ""
+    label = entry["branch"][:6] + ("*" if entry.get("dirty") else "")
+    if entry.get("last_commit"):
+        age = time.time() - datetime.fromisoformat(entry["last_commit"]).timestamp()
+        for unit, seconds in (("w", 604800), ("d", 86400), ("h", 3600), ("m", 60)):
+            if age >= seconds:
+                label += f" {int(age // seconds)}{unit}"
+                break
+        else:
+            label += " now"
+    return label
+
+# ============================================
+# CHANGE DETECTION
+# ============================================
+#
+# fingerprints.json keeps, per project, the CONTEXT.md mtime/size, a hash
+# of its task lines and the state of each task (keyed by a short hash of
+# its text) as of the previous --since-last run. Unchanged files are
+# skipped with a single stat call; only changed ones are parsed.
+
+TASK_LINE_PATTERN = re.compile(r"^\s*[-*+]\s*\[([ xX/])\]\s*(.+?)\s*$", re.MULTILINE)
+TASK_STATES = {" ": "todo", "x": "done", "X": "done", "/": "doing"}
+CHANGE_FIELDS = ["done_delta", "total_delta", "checked", "unchecked", "started", "added", "removed", "new"]
+
+def get_fingerprints_path():
+    """Get file holding CONTEXT.md fingerprints from the previous --since-last run."""
+    return get_analytics_dir() / "fingerprints.json"
+
+def _task_key(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:10]
+
+def _read_tasks(context_path):
+    """Return [(key, state, text)] for every checkbox line, or None if unreadable."""
+    try:
+        raw = Path(context_path).read_bytes()
+    except Exception as e:
+        log_error(f"Cannot read tasks from {context_path}", e)
+        return None
+    try:
+        content = raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        content = raw.decode('latin-1')
+    return [(_task_key(text), TASK_STATES[mark], text) for mark, text in TASK_LINE_PATTERN.findall(content)]
+
+def _fingerprint(stat_result, tasks):
+    """Compact fingerprint of a CONTEXT.md and its task states."""
+    digest = hashlib.sha1()
+    for key, state, _ in tasks:
+        digest.update(f"{key}:{state};".encode('ascii'))
+    return {
+        "mtime": stat_result.st_mtime_ns,
+        "size": stat_result.st_size,
+        "tasks_hash": digest.hexdigest()[:16],
+        "tasks": {key: state for key, state, _ in tasks}
+    }
+
+def load_fingerprints():
+    """Load fingerprints from the previous run ({"run": iso time, "projects": {id: fp}})."""
+    path = get_fingerprints_path()
+    if path.exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get("projects"), dict):
+                return data
+            log_error("Fingerprints file has invalid structure, starting over")
+        except Exception as e:
+            log_error("Error loading fingerprints, starting over", e)
+    return {"run": None, "projects": {}}
+
+def _task_deltas(previous, tasks):
+    """Per-task changes between a previous fingerprint and the current task list."""
+    before = previous.get("tasks", {}) if previous else {}
+    deltas = {"checked": [], "unchecked": [], "started": [], "added": [], "removed": 0}
+    for key, state, text in tasks:
+        old = before.get(key)
+        if old is None:
+            if previous:
+                deltas["added"].append(text)
+        elif state == "done" and old != "done":
+            deltas["checked"].append(text)
+        elif old == "done" and state != "done":
+            deltas["unchecked"].append(text)
+        elif state == "doing" and old == "todo":
+            deltas["started"].append(text)
+    current = {key for key, _, _ in tasks}
+    deltas["removed"] = sum(1 for key in before if key not in current)
+    return deltas
+
+def _history_at(project_id, when):
+    """done/total at a point in time from the progress history (None if unknown)."""
+    baseline = None
+    for snapshot in read_progress_history(project_id):
+        if snapshot[0] > when:
+            break
+        baseline = snapshot
+    return baseline[1:] if baseline else None
+
+def detect_changes(since=None, update=True):
+    """
+    Find projects whose task list changed.
+    
+    since=None: compare with the fingerprints of the previous --since-last
+    run, then save the new ones (unless update=False).
+    since=datetime: projects whose CONTEXT.md was modified after `since`;
+    done/total deltas come from the progress history.
+    
+    Returns (changes, baseline_iso) where each change is a progress entry
+    plus done_delta, total_delta and (for --since-last) checked /
+    unchecked / started / added task texts and a removed count.
+    """
+    saved = load_fingerprints()
+    previous = saved["projects"]
+    fingerprints = {}
+    changes = []
+    since_ts = since.timestamp() if since else None
+    
+    for record in iter_projects():
+        project_id = record.get("id")
+        path = record.get("project_path", "")
+        if not project_id or not path:
+            continue
+        context_path = Path(path) / ".agent" / "CONTEXT.md"
+        try:
+            st = os.stat(context_path)
+        except OSError:
+            continue  # No CONTEXT.md (or project removed): nothing to compare
+    
+        prev = previous.get(project_id)
+        if since_ts is None:
+            if prev and prev["mtime"] == st.st_mtime_ns and prev["size"] == st.st_size:
+                fingerprints[project_id] = prev
+                continue
+        elif st.st_mtime < since_ts:
+            continue
+        
+        tasks = _read_tasks(context_path)
+        if tasks is None:
+            continue
+        fingerprint = _fingerprint(st, tasks)
+        fingerprints[project_id] = fingerprint
+        if since_ts is None and prev and prev["tasks_hash"] == fingerprint["tasks_hash"]:
+            continue  # Edited outside the task list
+        
+        entry = get_project_progress(record)
+        if since_ts is None:
+            # Counted over task lines on both sides
+            states = list(fingerprint["tasks"].values())
+            old_states = list(prev["tasks"].values()) if prev else []
+            entry["done_delta"] = states.count("done") - old_states.count("done")
+            entry["total_delta"] = len(states) - len(old_states)
+            entry.update(_task_deltas(prev, tasks))
+            entry["new"] = prev is None
+        else:
+            before = _history_at(project_id, since_ts)
+            if before is None:
+                # No snapshot that old: projects created since then start from
+                # zero, older ones from the earliest snapshot we have
+                history = read_progress_history(project_id)
+                created_before = str(record.get("timestamp", "")) < since.isoformat()
+                before = history[0][1:] if history and created_before else (0, 0)
+            entry["done_delta"] = entry.get("done", 0) - before[0]
+            entry["total_delta"] = entry.get("total", 0) - before[1]
+        changes.append(entry)
+    
+    if since_ts is None and update:
+        # Fingerprints of unchanged projects are carried over
+        data = {"run": datetime.now().isoformat(timespec="seconds"), "projects": fingerprints}
+        if _write_json_file(get_fingerprints_path(), data) is None:
+            log_error("Could not save fingerprints")
+    
+    baseline = since.isoformat(timespec="seconds") if since else saved["run"]
+    return changes, baseline
+
+def render_changes(changes, baseline):
+    """Render a change report as a list of lines."""
+    if not baseline:
+        return ["", f"LAN CHAY DAU TIEN: da luu moc cho {len(changes)} project", ""]
+    
+    lines = ["", f"THAY DOI TU {baseline.replace('T', ' ')}: {len(changes)} project", ""]
+    for p in changes:
+        delta = f"{p['done_delta']:+d} xong"
+        if p["total_delta"]:
+            delta += f", {p['total_delta']:+d} task"
+        tag = " (moi)" if p.get("new") else ""
+        lines.append(f"  {p['name'][:25]:<25} {p.get('progress', 0):>3}%  ({delta}){tag}")
+        for text in p.get("checked", []):
+            lines.append(f"      [x] {text[:60]}")
+        for text in p.get("started", []):
+            lines.append(f"      [/] {text[:60]}")
+        for text in p.get("unchecked", []):
+            lines.append(f"      [ ] {text[:60]}")
+        for text in p.get("added", [])[:5]:
+            lines.append(f"      +   {text[:60]}")
+        if p.get("removed"):
+            lines.append(f"      -   {p['removed']} task da xoa")
+    if not changes:
+        lines.append("  Khong co thay doi")
+    lines.append("")
+    return lines
+
+# ============================================
+# CONTEXT.MD DETAILS
+# ============================================
+#
+# Structured view of the sections generate_context_md() creates: the
+# Project Status table, Important Decisions table, Known Issues and Next
+# Steps lists and the Current Focus. Parsed records are cached per
+# project in ~/.vibecoding/context_cache.json, keyed by CONTEXT.md
+# mtime/size, so fleet queries only re-read files that changed.
+
+CONTEXT_DETAIL_SECTIONS = ("status", "decisions", "issues", "next_steps")
+CONTEXT_PARSER_VERSION = 1  # bump when parse_context_details output changes
+_LIST_ITEM_PATTERN = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+(?:\[([ xX/])\]\s*)?(.+?)\s*$")
+
+def get_context_cache_path():
+    """Get cache file of parsed CONTEXT.md details."""
+    return get_analytics_dir() / "context_cache.json"
+
+def _table_cells(line):
+    """'| a | **b** | (Ví dụ: ...) |' -> ['a', 'b', ''] (placeholder cells emptied)"""
+    cells = [cell.strip().strip("*").strip() for cell in line.strip().strip("|").split("|")]
+    return ["" if _PLACEHOLDER_PATTERN.fullmatch(cell) else cell for cell in cells]
+
+def parse_context_details(context_path):
+    """
+    Parse the structured sections of a CONTEXT.md.
+    
+    Returns dict with:
+        - status: {phase, started, last_updated, project_types} (keys from the table)
+        - decisions: [{decision, reason, date}]
+        - issues: [{text, done}]
+        - next_steps: [{text, done}]
+        - focus: str
+    Template placeholders such as "(Chưa có issues ...)" are skipped.
+    """
+    details = {"status": {}, "decisions": [], "issues": [], "next_steps": [], "focus": ""}
+    
+    for section, line in _read_sections(context_path):
+        stripped = line.strip()
+        if section == "project status" and stripped.startswith("|"):
+            cells = _table_cells(stripped)
+            if len(cells) >= 2 and cells[0] and cells[0].lower() != "field" and not set(cells[0]) <= set("-: "):
+                details["status"][re.sub(r"\W+", "_", cells[0].lower()).strip("_")] = cells[1]
+        elif section == "important decisions" and stripped.startswith("|"):
+            cells = _table_cells(stripped) + ["", ""]
+            if cells[0].lower() != "decision" and not set(cells[0]) <= set("-: "):
+                details["decisions"].append({"decision": cells[0], "reason": cells[1], "date": cells[2]})
+        elif section in ("known issues", "next steps"):
+            match = _LIST_ITEM_PATTERN.match(line)
+            if match:
+                key = "issues" if section == "known issues" else "next_steps"
+                details[key].append({"text": match.group(2), "done": (match.group(1) or "").lower() == "x"})
+        elif section == "current focus" and not details["focus"]:
+            text = stripped.lstrip(">").strip().strip("*").strip()
+            if text and not set(text) <= set("-") and not text.startswith("Đang làm gì?"):
+                details["focus"] = text
+    return details
+
+def get_context_details(projects=None):
+    """
+    Parsed CONTEXT.md details for every tracked project (or the given records).
+    Returns {project id: details}; only files whose mtime/size changed are re-read.
+    """
+    path = get_context_cache_path()
+    cache = {}
+    if path.exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if isinstance(saved, dict) and saved.get("version") == CONTEXT_PARSER_VERSION:
+                cache = saved.get("projects", {})
+        except Exception as e:
+            log_error("Error loading CONTEXT.md details cache, rebuilding", e)
+    
+    details = {}
+    fresh = {}
+    dirty = False
+    for record in projects if projects is not None else iter_projects():
+        project_id, project_path = record.get("id"), record.get("project_path", "")
+        if not project_id or not project_path:
+            continue
+        context_path = Path(project_path) / ".agent" / "CONTEXT.md"
+        try:
+            st = os.stat(context_path)
+        except OSError:
+            continue
+        
+        entry = cache.get(project_id)
+        if not entry or entry.get("mtime") != st.st_mtime_ns or entry.get("size") != st.st_size:
+            try:
+                entry = {"mtime": st.st_mtime_ns, "size": st.st_size,
+                         "data": parse_context_details(context_path)}
+            except Exception as e:
+                log_error(f"Cannot parse details of {context_path}", e)
+                continue
+            dirty = True
+        fresh[project_id] = entry
+        details[project_id] = entry["data"]
+    
+    # Entries for other projects are kept when only a subset was asked for
+    if projects is None and set(cache) - set(fresh):
+        dirty = True
+    elif projects is not None:
+        fresh = {**cache, **fresh}
+    if dirty and _write_json_file(path, {"version": CONTEXT_PARSER_VERSION, "projects": fresh}) is None:
+        log_error("Could not save CONTEXT.md details cache")
+    return details
+
+def query_context(section, phase=None, include_done=False):
+    """
+    Fleet-wide rows from one details section.
+    
+    section: 'status', 'decisions', 'issues' or 'next_steps'
+    phase: only projects whose Project Status phase matches (case-insensitive)
+    include_done: also return issues / next steps ticked [x]
+    Returns list of dicts, each with project id, name and path.
+    """
+    projects = list(iter_projects())
+    details = get_context_details(projects)
+    rows = []
+    for record in projects:
+        data = details.get(record.get("id"))
+        if data is None:
+            continue
+        if phase and data["status"].get("phase", "").casefold() != phase.casefold():
+            continue
+        owner = {"id": record.get("id"), "name": record.get("project_name", "Unknown"),
+                 "path": record.get("project_path", "")}
+        if section == "status":
+            rows.append({**owner, **data["status"], "focus": data["focus"]})
+            continue
+        for item in data[section]:
+            if include_done or not item.get("done"):
+                rows.append({**owner, **item})
+    return rows
+
+def render_context_rows(section, rows):
+    """Render query_context() rows as text lines."""
+    titles = {"status": "TRANG THAI", "decisions": "QUYET DINH", "issues": "VAN DE DANG MO",
+              "next_steps": "BUOC TIEP THEO"}
+    lines = ["", f"{titles[section]}: {len(rows)}", ""]
+    for row in rows:
+        name = row["name"][:25]
+        if section == "status":
+            lines.append(f"  {name:<25} {row.get('phase', '?'):<12} cap nhat {row.get('last_updated', '?')}")
+        elif section == "decisions":
+            reason = f" ({row['reason']})" if row.get("reason") else ""
+            lines.append(f"  {name:<25} {row['decision']}{reason} {row.get('date', '')}".rstrip())
+        else:
+            mark = "[x] " if row.get("done") else ""
+            lines.append(f"  {name:<25} {mark}{row['text']}")
+    if not rows:
+        lines.append("  (trong)")
+    lines.append("")
+    return lines
+
+# ============================================
+# FULL-TEXT SEARCH
+# ============================================
+#
+# Inverted index over every tracked project's CONTEXT.md (and optionally
+# GEMINI.md) under ~/.vibecoding/search/:
+#   files.json        section names + one row per document (by doc number)
+#   postings-NN.json  term -> {doc number: [section id, tf, section id, tf, ...]}
+#   terms.json        doc number -> terms in the postings files (for merges)
+#   delta.json        doc number -> {term: [...]} for documents re-indexed
+#                     since the last merge (None = removed); overrides postings
+# Postings are split into SEARCH_BUCKETS files by term hash, so a query
+# reads one small file per term. Files are re-indexed only when their
+# mtime/size change, and only into delta.json; the buckets are rewritten
+# once the delta holds more than SEARCH_DELTA_LIMIT documents.
+
+SEARCH_BUCKETS = 256
+SEARCH_DELTA_LIMIT = 200
+SEARCH_FILES = ("CONTEXT.md", "GEMINI.md")
+SEARCH_INDEX_VERSION = "1.1"  # Bumped when tokenizing changes: the index is rebuilt
+SEARCH_TOKEN_PATTERN = re.compile(r"\w[\w.+#-]*[\w+#]|\w[+#]+|\w", re.UNICODE)
+# Matches in these sections rank higher (headings normalized, see _section_name)
+SEARCH_SECTION_WEIGHTS = {
+    "important decisions": 3.0,
+    "known issues": 2.5,
+    "next steps": 2.0,
+    "current focus": 2.0,
+    "tech stack": 1.5,
+    "project status": 1.5,
+    "completed features": 1.2,
+    "title": 1.2
+}
+# Template placeholder rows such as "| (Ví dụ: Dùng PostgreSQL) | ... | 2025-01-01 |"
+_PLACEHOLDER_PATTERN = re.compile(r"\([^)]*\)")
+_PLACEHOLDER_LEFTOVER = re.compile(r"[|\s\d:.-]")
+
+def get_search_dir():
+    """Get directory holding the full-text search index."""
+    return get_analytics_dir() / "search"
+
+def _tokenize(text):
+    """Lowercased search terms; dotted and +/# names stay whole (node.js, c++, c#, f#)."""
+    return [t for t in SEARCH_TOKEN_PATTERN.findall(text.lower()) if len(t) > 1]
+
+def _section_name(heading):
+    """'## 📝 Important Decisions' -> 'important decisions'."""
+    return re.sub(r"[^\w\s]", "", heading.lstrip("#")).strip().lower() or "title"
+
+def _is_placeholder(line):
+    return "(" in line and not _PLACEHOLDER_LEFTOVER.sub("", _PLACEHOLDER_PATTERN.sub("", line))
+
+def _read_sections(path):
+    """Yield (section, line) for every meaningful line of a markdown file."""
+    raw = Path(path).read_bytes()
+    try:
+        content = raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        content = raw.decode('latin-1')
+    
+    section = "title"
+    for line in content.splitlines():
+        if line.startswith("#"):
+            section = "title" if line.startswith("# ") else _section_name(line)
+            if not line.startswith("# "):
+                continue
+        if line.strip() and not _is_placeholder(line):
+            yield section, line
+
+def _index_document(path):
+    """Return {term: {section: tf}} for one file."""
+    terms = {}
+    for section, line in _read_sections(path):
+        for term in _tokenize(line):
+            sections = terms.setdefault(term, {})
+            sections[section] = sections.get(section, 0) + 1
+    return terms
+
+def _bucket_path(bucket):
+    return get_search_dir() / f"postings-{bucket:02d}.json"
+
+def _bucket_for(term):
+    return zlib.crc32(term.encode('utf-8')) % SEARCH_BUCKETS
+
+def _load_json_or(path, default):
+    if not path.exists():
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else default
+    except Exception as e:
+        log_error(f"Error loading search index file {path.name}, rebuilding it", e)
+        return default
+
+def _load_search_meta():
+    """files.json: {"sections": [names], "docs": [[key, project id, name, file, mtime, size] | None]}."""
+    meta = _load_json_or(get_search_dir() / "files.json", {})
+    if not isinstance(meta.get("docs"), list) or not isinstance(meta.get("sections"), list) \
+            or meta.get("version") != SEARCH_INDEX_VERSION:
+        return {"version": SEARCH_INDEX_VERSION, "sections": [], "docs": []}
+    return meta
+
+def _reset_search_index():
+    """Drop postings, terms and delta so an empty files.json starts over cleanly."""
+    search_dir = get_search_dir()
+    for bucket in range(SEARCH_BUCKETS):
+        _bucket_path(bucket).unlink(missing_ok=True)
+    (search_dir / "terms.json").unlink(missing_ok=True)
+    (search_dir / "delta.json").unlink(missing_ok=True)
+
+def _search_index_needs_reset(meta):
+    """Postings must exist for every indexed doc, and none may be left from
+    an older index (doc numbers are reused)."""
+    if meta["docs"]:
+        return not all(_bucket_path(b).exists() for b in range(SEARCH_BUCKETS))
+    return _bucket_path(0).exists()
+
+def _index_search_document(file_path):
+    """_index_document(), or None (logged) when the file cannot be read."""
+    try:
+        return _index_document(file_path)
+    except Exception as e:
+        log_error(f"Cannot index {file_path}", e)
+        return None
+
+def update_search_index(include_gemini=False):
+    """
+    Bring the search index up to date. Only files whose mtime/size changed
+    (or that appeared / disappeared) are re-read. Returns number of files re-indexed.
     
-    # Try multiple encodings
-    content = None
-    encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
+    Files are read and tokenized without the analytics lock, so writers
+    such as track_project never wait on a large re-index; the lock is only
+    held to fold the results into the index files.
+    """
+    kinds = SEARCH_FILES if include_gemini else SEARCH_FILES[:1]
+    search_dir = get_search_dir()
     
-    for encoding in encodings:
-        try:
-            with open(context_path, 'r', encoding=encoding) as f:
-                content = f.read()
-            break  # Success
-        except UnicodeDecodeError:
+    snapshot = _load_search_meta()
+    known = {} if _search_index_needs_reset(snapshot) else \
+        {doc[0]: doc[4:6] for doc in snapshot["docs"] if doc}
+    found = {}  # doc key -> [doc key, project id, name, file, mtime, size]
+    indexed = {}  # doc key -> {term: {section: tf}} (None when unreadable)
+    for record in iter_projects():
+        project_id, path = record.get("id"), record.get("project_path", "")
+        if not project_id or not path:
             continue
-        except PermissionError as e:
-            log_error(f"Permission denied: {context_path}", e)
-            return {
-                "progress": 0,
-                "status": "error",
-                "current_phase": "Permission denied",
-                "done": 0,
-                "total": 0
+        for kind in kinds:
+            file_path = Path(path) / ".agent" / kind
+            doc_key = f"{project_id}:{kind}"
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            found[doc_key] = [doc_key, project_id, record.get("project_name", "Unknown"),
+                              str(file_path), st.st_mtime_ns, st.st_size]
+            if known.get(doc_key) != [st.st_mtime_ns, st.st_size]:
+                indexed[doc_key] = _index_search_document(file_path)
+    
+    with analytics_lock():
+        # Another process may have updated (or reset) the index meanwhile
+        meta = _load_search_meta()
+        delta = _load_json_or(search_dir / "delta.json", {})
+        if _search_index_needs_reset(meta):
+            _reset_search_index()
+            meta, delta = {"version": SEARCH_INDEX_VERSION, "sections": [], "docs": []}, {}
+        
+        docs = meta["docs"]
+        sections = meta["sections"]
+        section_ids = {name: i for i, name in enumerate(sections)}
+        numbers = {doc[0]: n for n, doc in enumerate(docs) if doc}
+        
+        changed = {}  # doc number -> {term: [section id, tf, ...]} (None when the file is gone)
+        for doc_key, row in found.items():
+            n = numbers.get(doc_key)
+            if n is not None and docs[n][4:6] == row[4:6]:
+                continue
+            if doc_key in indexed:
+                terms = indexed[doc_key]
+            else:  # Unchanged in the snapshot we compared against, not in this one
+                terms = _index_search_document(Path(row[3]))
+            if terms is None:
+                continue
+            if n is None:
+                n = numbers[doc_key] = len(docs)
+                docs.append(None)
+            docs[n] = row
+            changed[n] = {}
+            for term, by_section in terms.items():
+                flat = changed[n][term] = []
+                for section, tf in by_section.items():
+                    if section not in section_ids:
+                        section_ids[section] = len(sections)
+                        sections.append(section)
+                    flat += [section_ids[section], tf]
+        for doc_key, n in numbers.items():
+            if doc_key.split(":", 1)[1] in kinds and doc_key not in found:
+                changed[n] = None
+                docs[n] = None
+        
+        if not changed:
+            return 0
+        
+        search_dir.mkdir(parents=True, exist_ok=True)
+        delta.update((str(n), terms) for n, terms in changed.items())
+        delta_checksum = _write_json_file(search_dir / "delta.json", delta)
+        if delta_checksum is None or _write_json_file(search_dir / "files.json", meta) is None:
+            log_error("Could not save search index")
+            return len(changed)
+
+    # Searches already see the delta; folding it into the buckets can wait
+    if len(delta) > SEARCH_DELTA_LIMIT or not _bucket_path(0).exists():
+        _merge_search_delta(delta, delta_checksum)
+    return len(changed)
+
+def _merge_search_delta(delta, delta_checksum):
+    """
+    Fold delta.json documents into the postings buckets. The new buckets
+    and terms.json are written to a temp directory without the lock, then
+    swapped in under it, unless delta.json changed meanwhile (another
+    update or merge got there first; the delta is merged next time).
+    """
+    search_dir = get_search_dir()
+    doc_terms = _load_json_or(search_dir / "terms.json", {})
+    
+    # Group posting edits by bucket: drop each doc's old terms, add the new ones
+    edits = {}
+    for doc_n, terms in delta.items():
+        for term in doc_terms.get(doc_n, []):
+            edits.setdefault(_bucket_for(term), {}).setdefault(doc_n, {})
+        for term, flat in (terms or {}).items():
+            edits.setdefault(_bucket_for(term), {}).setdefault(doc_n, {})[term] = flat
+    
+    with tempfile.TemporaryDirectory(prefix="merge-", dir=search_dir) as temp_dir:
+        swaps = []  # (new file, live file)
+        for bucket in range(SEARCH_BUCKETS):
+            if bucket not in edits and _bucket_path(bucket).exists():
+                continue
+            postings = _load_json_or(_bucket_path(bucket), {})
+            for doc_n, new_terms in edits.get(bucket, {}).items():
+                for term in doc_terms.get(doc_n, []):
+                    entries = postings.get(term)
+                    if entries is not None:
+                        entries.pop(doc_n, None)
+                        if not entries:
+                            del postings[term]
+                for term, flat in new_terms.items():
+                    postings.setdefault(term, {})[doc_n] = flat
+            new_path = Path(temp_dir) / _bucket_path(bucket).name
+            if _write_json_file(new_path, postings) is None:
+                log_error(f"Could not save search bucket {bucket}")
+                return False
+            swaps.append((new_path, _bucket_path(bucket)))
+    
+        for doc_n, terms in delta.items():
+            if terms is None:
+                doc_terms.pop(doc_n, None)
+            else:
+                doc_terms[doc_n] = list(terms)
+        new_path = Path(temp_dir) / "terms.json"
+        if _write_json_file(new_path, doc_terms) is None:
+            log_error("Could not save search terms")
+            return False
+        swaps.append((new_path, search_dir / "terms.json"))
+        
+        with analytics_lock():
+            delta_path = search_dir / "delta.json"
+            if not delta_path.exists() or _file_checksum(delta_path) != delta_checksum:
+                return False
+            for new_path, live_path in swaps:
+                os.replace(new_path, live_path)
+            _fsync_dir(search_dir)
+            return _write_json_file(delta_path, {}) is not None
+
+def search_projects(query, include_gemini=False, limit=10):
+    """
+    Search the index (call update_search_index first). Every query term must
+    match; documents are ranked by sum of section weight * (1 + log tf) * idf.
+    Returns list of {id, name, file, score, section, snippet}.
+    """
+    terms = list(dict.fromkeys(_tokenize(query)))
+    if not terms:
+        return []
+    meta = _load_search_meta()
+    docs, sections = meta["docs"], meta["sections"]
+    kinds = SEARCH_FILES if include_gemini else SEARCH_FILES[:1]
+    allowed = {str(n) for n, doc in enumerate(docs) if doc and doc[0].split(":", 1)[1] in kinds}
+    delta = _load_json_or(get_search_dir() / "delta.json", {})
+    
+    buckets = {}
+    matches = None
+    per_term = []
+    for term in terms:
+        bucket = _bucket_for(term)
+        if bucket not in buckets:
+            buckets[bucket] = _load_json_or(_bucket_path(bucket), {})
+        # Documents in the delta override their (stale) postings
+        entries = {n: flat for n, flat in buckets[bucket].get(term, {}).items() if n not in delta}
+        entries.update((n, d[term]) for n, d in delta.items() if d and term in d)
+        found = allowed.intersection(entries)
+        per_term.append((entries, 1 + math.log(len(allowed) / len(found)) if found else 0))
+        matches = found if matches is None else matches & found
+    if not matches:
+        return []
+    
+    results = []
+    for doc_n in matches:
+        section_scores = {}
+        for entries, idf in per_term:
+            flat = entries[doc_n]
+            for i in range(0, len(flat), 2):
+                section = sections[flat[i]]
+                points = SEARCH_SECTION_WEIGHTS.get(section, 1.0) * (1 + math.log(flat[i + 1])) * idf
+                section_scores[section] = section_scores.get(section, 0) + points
+        doc = docs[int(doc_n)]
+        results.append({
+            "id": doc[1],
+            "name": doc[2],
+            "file": doc[3],
+            "score": round(sum(section_scores.values()), 3),
+            "section": max(section_scores, key=section_scores.get)
+        })
+    
+    results = heapq.nlargest(limit, results, key=lambda r: r["score"])
+    for r in results:
+        r["snippet"] = _search_snippet(r["file"], r["section"], terms)
+    return results
+
+def _search_snippet(path, section, terms):
+    """First line of the best section containing a query term."""
+    try:
+        fallback = ""
+        for line_section, line in _read_sections(path):
+            tokens = set(_tokenize(line))
+            if any(t in tokens for t in terms):
+                if line_section == section:
+                    return line.strip()[:100]
+                fallback = fallback or line.strip()[:100]
+        return fallback
+    except Exception:
+        return ""
+
+def render_search_results(query, results):
+    """Render search results as a list of lines."""
+    lines = ["", f"TIM KIEM: {query} ({len(results)} ket qua)", ""]
+    for i, r in enumerate(results, 1):
+        lines.append(f"  {i}. {r['name'][:30]:<30} [{r['section']}]  {r['score']:g}")
+        if r["snippet"]:
+            lines.append(f"     {r['snippet']}")
+    if not results:
+        lines.append("  Khong tim thay")
+    lines.append("")
+    return lines
+
+# ============================================
+# STATISTICS
+# ============================================
+
+# Aggregates understood by aggregate_stats(). "status" expands to the
+# complete / in_progress / paused counters. Only the PROGRESS_AGGREGATES
+# need CONTEXT.md parsing; the rest come from the analytics records alone.
+STATS_AGGREGATES = ("total", "status", "top_tech", "type_counts", "projects")
+PROGRESS_AGGREGATES = {"status", "projects"}
+STATS_KEY_ORDER = ("total", "complete", "in_progress", "paused", "top_tech", "type_counts", "projects")
+TOP_TECH_LIMIT = 5
+
+def get_stats_summary(aggregates=STATS_AGGREGATES):
+    """
+    Get summary statistics (from the indexer daemon when it is running).
+    aggregates: subset of STATS_AGGREGATES to compute, e.g. ("total", "top_tech").
+    """
+    stats = query_indexer("summary")
+    if stats is not None:
+        stats["top_tech"] = [tuple(item) for item in stats["top_tech"]]
+        return stats
+    
+    try:
+        # Record-level counters come from the materialized summary; only
+        # progress aggregates still need a pass over the records.
+        wanted = set(aggregates)
+        totals = load_summary() if wanted - PROGRESS_AGGREGATES else None
+        if totals is None:
+            return aggregate_stats(iter_projects(), aggregates)
+        
+        stats = {}
+        if wanted & PROGRESS_AGGREGATES:
+            started = time.perf_counter()
+            with span("progress_scan"):
+                stats = aggregate_stats(iter_projects(), wanted & PROGRESS_AGGREGATES)
+            observe_scan(time.perf_counter() - started)
+        if "total" in wanted:
+            stats["total"] = totals["total"]
+        if "top_tech" in wanted:
+            stats["top_tech"] = heapq.nlargest(TOP_TECH_LIMIT, totals["tech_counts"].items(), key=lambda x: x[1])
+        if "type_counts" in wanted:
+            stats["type_counts"] = totals["type_counts"]
+        return {key: stats[key] for key in STATS_KEY_ORDER if key in stats}
+    except Exception as e:
+        log_error("Error aggregating stats", e)
+        return aggregate_stats([], aggregates)
+
+def aggregate_stats(projects, aggregates=STATS_AGGREGATES, progress_data=None):
+    """
+    Compute the requested aggregates in a single pass over project records.
+    
+    progress_data: progress entries matching `projects` one-to-one (e.g. from
+    the watch/indexer cache); when omitted they are computed on the fly, and
+    only if a progress aggregate was requested.
+    """
+    wanted = set(aggregates)
+    need_progress = bool(wanted & PROGRESS_AGGREGATES)
+    keep_entries = "projects" in wanted
+    count_types = "type_counts" in wanted
+    count_stacks = "top_tech" in wanted
+    
+    total = 0
+    status_counts = {}
+    tech_counts = {}
+    type_counts = {}
+    entries = []
+    cached = iter(progress_data) if progress_data is not None else None
+    
+    for p in projects:
+        if need_progress:
+            entry = next(cached) if cached is not None else get_project_progress(p)
+            status = entry.get("status")
+            status_counts[status] = status_counts.get(status, 0) + 1
+            if keep_entries:
+                entries.append(entry)
+        total += 1  # Deleted projects count until their tombstone expires
+        if count_types:
+            for t in p.get("project_types", []):
+                type_counts[t] = type_counts.get(t, 0) + 1
+        if count_stacks:
+            _count_stack(p.get("tech_stack") or {}, tech_counts)
+    
+    stats = {}
+    if "total" in wanted:
+        stats["total"] = total
+    if "status" in wanted:
+        stats["complete"] = status_counts.get("complete", 0)
+        stats["in_progress"] = status_counts.get("in-progress", 0)
+        stats["paused"] = status_counts.get("paused", 0)
+    if count_stacks:
+        stats["top_tech"] = heapq.nlargest(TOP_TECH_LIMIT, tech_counts.items(), key=lambda x: x[1])
+    if count_types:
+        stats["type_counts"] = type_counts
+    if keep_entries:
+        stats["projects"] = entries
+    return stats
+    
+def summarize_stats(projects, progress_data):
+    """Build summary statistics from project records and their progress entries."""
+    return aggregate_stats(projects, progress_data=progress_data)
+
+# ============================================
+# FLEET REPORT
+# ============================================
+#
+# Progress distributions across the whole fleet. Vectorized with NumPy
+# when it is installed, same results from plain Python otherwise.
+
+REPORT_PERCENTILES = (25, 50, 75, 90)
+HISTOGRAM_BINS = 10  # 0-9%, 10-19%, ... 90-100%
+REPORT_TECH_LIMIT = 10
+
+def _report_columns(progress_data):
+    """
+    Flatten progress entries (deleted projects excluded) into columns:
+    progress values, complete flags, creation months and main tech names.
+    Tech stacks are streamed from the shards, matched by record id.
+    """
+    live = [p for p in progress_data if p.get("status") != "deleted"]
+    wanted_ids = {p.get("id") for p in live}
+    techs_by_id = {}
+    for record in iter_projects():
+        if record.get("id") in wanted_ids:
+            counts = {}
+            _count_stack(record.get("tech_stack") or {}, counts)
+            techs_by_id[record.get("id")] = list(counts)
+    
+    return (
+        [p.get("progress", 0) for p in live],
+        [p.get("status") == "complete" for p in live],
+        [str(p.get("created") or "")[:7] or UNDATED_SHARD for p in live],
+        [techs_by_id.get(p.get("id"), []) for p in live]
+    )
+
+def _percentile(sorted_values, q):
+    """Linear-interpolated percentile (same method as numpy.percentile)."""
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+def _report_numpy(progress, complete, months, techs):
+    """Vectorized distributions."""
+    values = np.asarray(progress, dtype=float)
+    done = np.asarray(complete, dtype=bool)
+    
+    percentiles = np.percentile(values, REPORT_PERCENTILES) if len(values) else np.zeros(len(REPORT_PERCENTILES))
+    histogram = np.histogram(values, bins=HISTOGRAM_BINS, range=(0, 100))[0]
+    month_keys, month_counts = np.unique(np.asarray(months, dtype=str), return_counts=True) \
+        if months else ([], [])
+    
+    # One (project, tech) pair per used technology
+    names = sorted({t for stack in techs for t in stack})
+    position = {name: i for i, name in enumerate(names)}
+    owners = np.fromiter((i for i, stack in enumerate(techs) for _ in stack), dtype=np.int64)
+    tech_ids = np.fromiter((position[t] for stack in techs for t in stack), dtype=np.int64)
+    per_tech = np.bincount(tech_ids, minlength=len(names))
+    per_tech_done = np.bincount(tech_ids, weights=done[owners], minlength=len(names))
+    per_tech_progress = np.bincount(tech_ids, weights=values[owners], minlength=len(names))
+    
+    return (
+        [float(v) for v in percentiles],
+        [int(c) for c in histogram],
+        {str(m): int(c) for m, c in zip(month_keys, month_counts)},
+        {name: (int(per_tech[i]), int(per_tech_done[i]), float(per_tech_progress[i]))
+         for i, name in enumerate(names)}
+    )
+
+def _report_python(progress, complete, months, techs):
+    """Pure-Python distributions (NumPy not installed)."""
+    ordered = sorted(progress)
+    percentiles = [_percentile(ordered, q) if ordered else 0.0 for q in REPORT_PERCENTILES]
+    
+    histogram = [0] * HISTOGRAM_BINS
+    for value in progress:
+        histogram[min(max(int(value * HISTOGRAM_BINS // 100), 0), HISTOGRAM_BINS - 1)] += 1
+    
+    month_counts = {}
+    for month in months:
+        month_counts[month] = month_counts.get(month, 0) + 1
+    
+    per_tech = {}
+    for value, done, stack in zip(progress, complete, techs):
+        for tech in stack:
+            count, finished, total_progress = per_tech.get(tech, (0, 0, 0.0))
+            per_tech[tech] = (count + 1, finished + done, total_progress + value)
+    
+    return percentiles, histogram, dict(sorted(month_counts.items())), per_tech
+
+def fleet_report(progress_data=None):
+    """
+    Fleet-wide progress distributions.
+    
+    Returns dict: percentiles (p25..p90), histogram (HISTOGRAM_BINS counts
+    of 10% buckets), creation (projects per month + monthly average),
+    completion_by_tech (projects, complete, rate, avg_progress per
+    technology) and backend ('numpy' or 'python').
+    """
+    if progress_data is None:
+        progress_data = get_all_projects_progress()
+    
+    columns = _report_columns(progress_data)
+    compute = _report_numpy if np is not None else _report_python
+    percentiles, histogram, month_counts, per_tech = compute(*columns)
+    
+    dated = {m: c for m, c in month_counts.items() if m != UNDATED_SHARD}
+    if dated:
+        first, last = min(dated), max(dated)
+        span = (int(last[:4]) - int(first[:4])) * 12 + int(last[5:7]) - int(first[5:7]) + 1
+    else:
+        span = 0
+    
+    top_tech = heapq.nlargest(REPORT_TECH_LIMIT, per_tech.items(), key=lambda x: x[1][0])
+    return {
+        "backend": "numpy" if np is not None else "python",
+        "projects": len(columns[0]),
+        "percentiles": {f"p{q}": round(v, 1) for q, v in zip(REPORT_PERCENTILES, percentiles)},
+        "histogram": histogram,
+        "creation": {
+            "months": month_counts,
+            "per_month": round(sum(dated.values()) / span, 2) if span else 0.0
+        },
+        "completion_by_tech": {
+            tech: {
+                "projects": count,
+                "complete": int(finished),
+                "rate": round(finished / count * 100, 1),
+                "avg_progress": round(total_progress / count, 1)
             }
-        except Exception as e:
-            log_error(f"Error reading {context_path}", e)
+            for tech, (count, finished, total_progress) in top_tech
+        }
+    }
+
+# ============================================
+# METRICS EXPOSITION
+# ============================================
+#
+# Fleet stats in the Prometheus text format (0.0.4, which OpenMetrics
+# scrapers accept too). The long-running processes (watch, indexer,
+# --serve) rewrite ~/.vibecoding/metrics.prom atomically after each
+# progress pass, and `--serve` also answers GET /metrics. One-shot runs
+# (dashboard, --json) never touch the file: its *_total counters belong
+# to the process that wrote it, and vibecoding_process_start_time_seconds
+# tells scrapers when that process (and its counters) restarted. Totals,
+# types and tech come from the materialized summary and status / progress
+# from the entries that pass just computed, so exporting recomputes nothing.
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PROGRESS_BUCKETS = (10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+
+# Process-wide counters: progress passes, CONTEXT.md parses vs entries
+# reused from an in-memory index, summary.json served vs recounted, and
+# --serve responses served from cache vs built
+_metrics_counters = {
+    "scans": 0, "scan_seconds": 0.0, "last_scan_seconds": 0.0,
+    "progress_parsed": 0, "progress_reused": 0,
+    "summary_hits": 0, "summary_misses": 0,
+    "response_hits": 0, "response_misses": 0
+}
+_metrics_lock = threading.Lock()
+_process_started = time.time()
+
+def get_metrics_path():
+    """Get Prometheus text file kept by the watch / indexer / serve process."""
+    return get_analytics_dir() / "metrics.prom"
+
+def count_metric(name, amount=1):
+    """Add to one of the process-wide metric counters."""
+    with _metrics_lock:
+        _metrics_counters[name] += amount
+
+def observe_scan(seconds):
+    """Record the duration of a progress pass."""
+    with _metrics_lock:
+        _metrics_counters["scans"] += 1
+        _metrics_counters["scan_seconds"] += seconds
+        _metrics_counters["last_scan_seconds"] = seconds
+
+def _metric_family(lines, name, kind, help_text, samples):
+    """Append one metric family. samples: [(labels dict or None, value)]"""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        label_text = ",".join(
+            '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for k, v in (labels or {}).items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+def fleet_metric_lines(progress_data):
+    """Fleet gauges for a full list of progress entries (one pass, no parsing)."""
+    totals = load_summary() or {"total": 0, "type_counts": {}, "tech_counts": {}}
+    status_counts = {}
+    buckets = [0] * len(METRICS_PROGRESS_BUCKETS)
+    progress_sum = live = complete = done = tasks = 0
+    for p in progress_data:
+        status = p.get("status")
+        status_counts[status] = status_counts.get(status, 0) + 1
+        if status in ("deleted", "error"):
             continue
+        live += 1
+        complete += status == "complete"
+        progress = p.get("progress", 0)
+        progress_sum += progress
+        done += p.get("done", 0)
+        tasks += p.get("total", 0)
+        for i, bound in enumerate(METRICS_PROGRESS_BUCKETS):
+            if progress <= bound:
+                buckets[i] += 1
     
-    if content is None:
-        log_error(f"Could not read CONTEXT.md with any encoding: {context_path}")
-        return {
-            "progress": 0,
-            "status": "error",
-            "current_phase": "Cannot read file",
-            "done": 0,
-            "total": 0
-        }
+    lines = []
+    _metric_family(lines, "vibecoding_projects", "gauge", "Tracked projects (expired tombstones excluded).",
+                   [(None, totals["total"])])
+    _metric_family(lines, "vibecoding_projects_by_status", "gauge", "Projects per progress status.",
+                   [({"status": s}, c) for s, c in sorted(status_counts.items(), key=lambda x: str(x[0]))])
+    _metric_family(lines, "vibecoding_projects_by_type", "gauge", "Projects per project type.",
+                   [({"type": t}, c) for t, c in sorted(totals["type_counts"].items())])
+    _metric_family(lines, "vibecoding_projects_by_tech", "gauge", "Projects per technology.",
+                   [({"tech": t}, c) for t, c in sorted(totals["tech_counts"].items())])
+    _metric_family(lines, "vibecoding_completion_ratio", "gauge", "Share of live projects that are complete.",
+                   [(None, round(complete / live, 4) if live else 0)])
+    _metric_family(lines, "vibecoding_tasks", "gauge", "CONTEXT.md tasks across live projects.",
+                   [({"state": "done"}, done), ({"state": "all"}, tasks)])
+    lines.append("# HELP vibecoding_progress_percent Progress of live projects.")
+    lines.append("# TYPE vibecoding_progress_percent histogram")
+    for bound, count in zip(METRICS_PROGRESS_BUCKETS, buckets):
+        lines.append(f'vibecoding_progress_percent_bucket{{le="{bound}"}} {count}')
+    lines.append(f'vibecoding_progress_percent_bucket{{le="+Inf"}} {live}')
+    lines.append(f"vibecoding_progress_percent_sum {progress_sum}")
+    lines.append(f"vibecoding_progress_percent_count {live}")
+    return lines
+
+def process_metric_lines():
+    """Counters of this process (scan durations, cache hits)."""
+    with _metrics_lock:
+        c = dict(_metrics_counters)
+    lines = []
+    _metric_family(lines, "vibecoding_process_start_time_seconds", "gauge",
+                   "Start time of the process these counters belong to (unix seconds).",
+                   [(None, round(_process_started, 3))])
+    _metric_family(lines, "vibecoding_scans_total", "counter", "Full progress passes.", [(None, c["scans"])])
+    _metric_family(lines, "vibecoding_scan_seconds_total", "counter", "Time spent in progress passes.",
+                   [(None, round(c["scan_seconds"], 6))])
+    _metric_family(lines, "vibecoding_last_scan_seconds", "gauge", "Duration of the latest progress pass.",
+                   [(None, round(c["last_scan_seconds"], 6))])
+    for name, hits, misses, help_text in (
+            ("progress", "progress_reused", "progress_parsed", "Progress entries reused (hit) or parsed from CONTEXT.md (miss)."),
+            ("summary", "summary_hits", "summary_misses", "Materialized summary served as is (hit) or recounted (miss)."),
+            ("response", "response_hits", "response_misses", "Dashboard server responses from cache (hit) or built (miss).")):
+        _metric_family(lines, f"vibecoding_{name}_cache_requests_total", "counter", help_text,
+                       [({"result": "hit"}, c[hits]), ({"result": "miss"}, c[misses])])
+    return lines
+
+def render_metrics(progress_data=None, fleet_lines=None):
+    """Full exposition text. fleet_lines: precomputed fleet_metric_lines() to reuse."""
+    if fleet_lines is None:
+        fleet_lines = fleet_metric_lines(progress_data if progress_data is not None else get_all_projects_progress())
+    return "\n".join(fleet_lines + process_metric_lines()) + "\n"
+
+def write_metrics_file(progress_data):
+    """
+    Atomically rewrite metrics.prom (long-running processes only).
+    Returns the fleet lines, or None on failure.
+    """
+    path = get_metrics_path()
+    temp_path = path.with_name(path.name + '.tmp')
+    try:
+        fleet_lines = fleet_metric_lines(progress_data)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(render_metrics(fleet_lines=fleet_lines))
+        os.replace(temp_path, path)
+        return fleet_lines
+    except Exception as e:
+        log_error("Error writing metrics file", e)
+        return None
+
+# ============================================
+# DASHBOARD DISPLAY
+# ============================================
+
+def create_progress_bar(percent, width=20):
+    """Create ASCII progress bar."""
+    filled = int(width * percent / 100)
+    empty = width - filled
+    return "#" * filled + "-" * empty
+
+def render_dashboard(stats, rows, first_rank=1, page_info=None, report=None):
+    """
+    Render the dashboard box as a list of lines.
+    rows: the project entries to show (see select_projects), numbered from first_rank.
+    report: optional fleet_report() result, drawn as a histogram panel.
+    """
+    lines = [""]
+    lines.append("+" + "=" * 62 + "+")
+    lines.append("|" + " VIBECODING ANALYTICS DASHBOARD ".center(62) + "|")
+    lines.append("+" + "=" * 62 + "+")
+    lines.append("|" + " " * 62 + "|")
     
-    # Validate content
-    is_valid, issues = validate_context_content(content)
-    if not is_valid:
-        log_error(f"Invalid CONTEXT.md at {context_path}: {issues}")
-        # Continue anyway - try to extract what we can
+    # Overview section
+    lines.append("|  TONG QUAN" + " " * 51 + "|")
+    lines.append(f"|  +-- Tong projects: {stats['total']:<40}|")
+    lines.append(f"|  +-- Hoan thanh: {stats['complete']:<43}|")
+    lines.append(f"|  +-- Dang lam: {stats['in_progress']:<45}|")
+    lines.append(f"|  +-- Tam dung: {stats['paused']:<45}|")
+    lines.append("|" + " " * 62 + "|")
     
-    # Count checkboxes with error handling
+    # Projects progress section
+    if rows:
+        lines.append("|  TIEN DO TUNG PROJECT" + " " * 40 + "|")
+        if page_info:
+            lines.append(f"|  {page_info[:58]:<60}|")
+        lines.append("|  +" + "-" * 58 + "+  |")
+        
+        for i, p in enumerate(rows, first_rank):
+            name = p['name'][:25]
+            progress = p.get('progress', 0)
+            bar = create_progress_bar(progress, 15)
+            phase = p.get('current_phase', 'Unknown')[:20]
+            
+            if p.get('status') == 'complete':
+                phase = "[DONE]"
+            elif p.get('status') == 'deleted':
+                phase = "[DELETED]"
+            
+            if p.get('stalled'):
+                trend = "DUNG > %d ngay" % STALL_DAYS
+            elif p.get('eta') and p.get('status') != 'complete':
+                trend = f"ETA {p['eta']}"
+            else:
+                trend = ""
+            
+            label = f"{i}. {name}"
+            lines.append(f"|  | {label:<34}{trend:>22} |  |")
+            lines.append(f"|  |    {bar} {progress:>3}%  |  {phase[:17]:<17} {_git_label(p):>11}|  |")
+            if i < first_rank + len(rows) - 1:
+                lines.append("|  |" + " " * 58 + "|  |")
+        
+        lines.append("|  +" + "-" * 58 + "+  |")
+        lines.append("|" + " " * 62 + "|")
+    
+    # Tech stack section
+    if stats['top_tech']:
+        lines.append("|  TECH STACK PHO BIEN" + " " * 41 + "|")
+        total = stats['total'] if stats['total'] > 0 else 1
+        for tech, count in stats['top_tech'][:3]:
+            percent = round(count / total * 100)
+            bar = create_progress_bar(percent, 15)
+            tech_display = tech[:12]
+            lines.append(f"|  +-- {tech_display:<12} {bar} {percent:>3}%" + " " * (23 - len(tech_display)) + "|")
+        lines.append("|" + " " * 62 + "|")
+    
+    if report:
+        lines.extend(render_report_panel(report))
+    
+    lines.append("+" + "=" * 62 + "+")
+    lines.append("")
+    return lines
+
+def render_report_panel(report):
+    """Render the fleet report (percentiles, histogram, rates) as dashboard lines."""
+    lines = ["|  PHAN BO TIEN DO" + " " * 46 + "|"]
+    percentiles = "  ".join(f"{k}: {v:g}%" for k, v in report["percentiles"].items())
+    lines.append(f"|  +-- {percentiles[:56]:<56}|")
+    
+    histogram = report["histogram"]
+    peak = max(histogram) or 1
+    step = 100 // len(histogram)
+    for i, count in enumerate(histogram):
+        high = 100 if i == len(histogram) - 1 else (i + 1) * step - 1
+        label = f"{i * step}-{high}%"
+        bar = "#" * round(40 * count / peak)
+        lines.append(f"|  {label:>8} {bar:<40} {count:>6}    |")
+    
+    creation = f"Tao moi: {report['creation']['per_month']:g} project/thang"
+    lines.append(f"|  +-- {creation[:56]:<56}|")
+    for tech, info in list(report["completion_by_tech"].items())[:3]:
+        line = f"{tech[:12]:<12} hoan thanh {info['rate']:>5g}%  TB {info['avg_progress']:>5g}%"
+        lines.append(f"|  +-- {line[:56]:<56}|")
+    lines.append("|" + " " * 62 + "|")
+    return lines
+
+STD_OUTPUT_HANDLE = -11
+ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
+
+def _enable_vt_mode():
+    """Turn on ANSI escape processing for the Windows console (no subprocess)."""
     try:
-        done = content.count("[x]") + content.count("[X]")
-        pending = content.count("[ ]")
-        in_progress = content.count("[/]")
-        total = done + pending + in_progress
-    except Exception as e:
-        log_error(f"Error counting checkboxes", e)
-        done, pending, in_progress, total = 0, 0, 0, 0
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(STD_OUTPUT_HANDLE)
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False  # Not a console (redirected, or a terminal that is not conhost)
+        if mode.value & ENABLE_VIRTUAL_TERMINAL_PROCESSING:
+            return True
+        return bool(kernel32.SetConsoleMode(handle, mode.value | ENABLE_VIRTUAL_TERMINAL_PROCESSING))
+    except (AttributeError, OSError):
+        return False
+
+def _configure_stdout(ansi=False):
+    """
+    Configure stdout for UTF-8 on Windows. ansi: the caller draws with ANSI
+    escapes; returns True when stdout is a terminal that will process them
+    (VT mode is only switched on then, never for machine-readable output).
+    """
+    if sys.platform == 'win32':
+        try:
+            sys.stdout.reconfigure(encoding='utf-8')
+        except AttributeError:
+            pass  # Python < 3.7
+    if not ansi or not getattr(sys.stdout, "isatty", lambda: False)():
+        return False
+    return sys.platform != 'win32' or _enable_vt_mode()
+
+# Sort name -> (key, descending). Status order puts active work first.
+STATUS_ORDER = {"in-progress": 0, "paused": 1, "no-context": 2, "error": 3, "complete": 4, "deleted": 5}
+DASHBOARD_SORTS = {
+    "updated": (lambda p: p.get("updated") or "", True),
+    "progress": (lambda p: p.get("progress", 0), True),
+    "status": (lambda p: STATUS_ORDER.get(p.get("status"), len(STATUS_ORDER)), False),
+    "name": (lambda p: str(p.get("name", "")).casefold(), False),
+    "created": (lambda p: p.get("created") or "", True),
+    "commit": (lambda p: p.get("last_commit") or "", True),
+    "dirty": (lambda p: (bool(p.get("dirty")), p.get("last_commit") or ""), True)
+}
+DEFAULT_SORT = "updated"
+DEFAULT_PAGE_SIZE = 5
+
+def select_projects(progress_data, sort=DEFAULT_SORT, page=1, page_size=DEFAULT_PAGE_SIZE,
+                    reverse=False, **filters):
+    """
+    Pick one page of projects in sort order.
+    
+    Uses a bounded heap (heapq.nlargest/nsmallest) holding at most
+    page * page_size entries, so the full list is never sorted.
+    Returns (rows, matched) where matched is the number of projects
+    passing the filters (see filter_projects).
+    """
+    key, descending = DASHBOARD_SORTS[sort]
+    if reverse:
+        descending = not descending
+    
+    matched = 0
+    def counted(entries):
+        nonlocal matched
+        for entry in entries:
+            matched += 1
+            yield entry
+    
+    page = max(1, page)
+    pick = heapq.nlargest if descending else heapq.nsmallest
+    top = pick(page * page_size, counted(filter_projects(progress_data, **filters)), key=key)
+    return top[(page - 1) * page_size:], matched
+
+def _page_info(page, page_size, matched, sort):
+    """Pagination line shown above the project list."""
+    pages = max(1, -(-matched // page_size))
+    return f"Trang {min(page, pages)}/{pages} | {matched} projects | sap xep: {sort}"
+
+def print_dashboard(sort=DEFAULT_SORT, page=1, page_size=DEFAULT_PAGE_SIZE, reverse=False,
+                    report=False, **filters):
+    """
+    Print beautiful dashboard to terminal (one page of projects, one buffered write).
+    report: also draw the fleet distribution panel (see fleet_report).
+    """
+    clear = ANSI_CLEAR_SCREEN if _configure_stdout(ansi=True) else ""
+    
+    with span("print_dashboard"):
+        with span("stats"):
+            stats = get_stats_summary()
+        # Git state only for the page shown, unless the page is chosen by it
+        git_sort = sort in ("commit", "dirty")
+        if git_sort:
+            with span("git"):
+                get_git_activity(stats['projects'])
+        rows, matched = select_projects(stats['projects'], sort, page, page_size, reverse, **filters)
+        if not git_sort:
+            with span("git"):
+                get_git_activity(rows, partial=True)
+        with span("render"):
+            page_info = _page_info(page, page_size, matched, sort) if matched > page_size or filters else None
+            fleet = fleet_report(stats['projects']) if report else None
+            lines = render_dashboard(stats, rows, (max(1, page) - 1) * page_size + 1, page_info, fleet)
+    
+        # Clear screen (ANSI, no subprocess; skipped when piped)
+        sys.stdout.write(clear + "\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+# ============================================
+# LIVE WATCH MODE
+# ============================================
+# `--stats --watch`: inotify on Linux, stat polling elsewhere. Only the
+# projects whose files changed are re-parsed, and only the dashboard rows
+# whose text changed are rewritten (ANSI cursor positioning).
+
+ANSI_CLEAR_SCREEN = "\x1b[2J\x1b[H"
+ANSI_HIDE_CURSOR = "\x1b[?25l"
+ANSI_SHOW_CURSOR = "\x1b[?25h"
+
+WATCH_INTERVAL = 1.0  # seconds between polls / resize checks
+WATCH_DEBOUNCE = 0.1  # seconds to coalesce bursts of editor writes
+WATCH_FIXED_ROWS = 24  # dashboard rows that are not project rows
+# Files in .git rewritten by commits, checkouts, resets and fetches. Not
+# "index": `git status` itself rewrites it, which would re-trigger the watch.
+GIT_WATCH_NAMES = {"HEAD", "ORIG_HEAD", "packed-refs", "COMMIT_EDITMSG", "FETCH_HEAD"}
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+INOTIFY_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+                | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+def _new_watcher():
+    """Create a watcher: inotify on Linux, stat polling as fallback."""
+    if sys.platform.startswith('linux'):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                return {"kind": "inotify", "fd": fd, "libc": libc, "watches": {}, "dirs": {}}
+            log_error(f"inotify_init1 failed (errno {ctypes.get_errno()}), polling instead")
+        except (OSError, AttributeError) as e:
+            log_error("inotify unavailable, polling instead", e)
+    return {"kind": "poll", "dirs": {}}
+
+def _stat_signature(path):
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _watch_add(watcher, directory, names):
+    """Watch `names` (file/dir names) inside directory."""
+    directory = Path(directory)
+    if directory in watcher["dirs"]:
+        return
+    
+    if watcher["kind"] == "inotify":
+        wd = watcher["libc"].inotify_add_watch(watcher["fd"], os.fsencode(str(directory)), INOTIFY_MASK)
+        if wd < 0:
+            log_error(f"inotify_add_watch failed for {directory} (errno {ctypes.get_errno()})")
+            return
+        watcher["watches"][wd] = directory
+        watcher["dirs"][directory] = {"wd": wd, "names": set(names)}
+    else:
+        watcher["dirs"][directory] = {name: _stat_signature(directory / name) for name in names}
+
+def _watch_remove(watcher, directory):
+    """Stop watching a directory."""
+    info = watcher["dirs"].pop(Path(directory), None)
+    if info and watcher["kind"] == "inotify":
+        watcher["watches"].pop(info["wd"], None)
+        watcher["libc"].inotify_rm_watch(watcher["fd"], info["wd"])
+
+def _watch_close(watcher):
+    """Release watcher resources."""
+    if watcher["kind"] == "inotify":
+        os.close(watcher["fd"])
+
+def _watch_wait(watcher, timeout):
+    """Block up to `timeout` seconds. Returns set of watched directories that changed."""
+    changed = set()
+    
+    if watcher["kind"] == "poll":
+        time.sleep(timeout)
+        for directory, signatures in watcher["dirs"].items():
+            for name, old in signatures.items():
+                new = _stat_signature(directory / name)
+                if new != old:
+                    signatures[name] = new
+                    changed.add(directory)
+        return changed
+    
+    ready, _, _ = select.select([watcher["fd"]], [], [], timeout)
+    if not ready:
+        return changed
+    time.sleep(WATCH_DEBOUNCE)  # Let the rest of a save burst arrive
+    
+    while True:
+        try:
+            data = os.read(watcher["fd"], 64 * 1024)
+        except BlockingIOError:
+            break
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            name = data[offset + _INOTIFY_EVENT.size:offset + _INOTIFY_EVENT.size + length].rstrip(b'\0')
+            offset += _INOTIFY_EVENT.size + length
+            
+            directory = watcher["watches"].get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                # Watch removed by the kernel (directory deleted)
+                watcher["watches"].pop(wd, None)
+                watcher["dirs"].pop(directory, None)
+                changed.add(directory)
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                changed.add(directory)
+            elif os.fsdecode(name) in watcher["dirs"].get(directory, {}).get("names", ()):
+                changed.add(directory)
+    return changed
+
+def _project_watch_target(project):
+    """(directory, names) to watch for a project, or None if it has no directory."""
+    path = project.get("project_path", "")
+    if not path:
+        return None
+    agent_dir = Path(path) / ".agent"
+    if agent_dir.is_dir():
+        return agent_dir, {"CONTEXT.md"}
+    if Path(path).is_dir():
+        return Path(path), {".agent"}  # Wait for .agent to appear
+    return None
+
+def _redraw(previous, lines):
+    """Rewrite only the terminal rows whose text changed. Returns lines."""
+    out = []
+    for row, line in enumerate(lines):
+        if row >= len(previous) or previous[row] != line:
+            out.append(f"\x1b[{row + 1};1H{line}\x1b[K")
+    for row in range(len(lines), len(previous)):
+        out.append(f"\x1b[{row + 1};1H\x1b[K")
+    if out:
+        out.append(f"\x1b[{len(lines) + 1};1H")
+        sys.stdout.write("".join(out))
+        sys.stdout.flush()
+    return lines
+
+def _new_progress_index():
+    """
+    In-memory progress for every tracked project, kept current by a watcher.
+    Shared by watch mode and the indexer daemon.
+    """
+    shards_dir = get_shards_dir()
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    watcher = _new_watcher()
+    _watch_add(watcher, shards_dir, {"index.json"})
+    
+    state = {
+        "watcher": watcher,
+        "shards_dir": shards_dir,
+        "projects": [],
+        "progress": [],
+        "positions_by_dir": {},  # watched dir -> positions in projects
+        "git_dirs": set(),  # watched .git dirs (changes only bump version)
+        "version": 0  # bumped on every change
+    }
+    _refresh_progress_index(state)
+    return state
+
+def _refresh_progress_index(state):
+    """Reload the project list, reusing progress already computed for known records."""
+    watcher = state["watcher"]
+    known = {(p.get("id"), p.get("path")): p for p in state["progress"]}
     
-    # Calculate percentage safely
-    try:
-        progress = round((done / total * 100)) if total > 0 else 0
-        progress = max(0, min(100, progress))  # Clamp to 0-100
-    except Exception:
-        progress = 0
+    started = time.perf_counter()
+    projects = load_analytics()["projects"]
+    progress_data = []
+    for r in projects:
+        entry = known.get((r.get("id", "unknown"), r.get("project_path", "")))
+        if entry is None:
+            entry = get_project_progress(r)
+        else:
+            count_metric("progress_reused")
+        progress_data.append(entry)
     
-    # Determine status
-    if progress >= 100:
-        status = "complete"
-    elif in_progress > 0 or done > 0:
-        status = "in-progress"
-    else:
-        status = "paused"
+    positions_by_dir = {}
+    git_dirs = set()
+    for pos, record in enumerate(projects):
+        target = _project_watch_target(record)
+        if target:
+            positions_by_dir.setdefault(target[0], []).append(pos)
+            _watch_add(watcher, *target)
+        git_dir = _find_git_dir(record["project_path"]) if record.get("project_path") else None
+        if git_dir is not None and git_dir not in positions_by_dir:
+            git_dirs.add(git_dir)
+            _watch_add(watcher, git_dir, GIT_WATCH_NAMES)
+    for directory in list(watcher["dirs"]):
+        if (directory != state["shards_dir"] and directory not in positions_by_dir
+                and directory not in git_dirs):
+            _watch_remove(watcher, directory)
     
-    # Find Current Focus with error handling
-    current_phase = "Unknown"
-    try:
-        patterns = [
-            r"## 🎯 Current Focus\s*\n+>\s*\*?\*?(.+?)(?:\*?\*?)(?:\n|$)",
-            r"## Current Focus\s*\n+>\s*(.+?)(?:\n|$)",
-            r"\*\*Current Focus\*\*[:\s]+(.+?)(?:\n|$)"
-        ]
+    state["projects"] = projects
+    state["progress"] = progress_data
+    state["positions_by_dir"] = positions_by_dir
+    state["git_dirs"] = git_dirs
+    state["version"] += 1
+    observe_scan(time.perf_counter() - started)
+    state["metrics_lines"] = write_metrics_file(progress_data)
+
+def _apply_watch_changes(state, changed):
+    """Re-parse only the projects whose watched directories changed."""
+    if not changed:
+        return
+    started = time.perf_counter()
+    watcher = state["watcher"]
+    positions_by_dir = state["positions_by_dir"]
+    
+    if state["shards_dir"] in changed:
+        _refresh_progress_index(state)
+        changed = changed - {state["shards_dir"]}
+    # A .git change needs no re-parse: the version bump refreshes git state
+    changed = changed - state["git_dirs"]
+    
+    reparsed = 0
+    for directory in changed:
+        positions = positions_by_dir.get(directory, [])
+        reparsed += len(positions)
+        for pos in positions:
+            state["progress"][pos] = get_project_progress(state["projects"][pos])
         
-        for pattern in patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
-                current_phase = match.group(1).strip()
-                # Clean up markdown
-                current_phase = re.sub(r'\*+', '', current_phase).strip()
-                # Limit length
-                if len(current_phase) > 50:
-                    current_phase = current_phase[:47] + "..."
-                break
-    except Exception as e:
-        log_error("Error extracting current phase", e)
-        current_phase = "Parse error"
+        target = _project_watch_target(state["projects"][positions[0]]) if positions else None
+        if target and target[0] == directory and directory in watcher["dirs"]:
+            continue
+        
+        # .agent was created or removed: move the watch
+        positions_by_dir.pop(directory, None)
+        _watch_remove(watcher, directory)
+        if target:
+            positions_by_dir.setdefault(target[0], []).extend(positions)
+            _watch_add(watcher, *target)
     
-    return {
-        "progress": progress,
-        "done": done,
-        "total": total,
-        "in_progress": in_progress,
-        "current_phase": current_phase,
-        "status": status
-    }
+    state["version"] += 1
+    count_metric("progress_reused", len(state["progress"]) - reparsed)
+    observe_scan(time.perf_counter() - started)
+    state["metrics_lines"] = write_metrics_file(state["progress"])
 
-def get_all_projects_progress():
-    """Get progress for all tracked projects with error handling."""
-    try:
-        analytics = load_analytics()
-    except Exception as e:
-        log_error("Error loading analytics for progress", e)
-        return []
+def watch_dashboard(interval=WATCH_INTERVAL, sort=DEFAULT_SORT, reverse=False, **filters):
+    """Live dashboard: redraw rows whenever a CONTEXT.md or the analytics index changes."""
+    _configure_stdout(ansi=True)
     
-    results = []
+    state = _new_progress_index()
+    previous = []
+    terminal_size = None
+    git_key = None
+    sys.stdout.write(ANSI_HIDE_CURSOR)
     
-    for project in analytics.get("projects", []):
-        try:
-            path = project.get("project_path", "")
-            context_path = Path(path) / ".agent" / "CONTEXT.md"
-            
-            # Check if project directory still exists
-            if not path or not Path(path).exists():
-                status_info = {
-                    "progress": 0,
-                    "status": "deleted",
-                    "current_phase": "Project not found",
-                    "done": 0,
-                    "total": 0
-                }
-            else:
-                status_info = calculate_progress(context_path)
+    try:
+        while True:
+            size = shutil.get_terminal_size()
+            if size != terminal_size:
+                terminal_size = size
+                previous = []
+                sys.stdout.write(ANSI_CLEAR_SCREEN)
             
-            results.append({
-                "id": project.get("id", "unknown"),
-                "name": project.get("project_name", "Unknown"),
-                "path": path,
-                "types": project.get("project_types", []),
-                "created": project.get("timestamp", ""),
-                **status_info
-            })
+            page_size = max(1, (size.lines - WATCH_FIXED_ROWS) // 3)
+            stats = summarize_stats(state["projects"], state["progress"])
+            # Git state is cached for GIT_DIRTY_TTL; refresh it when that window
+            # turns over or a project (or its .git) changed, as serve does
+            key = (state["version"], int(time.time() // GIT_DIRTY_TTL))
+            if key != git_key:
+                git_key = key
+                get_git_activity(state["progress"])
+            rows, matched = select_projects(state["progress"], sort, 1, page_size, reverse, **filters)
+            page_info = _page_info(1, page_size, matched, sort)
+            previous = _redraw(previous, render_dashboard(stats, rows, 1, page_info))
             
-        except Exception as e:
-            log_error(f"Error processing project: {project.get('project_name', 'unknown')}", e)
-            # Add a placeholder for this project
-            results.append({
-                "id": project.get("id", "unknown"),
-                "name": project.get("project_name", "Unknown"),
-                "path": project.get("project_path", ""),
-                "types": [],
-                "created": "",
-                "progress": 0,
-                "status": "error",
-                "current_phase": "Error loading",
-                "done": 0,
-                "total": 0
-            })
-    
-    return results
+            _apply_watch_changes(state, _watch_wait(state["watcher"], interval))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _watch_close(state["watcher"])
+        sys.stdout.write(ANSI_SHOW_CURSOR + "\n")
+        sys.stdout.flush()
 
 # ============================================
-# STATISTICS
+# MACHINE-READABLE OUTPUT
 # ============================================
+# `--stats --json|--jsonl|--csv` for agent workflows: no screen
+# clearing, no box art, every project, one record at a time.
+
+OUTPUT_FORMATS = ("json", "jsonl", "csv")
+PROJECT_FIELDS = [
+    "id", "name", "path", "types", "created", "updated", "status",
+    "progress", "done", "total", "in_progress", "current_phase",
+    "velocity", "stalled", "eta", "branch", "last_commit", "dirty"
+]
 
-def get_stats_summary():
-    """Get summary statistics."""
-    analytics = load_analytics()
-    projects = analytics.get("projects", [])
-    progress_data = get_all_projects_progress()
+def filter_projects(progress_data, status=None, project_type=None, name=None,
+                    min_progress=None, max_progress=None):
+    """
+    Yield progress entries matching every given filter.
+    status: str or list of statuses; name: case-insensitive substring.
+    """
+    statuses = {status} if isinstance(status, str) else set(status or [])
+    name = name.lower() if name else None
     
-    # Count by status
-    complete = sum(1 for p in progress_data if p.get("status") == "complete")
-    in_progress = sum(1 for p in progress_data if p.get("status") == "in-progress")
-    paused = sum(1 for p in progress_data if p.get("status") == "paused")
+    for entry in progress_data:
+        if statuses and entry.get("status") not in statuses:
+            continue
+        if project_type and project_type not in entry.get("types", []):
+            continue
+        if name and name not in str(entry.get("name", "")).lower():
+            continue
+        progress = entry.get("progress", 0)
+        if min_progress is not None and progress < min_progress:
+            continue
+        if max_progress is not None and progress > max_progress:
+            continue
+        yield entry
+
+def _select_fields(entry, fields):
+    """Keep only the requested fields (all of them if fields is None)."""
+    if not fields:
+        return entry
+    return {field: entry.get(field) for field in fields}
+
+def _dumps_compact(value):
+    """Compact single-line JSON."""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+def write_stats(output_format, out=None, fields=None, only=None, report=False, **filters):
+    """
+    Stream stats in a machine-readable format.
     
-    # Tech stack frequency
-    tech_counts = {}
-    for p in projects:
-        stack = p.get("tech_stack", {})
-        for key, value in stack.items():
-            if value and value != "None":
-                # Extract main tech name
-                tech_name = value.split("+")[0].strip()
-                tech_counts[tech_name] = tech_counts.get(tech_name, 0) + 1
+    output_format: 'json' (one document), 'jsonl' (summary line, then one
+    line per project) or 'csv' (one row per project).
+    fields: project fields to keep; only: 'summary' or 'projects';
+    report: add fleet_report() to the summary; filters: see filter_projects().
+    """
+    out = out or sys.stdout
+    if report:
+        stats = get_stats_summary()
+        stats["report"] = fleet_report(stats["projects"])
+        if only == "summary":
+            stats.pop("projects")
+    elif only == "summary":
+        # Summary only: counters without keeping every progress entry around
+        stats = get_stats_summary(("total", "status", "top_tech", "type_counts"))
+    else:
+        stats = get_stats_summary()
+    progress_data = get_git_activity(stats.pop("projects", []))
+    projects = (_select_fields(p, fields) for p in filter_projects(progress_data, **filters))
     
-    # Sort by frequency
-    top_tech = sorted(tech_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+    if output_format == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+        if only == "summary":
+            writer.writerow(["metric", "value"])
+            for key in ("total", "complete", "in_progress", "paused"):
+                writer.writerow([key, stats[key]])
+            for project_type, count in stats["type_counts"].items():
+                writer.writerow([f"type:{project_type}", count])
+            for tech, count in stats["top_tech"]:
+                writer.writerow([f"tech:{tech}", count])
+            return
+        
+        columns = fields or PROJECT_FIELDS
+        writer.writerow(columns)
+        for p in projects:
+            writer.writerow([";".join(map(str, p.get(c))) if isinstance(p.get(c), list) else p.get(c, "")
+                             for c in columns])
+        return
     
-    # Project types frequency
-    type_counts = {}
-    for p in projects:
-        for t in p.get("project_types", []):
-            type_counts[t] = type_counts.get(t, 0) + 1
+    if output_format == "jsonl":
+        if only != "projects":
+            out.write(_dumps_compact({"summary": stats}) + "\n")
+        if only != "summary":
+            for p in projects:
+                out.write(_dumps_compact(p) + "\n")
+        return
     
-    return {
-        "total": len(projects),
-        "complete": complete,
-        "in_progress": in_progress,
-        "paused": paused,
-        "top_tech": top_tech,
-        "type_counts": type_counts,
-        "projects": progress_data
+    # json: written piece by piece, never built as one big string
+    parts = []
+    if only != "projects":
+        parts.append('"summary":' + _dumps_compact(stats))
+    out.write("{" + ",".join(parts))
+    if only != "summary":
+        out.write(("," if parts else "") + '"projects":[')
+        for i, p in enumerate(projects):
+            out.write(("," if i else "") + _dumps_compact(p))
+        out.write("]")
+    out.write("}\n")
+
+def render_project_detail(p):
+    """Render get_project_detail() output as text lines."""
+    lines = ["", f"PROJECT: {p['name']}", ""]
+    lines.append(f"  ID:        {p.get('id')}")
+    lines.append(f"  Path:      {p.get('path')}")
+    lines.append(f"  Types:     {', '.join(p.get('types', []))}")
+    lines.append(f"  Created:   {str(p.get('created', ''))[:19].replace('T', ' ')}")
+    lines.append(f"  Tien do:   {create_progress_bar(p.get('progress', 0))} {p.get('progress', 0)}% "
+                 f"({p.get('done', 0)}/{p.get('total', 0)}) {p.get('status')}")
+    lines.append(f"  Dang lam:  {p.get('current_phase', '')}")
+    if p.get("velocity") or p.get("eta") or p.get("stalled"):
+        trend = f"{p.get('velocity', 0)} task/ngay"
+        if p.get("eta"):
+            trend += f", ETA {p['eta']}"
+        if p.get("stalled"):
+            trend += f", DUNG > {STALL_DAYS} ngay"
+        lines.append(f"  Xu huong:  {trend}")
+    if p.get("branch"):
+        lines.append(f"  Git:       {p['branch']}{' (chua commit)' if p.get('dirty') else ''}, "
+                     f"commit cuoi {str(p.get('last_commit') or '?').replace('T', ' ')}")
+    stack = {k: v for k, v in p.get("tech_stack", {}).items() if k not in TECH_STACK_META_KEYS and v}
+    if stack:
+        lines.append("  Tech:      " + ", ".join(v if isinstance(v, str) else ", ".join(map(str, v))
+                                          for v in stack.values()))
+    
+    context = p.get("context") or {}
+    if context.get("status", {}).get("phase"):
+        lines.append(f"  Phase:     {context['status']['phase']}")
+    for title, key in (("Van de dang mo", "issues"), ("Buoc tiep theo", "next_steps")):
+        items = [item["text"] for item in context.get(key, []) if not item.get("done")]
+        if items:
+            lines.append(f"  {title}:")
+            lines.extend(f"    - {text}" for text in items)
+    if context.get("decisions"):
+        lines.append("  Quyet dinh:")
+        lines.extend(f"    - {d['decision']}" + (f" ({d['reason']})" if d.get("reason") else "")
+                     for d in context["decisions"])
+    if p.get("timings"):
+        lines.extend(render_timings(p["timings"])[:-1])
+    lines.append("")
+    return lines
+
+def write_changes(output_format, since=None, fields=None, out=None):
+    """Write the change set (see detect_changes) as text or json/jsonl/csv."""
+    out = out or sys.stdout
+    changes, baseline = detect_changes(since)
+    
+    if output_format is None:
+        out.write("\n".join(render_changes(changes, baseline)) + "\n")
+        return
+    
+    columns = fields or PROJECT_FIELDS + CHANGE_FIELDS
+    if output_format == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(columns)
+        for p in changes:
+            writer.writerow([";".join(map(str, p.get(c))) if isinstance(p.get(c), list) else p.get(c, "")
+                             for c in columns])
+        return
+    
+    selected = [p if not fields else _select_fields(p, fields) for p in changes]
+    if output_format == "jsonl":
+        out.write(_dumps_compact({"since": baseline, "changed": len(changes)}) + "\n")
+        for p in selected:
+            out.write(_dumps_compact(p) + "\n")
+        return
+    out.write(_dumps_compact({"since": baseline, "changes": selected}) + "\n")
+
+# Output formats each `--stats` view can print (text is always available)
+MODE_FORMATS = {
+    "serve": (),
+    "watch": (),
+    "project": ("json", "jsonl"),
+    "search": ("json", "jsonl"),
+    "context": OUTPUT_FORMATS,
+    "since": OUTPUT_FORMATS,
+    "dashboard": OUTPUT_FORMATS
+}
+MODE_OPTIONS = {
+    "serve": "--serve", "watch": "--watch", "project": "a project lookup",
+    "search": "--search", "context": "--context", "since": "--since/--since-last",
+    "dashboard": "the text dashboard", "formats": "--json/--jsonl/--csv stats"
+}
+# Options that only some views read: (flag, dest, views). "formats" is the
+# dashboard printed as --json/--jsonl/--csv; anything else is a usage error.
+FILTER_VIEWS = ("dashboard", "watch", "formats")
+VIEW_ONLY_OPTIONS = [
+    ("--status", "status", FILTER_VIEWS),
+    ("--type", "project_type", FILTER_VIEWS),
+    ("--name", "name", FILTER_VIEWS),
+    ("--min-progress", "min_progress", FILTER_VIEWS),
+    ("--max-progress", "max_progress", FILTER_VIEWS),
+    ("--sort", "sort", ("dashboard", "watch")),
+    ("--reverse", "reverse", ("dashboard", "watch")),
+    ("--page", "page", ("dashboard",)),
+    ("--page-size", "page_size", ("dashboard",)),
+    ("--report", "report", ("dashboard", "formats")),
+    ("--fields", "fields", ("since", "formats")),
+    ("--only", "only", ("formats",)),
+    ("--phase", "phase", ("context",)),
+    ("--all", "all", ("context",)),
+    ("--gemini", "gemini", ("search",)),
+    ("--limit", "limit", ("search",)),
+    ("--host", "host", ("serve",))
+]
+
+def run_stats_cli(argv):
+    """Entry point for `new_project.py --stats [options]`. Returns exit code."""
+    parser = argparse.ArgumentParser(
+        prog="new_project.py --stats",
+        description="VibeCoding analytics dashboard"
+    )
+    # One view per run: the modes exclude each other (the default is the dashboard)
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument("project", nargs="?", help="show one project (name, id or path)")
+    modes.add_argument("--watch", action="store_true", help="live dashboard, redraws on changes")
+    output = parser.add_mutually_exclusive_group()
+    for output_format in OUTPUT_FORMATS:
+        output.add_argument(f"--{output_format}", dest="output_format", action="store_const",
+                            const=output_format, help=f"print stats as {output_format.upper()}")
+    parser.add_argument("--fields", help=f"comma-separated project fields ({', '.join(PROJECT_FIELDS)})")
+    parser.add_argument("--only", choices=["summary", "projects"], help="print only one part")
+    parser.add_argument("--status", help="comma-separated statuses (complete, in-progress, paused, deleted, ...)")
+    parser.add_argument("--type", dest="project_type", help="project type, e.g. saas")
+    parser.add_argument("--name", help="name contains (case-insensitive)")
+    parser.add_argument("--min-progress", type=int)
+    parser.add_argument("--max-progress", type=int)
+    parser.add_argument("--sort", choices=list(DASHBOARD_SORTS),
+                        help=f"dashboard order (default: {DEFAULT_SORT})")
+    parser.add_argument("--reverse", action="store_true", help="reverse the sort order")
+    parser.add_argument("--page", type=int, help="dashboard page number")
+    parser.add_argument("--page-size", type=int,
+                        help=f"projects per page (default: {DEFAULT_PAGE_SIZE})")
+    modes.add_argument("--since-last", action="store_true",
+                       help="only projects whose tasks changed since the previous --since-last run")
+    modes.add_argument("--since", metavar="DATE",
+                       help="only projects changed after DATE (YYYY-MM-DD or ISO time)")
+    modes.add_argument("--context", choices=["status", "decisions", "issues", "next-steps"],
+                       help="list one CONTEXT.md section across all projects")
+    parser.add_argument("--phase", help="with --context: only projects in this phase (e.g. Testing)")
+    parser.add_argument("--all", action="store_true", help="with --context: include ticked issues/steps")
+    modes.add_argument("--search", metavar="QUERY",
+                       help="full-text search over CONTEXT.md, ranked by section")
+    parser.add_argument("--gemini", action="store_true", help="also search GEMINI.md files")
+    parser.add_argument("--limit", type=int, help="max search results (default: 10)")
+    parser.add_argument("--report", action="store_true",
+                        help="add progress percentiles, histogram and per-tech completion")
+    modes.add_argument("--serve", nargs="?", type=int, const=DASHBOARD_PORT, metavar="PORT",
+                       help=f"serve the dashboard and JSON API over HTTP (default port {DASHBOARD_PORT})")
+    parser.add_argument("--host", help="with --serve: address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--timings", action="store_true", help="print a phase timing breakdown (to stderr)")
+    args = parser.parse_args(argv)
+    
+    mode = ("serve" if args.serve is not None else "project" if args.project else
+            "context" if args.context else "search" if args.search else
+            "since" if args.since_last or args.since else "watch" if args.watch else "dashboard")
+    if args.output_format and args.output_format not in MODE_FORMATS[mode]:
+        parser.error(f"--{args.output_format} is not supported with {MODE_OPTIONS[mode]}")
+    view = "formats" if mode == "dashboard" and args.output_format else mode
+    for flag, dest, views in VIEW_ONLY_OPTIONS:
+        if getattr(args, dest) not in (None, False) and view not in views:
+            parser.error(f"{flag} is not supported with {MODE_OPTIONS[view]}")
+    # Defaults are applied only now, so that the check above sees what was given
+    for dest, default in (("sort", DEFAULT_SORT), ("page", 1), ("page_size", DEFAULT_PAGE_SIZE),
+                          ("limit", 10), ("host", "127.0.0.1")):
+        if getattr(args, dest) is None:
+            setattr(args, dest, default)
+    if args.timings:
+        enable_timings()
+    
+    fields = [f.strip() for f in args.fields.split(",") if f.strip()] if args.fields else None
+    known = PROJECT_FIELDS + CHANGE_FIELDS if args.since_last or args.since else PROJECT_FIELDS
+    unknown = [f for f in fields or [] if f not in known]
+    if unknown:
+        parser.error(f"unknown field(s): {', '.join(unknown)}")
+    
+    # Only filters that were actually given
+    filters = {
+        "status": args.status.split(",") if args.status else None,
+        "project_type": args.project_type,
+        "name": args.name,
+        "min_progress": args.min_progress,
+        "max_progress": args.max_progress
     }
+    filters = {k: v for k, v in filters.items() if v is not None}
+    
+    if args.serve is not None:
+        serve_dashboard(args.host, args.serve)
+    elif args.project:
+        _configure_stdout()
+        detail, matches = get_project_detail(args.project)
+        if detail is None:
+            if matches:
+                print(f"'{args.project}' matches {len(matches)} projects, use the id or path:")
+                for record in matches:
+                    print(f"  {record.get('id')}  {record.get('project_path')}")
+            else:
+                print(f"Project not found: {args.project}")
+            return 1
+        if args.output_format in ("json", "jsonl"):
+            sys.stdout.write(_dumps_compact(detail) + "\n")
+        else:
+            sys.stdout.write("\n".join(render_project_detail(detail)) + "\n")
+    elif args.context:
+        _configure_stdout()
+        section = args.context.replace("-", "_")
+        rows = query_context(section, args.phase, args.all)
+        if args.output_format == "json":
+            sys.stdout.write(_dumps_compact({section: rows}) + "\n")
+        elif args.output_format == "jsonl":
+            sys.stdout.writelines(_dumps_compact(row) + "\n" for row in rows)
+        elif args.output_format == "csv":
+            columns = list(dict.fromkeys(key for row in rows for key in row))
+            writer = csv.writer(sys.stdout, lineterminator="\n")
+            writer.writerow(columns)
+            writer.writerows([row.get(c, "") for c in columns] for row in rows)
+        else:
+            sys.stdout.write("\n".join(render_context_rows(section, rows)) + "\n")
+    elif args.search:
+        _configure_stdout()
+        update_search_index(args.gemini)
+        results = search_projects(args.search, args.gemini, args.limit)
+        if args.output_format in ("json", "jsonl"):
+            for r in ([{"query": args.search, "results": results}] if args.output_format == "json" else results):
+                sys.stdout.write(_dumps_compact(r) + "\n")
+        else:
+            sys.stdout.write("\n".join(render_search_results(args.search, results)) + "\n")
+    elif args.since_last or args.since:
+        since = None
+        if args.since:
+            try:
+                since = datetime.fromisoformat(args.since)
+            except ValueError:
+                parser.error(f"invalid --since date: {args.since}")
+        _configure_stdout()
+        write_changes(args.output_format, since, fields)
+    elif args.output_format:
+        _configure_stdout()
+        write_stats(args.output_format, fields=fields, only=args.only, report=args.report, **filters)
+    elif args.watch:
+        watch_dashboard(sort=args.sort, reverse=args.reverse, **filters)
+    else:
+        print_dashboard(args.sort, args.page, max(1, args.page_size), args.reverse, args.report, **filters)
+    if args.timings:
+        sys.stderr.write("\n".join(render_timings()) + "\n")
+    return 0
 
 # ============================================
-# DASHBOARD DISPLAY
+# PROGRESS INDEXER DAEMON
 # ============================================
+# Optional long-lived process (`analytics.py --indexer start`) that keeps
+# the progress index in memory and answers queries over a Unix domain
+# socket (localhost TCP where AF_UNIX is unavailable). Dashboard calls
+# use it when it is running and scan projects directly when it is not.
 
-def create_progress_bar(percent, width=20):
-    """Create ASCII progress bar."""
-    filled = int(width * percent / 100)
-    empty = width - filled
-    return "#" * filled + "-" * empty
+INDEXER_CONNECT_TIMEOUT = 0.5  # seconds
+INDEXER_QUERY_TIMEOUT = 10  # seconds
+INDEXER_START_TIMEOUT = 10  # seconds
+
+def get_indexer_socket_path():
+    """Get indexer Unix socket path."""
+    return get_analytics_dir() / "indexer.sock"
+
+def get_indexer_port_path():
+    """Get file holding the indexer TCP port (platforms without AF_UNIX)."""
+    return get_analytics_dir() / "indexer.port"
 
-def print_dashboard():
-    """Print beautiful dashboard to terminal."""
-    import sys
+def _indexer_address():
+    """(family, address) of a running indexer, or None if none is advertised."""
+    if hasattr(socket, "AF_UNIX"):
+        path = get_indexer_socket_path()
+        return (socket.AF_UNIX, str(path)) if path.exists() else None
+    try:
+        port = int(get_indexer_port_path().read_text().strip())
+    except (OSError, ValueError):
+        return None
+    return (socket.AF_INET, ("127.0.0.1", port))
+
+def query_indexer(command, **params):
+    """
+    Send one query to the indexer daemon.
+    Returns the result, or None when no daemon is reachable.
+    """
+    address = _indexer_address()
+    if address is None:
+        return None
     
-    # Configure stdout for UTF-8 on Windows
-    if sys.platform == 'win32':
+    try:
+        with socket.socket(address[0], socket.SOCK_STREAM) as sock:
+            sock.settimeout(INDEXER_CONNECT_TIMEOUT)
+            sock.connect(address[1])
+            sock.settimeout(INDEXER_QUERY_TIMEOUT)
+            sock.sendall(json.dumps({"cmd": command, **params}).encode('utf-8') + b"\n")
+            with sock.makefile('rb') as f:
+                response = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None  # Not running (or stale socket) - callers scan directly
+    
+    if not response.get("ok"):
+        log_error(f"Indexer query '{command}' failed: {response.get('error')}")
+        return None
+    return response.get("result")
+
+def _answer_indexer_query(state, request):
+    """Answer one indexer request from the in-memory progress index."""
+    command = request.get("cmd")
+    
+    if command == "ping":
+        return {"pid": os.getpid(), "projects": len(state["projects"]), "version": state["version"]}
+    if command == "summary":
+        # Recomputed only when something changed since the last query
+        if state.get("summary_version") != state["version"]:
+            state["summary"] = summarize_stats(state["projects"], state["progress"])
+            state["summary_version"] = state["version"]
+        return state["summary"]
+    if command == "progress":
+        return state["progress"]
+    if command == "stop":
+        state["stopping"] = True
+        return {"stopping": True}
+    raise ValueError(f"Unknown command: {command}")
+
+def run_indexer(interval=WATCH_INTERVAL):
+    """Run the indexer daemon in the foreground until stopped."""
+    if query_indexer("ping") is not None:
+        print("Indexer is already running")
+        return False
+    
+    state = _new_progress_index()
+    state["stopping"] = False
+    lock = threading.Lock()
+    
+    class IndexerRequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                request = json.loads(self.rfile.readline())
+                with lock:
+                    response = {"ok": True, "result": _answer_indexer_query(state, request)}
+                    payload = json.dumps(response, ensure_ascii=False)
+            except Exception as e:
+                payload = json.dumps({"ok": False, "error": f"{type(e).__name__}: {e}"})
+            self.wfile.write(payload.encode('utf-8') + b"\n")
+    
+    if hasattr(socket, "AF_UNIX"):
+        socket_path = get_indexer_socket_path()
         try:
-            sys.stdout.reconfigure(encoding='utf-8')
-        except AttributeError:
-            pass  # Python < 3.7
+            socket_path.unlink()  # Stale socket from a crashed daemon
+        except FileNotFoundError:
+            pass
+        server = socketserver.ThreadingUnixStreamServer(str(socket_path), IndexerRequestHandler)
+        os.chmod(socket_path, 0o600)
+        advertised = socket_path
+    else:
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), IndexerRequestHandler)
+        advertised = get_indexer_port_path()
+        advertised.write_text(str(server.server_address[1]), encoding='utf-8')
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
     
-    stats = get_stats_summary()
+    try:
+        while not state["stopping"]:
+            changed = _watch_wait(state["watcher"], interval)
+            if changed:
+                with lock:
+                    _apply_watch_changes(state, changed)
+                flush_error_log()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        try:
+            advertised.unlink()
+        except FileNotFoundError:
+            pass
+        _watch_close(state["watcher"])
+    return True
+
+def start_indexer():
+    """Start the indexer daemon as a detached background process."""
+    if query_indexer("ping") is not None:
+        return True
     
-    # Clear screen
-    os.system('cls' if os.name == 'nt' else 'clear')
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "--indexer", "run"],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        close_fds=True, **kwargs
+    )
     
-    print()
-    print("+" + "=" * 62 + "+")
-    print("|" + " VIBECODING ANALYTICS DASHBOARD ".center(62) + "|")
-    print("+" + "=" * 62 + "+")
-    print("|" + " " * 62 + "|")
+    # Wait until it answers
+    deadline = time.monotonic() + INDEXER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if query_indexer("ping") is not None:
+            return True
+        time.sleep(0.1)
+    return False
+
+def stop_indexer():
+    """Ask a running indexer daemon to exit. Returns True if one was running."""
+    return query_indexer("stop") is not None
+
+# ============================================
+# TEAM COLLECTOR
+# ============================================
+#
+# Optional HTTP service (`analytics.py --collector serve`) gathering the
+# records of a whole team into its own store. A workstation configured
+# with `--collector use URL` copies each tracked record into outbox/ and
+# sends the outbox in batches of COLLECTOR_BATCH_SIZE over one keep-alive
+# connection. At exit that is a single short attempt (the wizard never
+# waits more than about COLLECTOR_EXIT_BUDGET); `--collector flush` also
+# retries with exponential backoff. Whatever could
+# not be sent stays in outbox/ for the next run, so a collector that is
+# down (or a wrong URL, an auth proxy, ...) never loses a record or blocks
+# the wizard. The collector stores the valid records of a batch and names
+# the others; only those (and outbox files that cannot be read) are set
+# aside as *.rejected. The collector keeps the team's records in a store
+# of its own (COLLECTOR_STORE, or --store DIR), never in the personal
+# store of the machine it runs on. GET /stats serves the fleet totals
+# with an ETag (304 while the store is unchanged).
+
+COLLECTOR_PORT = 8765
+COLLECTOR_BATCH_SIZE = 100  # records per POST
+COLLECTOR_RETRIES = 3  # extra attempts per batch
+COLLECTOR_BACKOFF = 0.25  # seconds before the first retry, doubled after each
+COLLECTOR_TIMEOUT = 5  # seconds per request
+COLLECTOR_EXIT_TIMEOUT = 1  # seconds per request when sending at exit
+COLLECTOR_EXIT_BUDGET = 2  # seconds: no new batch is started at exit after this
+COLLECTOR_MAX_BODY = 16 * 1024 * 1024  # bytes
+COLLECTOR_STORE = "~/.vibecoding-collector"  # default store of `--collector serve`
+
+_collector_state = {"atexit_registered": False}
+
+def get_collector_config_path():
+    """Get file holding the collector URL."""
+    return get_analytics_dir() / "collector.json"
+
+def get_outbox_dir():
+    """Get directory of records waiting to be sent to the collector."""
+    return get_analytics_dir() / "outbox"
+
+def get_fleet_stats_cache_path():
+    """Get last fleet stats received from the collector (with their ETag)."""
+    return get_analytics_dir() / "fleet_stats.json"
+
+def get_collector_url():
+    """URL of the team collector, or None when none is configured."""
+    try:
+        with open(get_collector_config_path(), 'r', encoding='utf-8') as f:
+            return json.load(f).get("url") or None
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log_error("Error reading collector config", e)
+        return None
+
+def set_collector_url(url):
+    """Configure the team collector (None turns sending off)."""
+    path = get_collector_config_path()
+    if url is None:
+        path.unlink(missing_ok=True)
+        return True
+    return _write_json_file(path, {"url": url.rstrip("/")}) is not None
+
+def queue_for_collector(record):
+    """Copy a tracked record to the outbox; it is sent at exit. Returns True if queued."""
+    try:
+        if not get_collector_url():
+            return False
+        _queue_record(record, get_outbox_dir())
+        if not _collector_state["atexit_registered"]:
+            atexit.register(flush_outbox, retries=0, timeout=COLLECTOR_EXIT_TIMEOUT,
+                            budget=COLLECTOR_EXIT_BUDGET)
+            _collector_state["atexit_registered"] = True
+        return True
+    except Exception as e:
+        log_error("Error queuing record for the collector", e)
+        return False
+
+def _open_collector(url, timeout=COLLECTOR_TIMEOUT):
+    """(keep-alive connection, base path) for a collector URL."""
+    parts = urllib.parse.urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    return connection_class(parts.hostname, parts.port, timeout=timeout), parts.path.rstrip("/")
+
+def _collector_request(connection, method, path, body=None, headers=None, retries=COLLECTOR_RETRIES):
+    """
+    One request on the connection, retried with exponential backoff.
+    Returns (status, response headers, body), or None when unreachable.
+    """
+    delay = COLLECTOR_BACKOFF
+    error = None
+    for attempt in range(retries + 1):
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            payload = response.read()
+            if response.status < 500:
+                return response.status, response.headers, payload
+            error = f"HTTP {response.status}"
+        except (OSError, http.client.HTTPException) as e:
+            error = e
+            connection.close()  # The next request reconnects
+        if attempt < retries:
+            time.sleep(delay)
+            delay *= 2
+    log_error(f"Collector unreachable: {method} {path}", error if isinstance(error, Exception) else None)
+    return None
+
+def _collector_reply(result):
+    """The JSON body of a collector's 200 reply to POST /records, or None."""
+    status, _, payload = result
+    if status != 200:
+        return None
+    try:
+        reply = json.loads(payload)
+    except ValueError:
+        return None
+    return reply if isinstance(reply, dict) and "accepted" in reply else None
+
+def _set_aside(path):
+    """Rename an outbox file to *.rejected (kept for inspection, never sent again)."""
+    try:
+        os.replace(path, path.with_name(path.name + '.rejected'))
+    except OSError as e:
+        log_error(f"Could not set aside outbox file {path.name}", e)
+
+def flush_outbox(retries=COLLECTOR_RETRIES, timeout=COLLECTOR_TIMEOUT, budget=None):
+    """
+    Send the outbox to the collector. Returns the number of records sent,
+    or None when no collector is configured.
+    budget: seconds after which no further batch is started.
+    """
+    url = get_collector_url()
+    if not url:
+        return None
+    sent = 0
+    try:
+        files = sorted(get_outbox_dir().glob("*.json"))
+        if not files:
+            return 0
+        deadline = time.monotonic() + budget if budget is not None else None
+        connection, base = _open_collector(url, timeout)
+        source = socket.gethostname()
+        try:
+            for start in range(0, len(files), COLLECTOR_BATCH_SIZE):
+                if deadline is not None and start and time.monotonic() > deadline:
+                    break  # Out of time: the rest waits for the next run
+                batch = []
+                records = []
+                for path in files[start:start + COLLECTOR_BATCH_SIZE]:
+                    try:
+                        with open(path, 'r', encoding='utf-8') as f:
+                            records.append(json.load(f))
+                        batch.append(path)
+                    except (OSError, ValueError) as e:
+                        # Unreadable: set aside so it does not block the queue
+                        log_error(f"Unreadable outbox file set aside: {path.name}", e)
+                        _set_aside(path)
+                if not batch:
+                    continue
+                body = json.dumps({"source": source, "records": records}, ensure_ascii=False).encode('utf-8')
+                result = _collector_request(connection, "POST", base + "/records", body,
+                                            {"Content-Type": "application/json"}, retries)
+                if result is None:
+                    break  # Offline: keep the rest for the next run
+                reply = _collector_reply(result)
+                if reply is None:
+                    # Wrong URL, auth proxy, redirect, batch too large...: nothing
+                    # says the records are bad, so keep them for a later flush
+                    log_error(f"Collector refused the batch, outbox kept: HTTP {result[0]} {result[2][:200]!r}")
+                    break
+                rejected = set(reply.get("rejected", []))
+                for number, path in enumerate(batch):
+                    if number in rejected:
+                        # Named invalid by the collector; set aside so it does not block the queue
+                        log_error(f"Collector rejected record: {path.name}")
+                        _set_aside(path)
+                    else:
+                        path.unlink(missing_ok=True)
+                        sent += 1
+        finally:
+            connection.close()
+    except Exception as e:
+        log_error("Error sending outbox to the collector", e)
+    return sent
+
+def fetch_fleet_stats():
+    """
+    Fleet totals from the collector, revalidated with If-None-Match.
+    Returns (stats, fresh): the last copy received (fresh=False) when the
+    collector is unreachable, (None, False) when there is none.
+    """
+    path = get_fleet_stats_cache_path()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
     
-    # Overview section
-    print("|  TONG QUAN" + " " * 51 + "|")
-    print(f"|  +-- Tong projects: {stats['total']:<40}|")
-    print(f"|  +-- Hoan thanh: {stats['complete']:<43}|")
-    print(f"|  +-- Dang lam: {stats['in_progress']:<45}|")
-    print(f"|  +-- Tam dung: {stats['paused']:<45}|")
-    print("|" + " " * 62 + "|")
+    url = get_collector_url()
+    if not url:
+        return cached.get("stats"), False
+    connection, base = _open_collector(url)
+    try:
+        headers = {"If-None-Match": cached["etag"]} if cached.get("etag") else {}
+        result = _collector_request(connection, "GET", base + "/stats", headers=headers)
+    finally:
+        connection.close()
+    if result is None:
+        return cached.get("stats"), False
+    status, response_headers, payload = result
+    if status == 304:
+        return cached.get("stats"), True
+    if status != 200:
+        log_error(f"Collector stats request failed: HTTP {status}")
+        return cached.get("stats"), False
+    cached = {"etag": response_headers.get("ETag"), "stats": json.loads(payload)}
+    _write_json_file(path, cached)
+    return cached["stats"], True
+
+def store_etag(index=None):
+    """ETag of the whole store: changes whenever any shard does."""
+    index = index or load_shard_index()
+    digest = hashlib.sha256()
+    for key in sorted(index["shards"]):
+        digest.update(f"{key}:{index['shards'][key].get('checksum')}\n".encode('utf-8'))
+    return f'"{digest.hexdigest()[:32]}"'
+
+def _etag_matches(header, etag):
+    """True if an If-None-Match header value covers etag."""
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def _valid_collector_record(record):
+    """A record the collector will store: uuid id (it names the queue file) and a timestamp."""
+    try:
+        return (isinstance(record, dict) and isinstance(record.get("timestamp"), str)
+                and str(uuid.UUID(str(record.get("id")))) == record["id"])
+    except ValueError:
+        return False
+
+def run_collector(host="127.0.0.1", port=COLLECTOR_PORT, store=COLLECTOR_STORE):
+    """Run the team collector in the foreground until Ctrl+C, storing into `store`."""
+    use_store_dir(store)
+    cache = {}  # etag -> encoded stats body
+    cache_lock = threading.Lock()
     
-    # Projects progress section
-    if stats['projects']:
-        print("|  TIEN DO TUNG PROJECT" + " " * 40 + "|")
-        print("|  +" + "-" * 58 + "+  |")
+    class CollectorRequestHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive
+        disable_nagle_algorithm = True  # Headers and body are separate writes
         
-        for i, p in enumerate(stats['projects'][:5], 1):  # Show top 5
-            name = p['name'][:25]
-            progress = p.get('progress', 0)
-            bar = create_progress_bar(progress, 15)
-            phase = p.get('current_phase', 'Unknown')[:20]
+        def _reply(self, status, payload=None, headers=None):
+            body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            if payload is not None:
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            if self.path == "/health":
+                return self._reply(200, {"ok": True})
+            if self.path != "/stats":
+                return self._reply(404, {"error": "not found"})
+            etag = store_etag()
+            if _etag_matches(self.headers.get("If-None-Match"), etag):
+                return self._reply(304, headers={"ETag": etag})
+            with cache_lock:
+                if etag not in cache:
+                    cache.clear()
+                    cache[etag] = load_summary()
+                stats = cache[etag]
+            self._reply(200, stats, {"ETag": etag, "Cache-Control": "no-cache"})
+        
+        def do_POST(self):
+            if self.path != "/records":
+                self.close_connection = True  # Body left unread
+                return self._reply(404, {"error": "not found"})
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > COLLECTOR_MAX_BODY:
+                self.close_connection = True
+                return self._reply(413, {"error": "batch too large"})
+            try:
+                payload = json.loads(self.rfile.read(length))
+                records = payload["records"]
+                if not isinstance(records, list):
+                    raise ValueError("records must be a list")
+            except (ValueError, KeyError, TypeError) as e:
+                return self._reply(400, {"error": str(e)})
             
-            if p.get('status') == 'complete':
-                phase = "[DONE]"
-            elif p.get('status') == 'deleted':
-                phase = "[DELETED]"
+            # Store the valid records; name the others by their position
+            source = str(payload.get("source") or self.client_address[0])
+            rejected = []
+            for number, record in enumerate(records):
+                if not _valid_collector_record(record):
+                    rejected.append(number)
+                    continue
+                record.setdefault("imported_from", source)
+                _queue_record(record)
+            with analytics_lock():
+                ok = commit_pending()
+            if not ok:
+                return self._reply(500, {"error": "store failed"})
+            self._reply(200, {"accepted": len(records) - len(rejected), "rejected": rejected})
+        
+        def log_message(self, format, *args):
+            pass  # Quiet; failures go to errors.log
+    
+    server = http.server.ThreadingHTTPServer((host, port), CollectorRequestHandler)
+    server.daemon_threads = True
+    print(f"Collector listening on http://{host}:{server.server_address[1]}, "
+          f"store {get_analytics_dir()} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return True
+
+def run_collector_cli(args):
+    """`--collector serve [PORT] [--host H] [--store DIR] | use URL | off | flush | stats | status`. Returns exit code."""
+    action = args[0] if args else "status"
+    if action == "serve":
+        host = args[args.index("--host") + 1] if "--host" in args[:-1] else "127.0.0.1"
+        store = args[args.index("--store") + 1] if "--store" in args[:-1] else COLLECTOR_STORE
+        ports = [a for a in args[1:] if a.isdigit()]
+        run_collector(host, int(ports[0]) if ports else COLLECTOR_PORT, store)
+    elif action == "use" and len(args) > 1:
+        if not set_collector_url(args[1]):
+            return 1
+        print(f"Records will be sent to {args[1]}")
+    elif action == "off":
+        set_collector_url(None)
+        print("Collector sending turned off (outbox kept)")
+    elif action == "flush":
+        sent = flush_outbox()
+        if sent is None:
+            print("No collector configured")
+            return 1
+        left = len(list(get_outbox_dir().glob("*.json")))
+        print(f"Sent {sent} record(s), {left} still queued")
+        return 0 if not left else 1
+    elif action == "stats":
+        stats, fresh = fetch_fleet_stats()
+        if stats is None:
+            print("No fleet stats (collector unreachable or not configured)")
+            return 1
+        _configure_stdout()
+        if not fresh:
+            print("(collector unreachable, showing the last stats received)")
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+    else:
+        url = get_collector_url()
+        queued = len(list(get_outbox_dir().glob("*.json"))) if get_outbox_dir().exists() else 0
+        print(f"Collector: {url or 'not configured'}, {queued} record(s) queued")
+    return 0
+
+# ============================================
+# HTTP DASHBOARD
+# ============================================
+#
+# `--stats --serve [PORT]`: the dashboard as a local web page plus a JSON
+# API, answered from one in-memory progress index that the watcher keeps
+# current (as in watch mode and the indexer). Nothing is re-scanned per
+# request: responses are cached per index version, and the ETag is that
+# version plus the git-state TTL window, so a client revalidating
+# unchanged data gets a 304 without any work. Each ETag gets a snapshot
+# of the index; responses (and the git refresh) are built from it outside
+# the shared lock, once per key (other requests wait on its future), so a
+# slow search rebuild never stalls other clients or the watcher. Only a
+# request that would answer 200 can get a 304.
+#
+#   GET /                    dashboard page (?sort= &page= &status= &type= &name= &q=)
+#   GET /api/summary         totals, status counts, top tech, project types
+#   GET /api/projects        one page of progress rows (same parameters, page_size=)
+#   GET /api/projects/<id>   one project's progress entry
+#   GET /api/search?q=       full-text search (gemini=1, limit=N)
+#   GET /metrics             Prometheus text exposition (see METRICS EXPOSITION)
+
+DASHBOARD_PORT = 8766
+DASHBOARD_CACHE_SIZE = 256  # responses kept per index version
+
+def _query_filters(query):
+    """select_projects() arguments from parsed URL query parameters."""
+    first = {name: values[0] for name, values in query.items() if values and values[0]}
+    sort = first.get("sort", DEFAULT_SORT)
+    if sort not in DASHBOARD_SORTS:
+        raise ValueError(f"unknown sort: {sort}")
+    filters = {
+        "status": first["status"].split(",") if "status" in first else None,
+        "project_type": first.get("type"),
+        "name": first.get("name"),
+        "min_progress": int(first["min_progress"]) if "min_progress" in first else None,
+        "max_progress": int(first["max_progress"]) if "max_progress" in first else None
+    }
+    return {
+        "sort": sort,
+        "page": max(1, int(first.get("page", 1))),
+        "page_size": max(1, min(500, int(first.get("page_size", DEFAULT_PAGE_SIZE)))),
+        "reverse": first.get("reverse") in ("1", "true"),
+        "filters": {k: v for k, v in filters.items() if v is not None}
+    }
+
+def _dashboard_page(state, query, args):
+    """HTML page: the terminal dashboard in a <pre>, with paging links and a search box."""
+    stats = summarize_stats(state["projects"], state["progress"])
+    rows, matched = select_projects(stats["projects"], args["sort"], args["page"], args["page_size"],
+                                    args["reverse"], **args["filters"])
+    page_info = _page_info(args["page"], args["page_size"], matched, args["sort"])
+    lines = render_dashboard(stats, rows, (args["page"] - 1) * args["page_size"] + 1, page_info)
+    search = (query.get("q") or [""])[0]
+    if search:
+        _ensure_search_index(state, False)
+        lines += render_search_results(search, search_projects(search))
+    
+    def link(label, **changes):
+        params = {name: values[0] for name, values in query.items() if values}
+        params.update({name: str(value) for name, value in changes.items()})
+        return f'<a href="/?{html.escape(urllib.parse.urlencode(params))}">{label}</a>'
+    
+    pages = max(1, -(-matched // args["page_size"]))
+    nav = [link("&laquo; Truoc", page=args["page"] - 1) if args["page"] > 1 else "",
+           link("Sau &raquo;", page=args["page"] + 1) if args["page"] < pages else ""]
+    nav += [link(name, sort=name, page=1) for name in DASHBOARD_SORTS]
+    return (
+        '<!doctype html><html><head><meta charset="utf-8"><title>VibeCoding Dashboard</title>'
+        '<style>body{font-family:monospace;margin:2em}nav a{margin-right:1em}</style></head><body>'
+        f'<form action="/"><input name="q" value="{html.escape(search)}" placeholder="Tim trong CONTEXT.md">'
+        f' <button>Tim</button></form><pre>{html.escape(chr(10).join(lines))}</pre>'
+        f'<nav>{" ".join(part for part in nav if part)}</nav></body></html>'
+    )
+
+def _ensure_search_index(state, include_gemini):
+    """Bring the search index up to date once per index version (not per query)."""
+    done = state.setdefault("search_versions", {})
+    with state.setdefault("search_lock", threading.Lock()):  # One update at a time
+        if done.get(include_gemini) != state["version"]:
+            update_search_index(include_gemini)
+            done[include_gemini] = state["version"]
+
+def _dashboard_response(state, path, query):
+    """(status, content type, payload) for a dashboard request."""
+    if path == "/":
+        return 200, "text/html; charset=utf-8", _dashboard_page(state, query, _query_filters(query))
+    if path == "/api/summary":
+        stats = aggregate_stats(state["projects"], ("total", "status", "top_tech", "type_counts"), state["progress"])
+        return 200, "application/json", stats
+    if path == "/api/projects":
+        args = _query_filters(query)
+        rows, matched = select_projects(state["progress"], args["sort"], args["page"], args["page_size"],
+                                        args["reverse"], **args["filters"])
+        return 200, "application/json", {"page": args["page"], "page_size": args["page_size"],
+                                         "matched": matched, "projects": rows}
+    if path.startswith("/api/projects/"):
+        project_id = urllib.parse.unquote(path[len("/api/projects/"):])
+        positions = state.get("positions_by_id")
+        if positions is None or state.get("positions_version") != state["version"]:
+            positions = state["positions_by_id"] = {p.get("id"): pos for pos, p in enumerate(state["progress"])}
+            state["positions_version"] = state["version"]
+        if project_id not in positions:
+            return 404, "application/json", {"error": "project not found"}
+        return 200, "application/json", state["progress"][positions[project_id]]
+    if path == "/api/search":
+        search = (query.get("q") or [""])[0]
+        include_gemini = (query.get("gemini") or [""])[0] in ("1", "true")
+        limit = max(1, min(100, int((query.get("limit") or [10])[0])))
+        _ensure_search_index(state, include_gemini)
+        return 200, "application/json", {"query": search, "results": search_projects(search, include_gemini, limit)}
+    return 404, "application/json", {"error": "not found"}
+
+def _build_dashboard_response(view, path, query):
+    """(status, content type, body bytes) for a dashboard request."""
+    try:
+        status, content_type, payload = _dashboard_response(view, path, urllib.parse.parse_qs(query))
+    except ValueError as e:
+        status, content_type, payload = 400, "application/json", {"error": str(e)}
+    body = payload.encode('utf-8') if isinstance(payload, str) else \
+        json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    return status, content_type, body
+
+def _claim_future(table, key, limit=None):
+    """
+    (future, owner) for key in table; owner is True for the first caller,
+    who must compute it (_run_claimed). Call under the lock guarding table.
+    """
+    if key in table:
+        return table[key], False
+    if limit is not None and len(table) >= limit:
+        table.pop(next(iter(table)))
+    table[key] = Future()
+    return table[key], True
+
+def _run_claimed(claimed, build):
+    """Result of a claimed future: computed here by its owner, awaited by everyone else."""
+    future, owner = claimed
+    if owner:
+        try:
+            future.set_result(build())
+        except BaseException as e:
+            future.set_exception(e)
+    return future.result()
+
+def serve_dashboard(host="127.0.0.1", port=DASHBOARD_PORT, interval=WATCH_INTERVAL):
+    """Serve the dashboard and JSON API in the foreground until Ctrl+C."""
+    state = _new_progress_index()
+    state["search_versions"], state["search_lock"] = {}, threading.Lock()
+    lock = threading.Lock()  # Guards state (watcher) and current
+    instance = uuid.uuid4().hex[:8]  # A restart invalidates every ETag
+    # Per ETag: index snapshot, git refresh future and response futures
+    current = {"etag": None, "view": None, "git": {}, "cache": {}}
+    
+    class DashboardRequestHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive
+        disable_nagle_algorithm = True  # Headers and body are separate writes
+        
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            if url.path == "/metrics":
+                with lock:
+                    fleet_lines = state.get("metrics_lines") or fleet_metric_lines(state["progress"])
+                return self._send(200, METRICS_CONTENT_TYPE,
+                                  render_metrics(fleet_lines=fleet_lines).encode('utf-8'), None)
+            with lock:
+                # Git state is cached for GIT_DIRTY_TTL; refresh it with the ETag window
+                etag = f'"{instance}-{state["version"]}-{int(time.time() // GIT_DIRTY_TTL)}"'
+                if current["etag"] != etag:
+                    view = {**state, "projects": list(state["projects"]), "progress": list(state["progress"])}
+                    current.update(etag=etag, view=view, git={}, cache={})
+                view = current["view"]
+                git = _claim_future(current["git"], "git")
+                response = _claim_future(current["cache"], (url.path, url.query), DASHBOARD_CACHE_SIZE)
             
-            print(f"|  | {i}. {name:<25}" + " " * (28 - len(name)) + "|  |")
-            print(f"|  |    {bar} {progress:>3}%  |  {phase:<18}|  |")
-            if i < len(stats['projects'][:5]):
-                print("|  |" + " " * 58 + "|  |")
+            try:
+                _run_claimed(git, lambda: get_git_activity(view["progress"]))
+                count_metric("response_misses" if response[1] else "response_hits")
+                status, content_type, body = _run_claimed(
+                    response, lambda: _build_dashboard_response(view, url.path, url.query))
+            except Exception as e:
+                with lock:  # Do not keep serving the failure
+                    for table, future in ((current["git"], git[0]), (current["cache"], response[0])):
+                        for key in [k for k, f in table.items() if f is future]:
+                            del table[key]
+                log_error(f"Dashboard request failed: {self.path}", e)
+                return self._send(500, "application/json", b'{"error": "internal error"}', None)
+            if status == 200 and _etag_matches(self.headers.get("If-None-Match"), etag):
+                return self._send(304, None, b"", etag)
+            self._send(status, content_type, body, etag if status == 200 else None)
         
-        print("|  +" + "-" * 58 + "+  |")
-        print("|" + " " * 62 + "|")
+        def _send(self, status, content_type, body, etag):
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            if content_type:
+                self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
     
-    # Tech stack section
-    if stats['top_tech']:
-        print("|  TECH STACK PHO BIEN" + " " * 41 + "|")
-        total = stats['total'] if stats['total'] > 0 else 1
-        for tech, count in stats['top_tech'][:3]:
-            percent = round(count / total * 100)
-            bar = create_progress_bar(percent, 15)
-            tech_display = tech[:12]
-            print(f"|  +-- {tech_display:<12} {bar} {percent:>3}%" + " " * (23 - len(tech_display)) + "|")
-        print("|" + " " * 62 + "|")
+    server = http.server.ThreadingHTTPServer((host, port), DashboardRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Dashboard on http://{host}:{server.server_address[1]}/ (Ctrl+C to stop)")
+    
+    try:
+        while True:
+            changed = _watch_wait(state["watcher"], interval)
+            if changed:
+                with lock:
+                    _apply_watch_changes(state, changed)
+                flush_error_log()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        _watch_close(state["watcher"])
+    return True
+
+# ============================================
+# WRITE STRESS TEST
+# ============================================
+#
+# `analytics.py --stress-test [WRITERS] [RECORDS]` starts WRITERS processes
+# that each track RECORDS projects at once against a throwaway store
+# (HOME points to a temp directory), then checks that every record landed
+# exactly once, no queue entries are left and every shard checksum holds.
+
+STRESS_WRITERS = 32
+STRESS_RECORDS = 25  # per writer
+
+def run_stress_writer(writer, count):
+    """Child process of run_stress_test: track count projects. Returns exit code."""
+    failed = 0
+    for n in range(count):
+        if not track_project({"project_name": f"stress-{writer}-{n}",
+                              "project_path": str(Path.home() / "projects" / f"stress-{writer}-{n}"),
+                              "project_types": ["stress"], "tech_stack": {}}):
+            failed += 1
+    return 1 if failed else 0
+
+def run_stress_test(writers=STRESS_WRITERS, count=STRESS_RECORDS):
+    """Concurrent writers against a temp store. Returns exit code (0 = no lost records)."""
+    with tempfile.TemporaryDirectory(prefix="vibecoding-stress-") as home:
+        env = {**os.environ, "HOME": home, "USERPROFILE": home}
+        started = time.perf_counter()
+        children = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--stress-writer", str(w), str(count)],
+                                     env=env) for w in range(writers)]
+        codes = [child.wait() for child in children]
+        elapsed = time.perf_counter() - started
+        
+        # Read the temp store from this process
+        previous = os.environ.get("HOME"), os.environ.get("USERPROFILE")
+        os.environ["HOME"] = os.environ["USERPROFILE"] = home
+        try:
+            records = list(iter_projects(include_expired=True))
+            pending = list(get_pending_dir().glob("*.json")) if get_pending_dir().exists() else []
+            mismatched = verify_shards()
+        finally:
+            for name, value in zip(("HOME", "USERPROFILE"), previous):
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
     
-    print("+" + "=" * 62 + "+")
-    print()
+    expected = writers * count
+    names = {r.get("project_name") for r in records}
+    ok = (not any(codes) and len(records) == expected and len(names) == expected
+          and not pending and not mismatched)
+    print(f"{writers} writers x {count} records in {elapsed:.1f}s: {len(records)}/{expected} stored, "
+          f"{len(names)} distinct, {len(pending)} left in queue, "
+          f"{len(mismatched)} checksum mismatch(es), {sum(1 for c in codes if c)} writer(s) failed")
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
 
 # ============================================
 # CLI
 # ============================================
 
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) > 1 and sys.argv[1] == "--help":
         print("VibeCoding Analytics Dashboard")
         print("Usage:")
         print("  python analytics.py          # Show dashboard")
+        print("  python analytics.py --watch  # Live dashboard, redraws on changes (Ctrl+C to exit)")
+        print("  python analytics.py --sort progress|updated|status|name|created|commit|dirty [--reverse] [--page N] [--page-size N]")
+        print("  python analytics.py --json | --jsonl | --csv [--fields a,b] [--status s]  # Machine-readable stats")
+        print("  python analytics.py NAME|ID|PATH [--json]  # Detail of one project")
+        print("  python analytics.py --since-last | --since DATE  # Only projects whose tasks changed, with deltas")
+        print("  python analytics.py --context status|decisions|issues|next-steps [--phase P]  # One section, all projects")
+        print("  python analytics.py --search \"postgresql\" [--gemini]  # Full-text search in CONTEXT.md")
+        print("  python analytics.py --serve [PORT] [--host H]  # Web dashboard + JSON API (ETag / 304)")
+        print("  python analytics.py --metrics  # Prometheus text exposition (watch / indexer / --serve also keep ~/.vibecoding/metrics.prom)")
+        print("  python analytics.py --timings  # Also print a phase timing breakdown (stderr; works with any view)")
+        print("  python analytics.py --report  # Progress percentiles, histogram, per-tech completion (faster with numpy)")
+        print("  python analytics.py --indexer [start|stop|status|run]  # Background progress indexer")
+        print("  python analytics.py --collector serve [PORT] [--host H] [--store DIR] | use URL | off | flush | stats | status  # Team collector")
+        print("  python analytics.py --compress-shards [gzip|lzma]  # Compress shards older than 3 months")
+        print("  python analytics.py --export [file]  # Pretty-printed JSON export of all projects")
+        print("  python analytics.py --verify  # Check shard checksums")
+        print("  python analytics.py --discover ROOT [ROOT ...] [--dry-run]  # Register untracked / moved projects")
+        print("  python analytics.py --import SOURCE [SOURCE ...]  # Merge other machines' exports / .vibecoding dirs into this store")
+        print("  python analytics.py --merge SOURCE [SOURCE ...] --output FILE  # Merge exports into a new export file")
+        print("  python analytics.py --compact [--purge]  # Drop expired tombstones and duplicate ids (--purge: all tombstones)")
+        print("  python analytics.py --rebuild-summary  # Recount the materialized stats summary")
+        print(f"  python analytics.py --stress-test [WRITERS] [RECORDS]  # {STRESS_WRITERS} concurrent writers on a temp store, checks no record is lost")
         print("  python analytics.py --help   # Show this help")
+    elif len(sys.argv) > 1 and sys.argv[1] == "--compress-shards":
+        method = sys.argv[2] if len(sys.argv) > 2 else "gzip"
+        count = compress_old_shards(method=method)
+        print(f"Compressed {count} shard(s) with {method}")
+    elif len(sys.argv) > 1 and sys.argv[1] == "--export":
+        exported = export_analytics(sys.argv[2] if len(sys.argv) > 2 else None)
+        if not exported:
+            print("Export failed, see ~/.vibecoding/errors.log")
+            sys.exit(1)
+        print(f"Exported to {exported}")
+    elif len(sys.argv) > 1 and sys.argv[1] == "--verify":
+        mismatched = verify_shards()
+        if mismatched:
+            print(f"Checksum mismatch: {', '.join(mismatched)}")
+            sys.exit(1)
+        print("All shards OK")
+    elif len(sys.argv) > 1 and sys.argv[1] == "--discover":
+        roots = [a for a in sys.argv[2:] if a != "--dry-run"]
+        if not roots:
+            print("Usage: python analytics.py --discover ROOT [ROOT ...] [--dry-run]")
+            sys.exit(2)
+        sys.exit(run_discover_cli(roots, "--dry-run" in sys.argv))
+    elif len(sys.argv) > 1 and sys.argv[1] in ("--import", "--merge"):
+        sources = sys.argv[2:]
+        output = None
+        if "--output" in sources:
+            at = sources.index("--output")
+            output = sources[at + 1] if at + 1 < len(sources) else None
+            sources = sources[:at] + sources[at + 2:]
+        if not sources or (sys.argv[1] == "--merge") != bool(output):
+            print("Usage: python analytics.py --import SOURCE [SOURCE ...]")
+            print("       python analytics.py --merge SOURCE [SOURCE ...] --output FILE")
+            sys.exit(2)
+        sys.exit(run_merge_cli(sources, output))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--compact":
+        result = compact_analytics(purge="--purge" in sys.argv)
+        if result is None:
+            print("Compaction failed, see ~/.vibecoding/errors.log")
+            sys.exit(1)
+        print(f"Compacted: {result[0]} -> {result[1]} records")
+    elif len(sys.argv) > 1 and sys.argv[1] == "--rebuild-lookup":
+        # Started in the background by find_projects() when the index lags
+        if not _lookup_is_current(load_shard_index()) and not rebuild_lookup_index():
+            sys.exit(1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--rebuild-summary":
+        totals = rebuild_summary()
+        if totals is None:
+            print("Rebuild failed, see ~/.vibecoding/errors.log")
+            sys.exit(1)
+        print(f"Summary rebuilt: {totals['total']} projects in {len(totals['month_counts'])} month(s)")
+    elif len(sys.argv) > 1 and sys.argv[1] == "--metrics":
+        _configure_stdout()
+        sys.stdout.write(render_metrics(get_all_projects_progress()))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--collector":
+        sys.exit(run_collector_cli(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--stress-test":
+        numbers = [int(a) for a in sys.argv[2:4]]
+        sys.exit(run_stress_test(*numbers))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--stress-writer":
+        sys.exit(run_stress_writer(int(sys.argv[2]), int(sys.argv[3])))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--indexer":
+        action = sys.argv[2] if len(sys.argv) > 2 else "status"
+        if action == "run":
+            run_indexer()
+        elif action == "start":
+            print("Indexer started" if start_indexer() else "Indexer failed to start, see ~/.vibecoding/errors.log")
+        elif action == "stop":
+            print("Indexer stopped" if stop_indexer() else "Indexer is not running")
+        else:
+            info = query_indexer("ping")
+            print(f"Indexer running (pid {info['pid']}, {info['projects']} projects)" if info else "Indexer is not running")
     else:
-        print_dashboard()
+        sys.exit(run_stats_cli(sys.argv[1:]))
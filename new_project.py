@@ -7,6 +7,12 @@ Creates new projects with selective agent/skill copying based on project types.
 Usage:
     python new_project.py           # Create new project
     python new_project.py --stats   # View analytics dashboard
+    python new_project.py --stats --watch   # Live dashboard (redraws on changes)
+    python new_project.py --stats --json    # Machine-readable stats (also --jsonl, --csv)
+    python new_project.py --stats NAME      # Detail of one project (name, id or path)
+    python new_project.py --discover [ROOT ...] [--dry-run]  # Register untracked / moved projects
+    python new_project.py --timings          # Create, then print a phase timing breakdown
+    python new_project.py --save-timings     # ...and store the timings in the analytics record
     
 Or via Antigravity chat:
     /new
@@ -16,14 +22,20 @@ Or via Antigravity chat:
 import os
 import sys
 import shutil
+from contextlib import nullcontext
 from pathlib import Path
 
+def span(name):
+    """No-op phase timer; --timings swaps in analytics.span (imported lazily)."""
+    return nullcontext()
+
 # ============================================
 # CONFIGURATION
 # ============================================
 
 MASTER_TEMPLATE_PATH = Path(r"D:\VibeCoding-Template\.agent")
 DEFAULT_PROJECT_PATH = Path(r"D:\Projects")
+SAVE_TIMINGS = False  # --save-timings: keep each creation's phase timings in analytics
 MAX_TYPES = 3
 STARTER_PATH = Path(__file__).parent
 EXTRA_WORKFLOWS = [
@@ -648,7 +660,8 @@ def check_tools():
     print("\n  🕵️‍♂️  Auto-Discovery System:")
     
     for tool, cmd in checkers.items():
-        ver = get_cmd_output(cmd)
+        with span(tool):
+            ver = get_cmd_output(cmd)
         if ver:
             # Clean version string
             ver = ver.split('\n')[0]  # First line only
@@ -932,118 +945,126 @@ def copy_selective(source_base, dest_base, merged_req, project_name, selected_ty
     source_base = Path(source_base)
     
     # Copy agents
-    print("\n  📁 Copying agents...")
-    agents_src = source_base / "agents"
-    agents_dest = dest_base / "agents"
-    agents_dest.mkdir(exist_ok=True)
-    
-    for agent in merged_req["agents"]:
-        src_file = agents_src / agent
-        if src_file.exists():
-            shutil.copy2(src_file, agents_dest / agent)
-            total_bytes += src_file.stat().st_size
-            print_success(f"agents/{agent}")
-        else:
-            print_info(f"Skip (not found): agents/{agent}")
+    with span("agents"):
+        print("\n  📁 Copying agents...")
+        agents_src = source_base / "agents"
+        agents_dest = dest_base / "agents"
+        agents_dest.mkdir(exist_ok=True)
+    
+        for agent in merged_req["agents"]:
+            src_file = agents_src / agent
+            if src_file.exists():
+                shutil.copy2(src_file, agents_dest / agent)
+                total_bytes += src_file.stat().st_size
+                print_success(f"agents/{agent}")
+            else:
+                print_info(f"Skip (not found): agents/{agent}")
     
     # Copy skills
-    print("\n  📁 Copying skills...")
-    skills_src = source_base / "skills"
-    skills_dest = dest_base / "skills"
-    skills_dest.mkdir(exist_ok=True)
-    
-    for skill in merged_req["skills"]:
-        src_dir = skills_src / skill
-        if src_dir.exists() and src_dir.is_dir():
-            shutil.copytree(src_dir, skills_dest / skill, dirs_exist_ok=True)
-            size = sum(f.stat().st_size for f in src_dir.rglob('*') if f.is_file())
-            total_bytes += size
-            print_success(f"skills/{skill}/")
-        else:
-            print_info(f"Skip (not found): skills/{skill}")
+    with span("skills"):
+        print("\n  📁 Copying skills...")
+        skills_src = source_base / "skills"
+        skills_dest = dest_base / "skills"
+        skills_dest.mkdir(exist_ok=True)
+    
+        for skill in merged_req["skills"]:
+            src_dir = skills_src / skill
+            if src_dir.exists() and src_dir.is_dir():
+                shutil.copytree(src_dir, skills_dest / skill, dirs_exist_ok=True)
+                size = sum(f.stat().st_size for f in src_dir.rglob('*') if f.is_file())
+                total_bytes += size
+                print_success(f"skills/{skill}/")
+            else:
+                print_info(f"Skip (not found): skills/{skill}")
     
     # Copy shared modules
-    print("\n  📁 Copying shared modules...")
-    shared_src = source_base / ".shared"
-    shared_dest = dest_base / ".shared"
-    shared_dest.mkdir(exist_ok=True)
-    
-    for module in merged_req["shared"]:
-        src_dir = shared_src / module
-        if src_dir.exists() and src_dir.is_dir():
-            shutil.copytree(src_dir, shared_dest / module, dirs_exist_ok=True)
-            size = sum(f.stat().st_size for f in src_dir.rglob('*') if f.is_file())
-            total_bytes += size
-            print_success(f".shared/{module}/")
-        else:
-            print_info(f"Skip (not found): .shared/{module}")
+    with span("shared"):
+        print("\n  📁 Copying shared modules...")
+        shared_src = source_base / ".shared"
+        shared_dest = dest_base / ".shared"
+        shared_dest.mkdir(exist_ok=True)
+    
+        for module in merged_req["shared"]:
+            src_dir = shared_src / module
+            if src_dir.exists() and src_dir.is_dir():
+                shutil.copytree(src_dir, shared_dest / module, dirs_exist_ok=True)
+                size = sum(f.stat().st_size for f in src_dir.rglob('*') if f.is_file())
+                total_bytes += size
+                print_success(f".shared/{module}/")
+            else:
+                print_info(f"Skip (not found): .shared/{module}")
     
     # Copy workflows
-    print("\n  📁 Copying workflows...")
-    workflows_src = source_base / "workflows"
-    starter_workflows_src = STARTER_PATH / ".agent" / "workflows"
+    with span("workflows"):
+        print("\n  📁 Copying workflows...")
+        workflows_src = source_base / "workflows"
+        starter_workflows_src = STARTER_PATH / ".agent" / "workflows"
     
-    workflows_dest = dest_base / "workflows"
-    workflows_dest.mkdir(exist_ok=True)
+        workflows_dest = dest_base / "workflows"
+        workflows_dest.mkdir(exist_ok=True)
     
-    for workflow in merged_req["workflows"]:
-        # Try finding in master template
-        src_file = workflows_src / workflow
+        for workflow in merged_req["workflows"]:
+            # Try finding in master template
+            src_file = workflows_src / workflow
         
-        # If not found, try finding in starter .agent
-        if not src_file.exists():
-            src_file = starter_workflows_src / workflow
+            # If not found, try finding in starter .agent
+            if not src_file.exists():
+                src_file = starter_workflows_src / workflow
             
-        if src_file.exists():
-            shutil.copy2(src_file, workflows_dest / workflow)
-            total_bytes += src_file.stat().st_size
-            print_success(f"workflows/{workflow}")
-        else:
-            print_info(f"Skip (not found): workflows/{workflow}")
+            if src_file.exists():
+                shutil.copy2(src_file, workflows_dest / workflow)
+                total_bytes += src_file.stat().st_size
+                print_success(f"workflows/{workflow}")
+            else:
+                print_info(f"Skip (not found): workflows/{workflow}")
             
     # Copy scripts
-    print("\n  📁 Copying scripts...")
-    scripts_src = source_base / "scripts"
-    scripts_dest = dest_base / "scripts"
-    scripts_dest.mkdir(exist_ok=True)
-    
-    for script in merged_req["scripts"]:
-        src_file = scripts_src / script
-        if src_file.exists():
-            shutil.copy2(src_file, scripts_dest / script)
-            total_bytes += src_file.stat().st_size
-            print_success(f"scripts/{script}")
-        else:
-            print_info(f"Skip (not found): scripts/{script}")
+    with span("scripts"):
+        print("\n  📁 Copying scripts...")
+        scripts_src = source_base / "scripts"
+        scripts_dest = dest_base / "scripts"
+        scripts_dest.mkdir(exist_ok=True)
+    
+        for script in merged_req["scripts"]:
+            src_file = scripts_src / script
+            if src_file.exists():
+                shutil.copy2(src_file, scripts_dest / script)
+                total_bytes += src_file.stat().st_size
+                print_success(f"scripts/{script}")
+            else:
+                print_info(f"Skip (not found): scripts/{script}")
     
     # Copy core folder (rules, etc.)
-    print("\n  📁 Copying core configuration...")
-    core_src = source_base / "core"
-    rules_src = source_base / "rules"
-    
-    if core_src.exists():
-        core_dest = dest_base / "core"
-        shutil.copytree(core_src, core_dest, dirs_exist_ok=True)
-        size = sum(f.stat().st_size for f in core_src.rglob('*') if f.is_file())
-        total_bytes += size
-        print_success("core/")
-    
-    if rules_src.exists():
-        rules_dest = dest_base / "rules"
-        shutil.copytree(rules_src, rules_dest, dirs_exist_ok=True)
-        size = sum(f.stat().st_size for f in rules_src.rglob('*') if f.is_file())
-        total_bytes += size
-        print_success("rules/")
+    with span("core"):
+        print("\n  📁 Copying core configuration...")
+        core_src = source_base / "core"
+        rules_src = source_base / "rules"
+    
+        if core_src.exists():
+            core_dest = dest_base / "core"
+            shutil.copytree(core_src, core_dest, dirs_exist_ok=True)
+            size = sum(f.stat().st_size for f in core_src.rglob('*') if f.is_file())
+            total_bytes += size
+            print_success("core/")
+    
+        if rules_src.exists():
+            rules_dest = dest_base / "rules"
+            shutil.copytree(rules_src, rules_dest, dirs_exist_ok=True)
+            size = sum(f.stat().st_size for f in rules_src.rglob('*') if f.is_file())
+            total_bytes += size
+            print_success("rules/")
     
     # Generate GEMINI.md
-    print("\n  📄 Generating GEMINI.md...")
-    generate_gemini_md(dest_base, project_name, selected_types, merged_req, tech_stack, env_info)
-    print_success("GEMINI.md")
+    with span("GEMINI.md"):
+        print("\n  📄 Generating GEMINI.md...")
+        generate_gemini_md(dest_base, project_name, selected_types, merged_req, tech_stack, env_info)
+        print_success("GEMINI.md")
     
     # Generate CONTEXT.md for project memory
-    print("\n  📄 Generating CONTEXT.md...")
-    generate_context_md(dest_base, project_name, selected_types, tech_stack)
-    print_success("CONTEXT.md")
+    with span("CONTEXT.md"):
+        print("\n  📄 Generating CONTEXT.md...")
+        generate_context_md(dest_base, project_name, selected_types, tech_stack)
+        print_success("CONTEXT.md")
     
     return total_bytes
 
@@ -1318,7 +1339,7 @@ def format_size(bytes_count):
 # ============================================
 
 def main():
-    """Main wizard flow."""
+    """Main wizard flow. Returns the analytics id of the new project (or None)."""
     global MASTER_TEMPLATE_PATH
     
     print_header()
@@ -1341,11 +1362,12 @@ def main():
     print_header()
     
     # Step 0: Auto-Discovery
-    env_info = {
-        "git_user": get_git_user(),
-        "tools": check_tools(),
-        "os_info": detect_os_info()
-    }
+    with span("discovery"):
+        env_info = {
+            "git_user": get_git_user(),
+            "tools": check_tools(),
+            "os_info": detect_os_info()
+        }
     print(f"    🖥️  System: {env_info['os_info']['os']} | Shell: {env_info['os_info']['shell']}")
     print(f"    👤 Git User: {env_info['git_user']['name']} <{env_info['git_user']['email']}>\n")
     
@@ -1416,15 +1438,16 @@ def main():
     print("  🚀 ĐANG TẠO DỰ ÁN...")
     print("=" * 60)
     
-    total_bytes = copy_selective(
-        MASTER_TEMPLATE_PATH,
-        agent_path,
-        merged,
-        project_name,
-        selected_types,
-        tech_stack,
-        env_info  # Pass env_info to copy_selective
-    )
+    with span("copy"):
+        total_bytes = copy_selective(
+            MASTER_TEMPLATE_PATH,
+            agent_path,
+            merged,
+            project_name,
+            selected_types,
+            tech_stack,
+            env_info  # Pass env_info to copy_selective
+        )
     
     # Create README.md for the project
     readme_content = f'''# {project_name.replace("-", " ").title()}
@@ -1448,7 +1471,8 @@ def main():
 *Generated by VibeCoding*
 '''
     readme_path = full_project_path / "README.md"
-    readme_path.write_text(readme_content, encoding="utf-8")
+    with span("files"):
+        readme_path.write_text(readme_content, encoding="utf-8")
     
     # Create .gitignore
     print("\n  📄 Creating .gitignore...")
@@ -1532,13 +1556,15 @@ temp/
 # ===================================
 '''
     gitignore_path = full_project_path / ".gitignore"
-    gitignore_path.write_text(gitignore_content, encoding="utf-8")
+    with span("files"):
+        gitignore_path.write_text(gitignore_content, encoding="utf-8")
     print_success(".gitignore")
     
-    # Track project in analytics
+    # Track project in analytics (timings are added once the wizard span closes)
+    project_id = None
     try:
         from analytics import track_project
-        track_project({
+        project_id = track_project({
             "project_name": project_name,
             "project_path": str(full_project_path),
             "project_types": selected_types,
@@ -1567,20 +1593,46 @@ temp/
     print("     3. Bắt đầu VibeCoding! 🎉")
     print("     4. Xem dashboard: python new_project.py --stats")
     print()
+    return project_id
 
 if __name__ == "__main__":
     # Check for --stats flag
     if len(sys.argv) > 1 and sys.argv[1] == "--stats":
         try:
-            from analytics import print_dashboard
-            print_dashboard()
+            from analytics import run_stats_cli
         except ImportError:
             print("\n  ❌ analytics.py not found. Please check installation.")
             sys.exit(1)
-        sys.exit(0)
+        sys.exit(run_stats_cli(sys.argv[2:]))
+    
+    # Register projects that were copied, moved or created before analytics
+    if len(sys.argv) > 1 and sys.argv[1] == "--discover":
+        try:
+            from analytics import run_discover_cli
+        except ImportError:
+            print("\n  ❌ analytics.py not found. Please check installation.")
+            sys.exit(1)
+        roots = [a for a in sys.argv[2:] if a != "--dry-run"] or [DEFAULT_PROJECT_PATH]
+        sys.exit(run_discover_cli(roots, "--dry-run" in sys.argv))
+    
+    # Phase timing breakdown (printed after the wizard finishes)
+    timings = "--timings" in sys.argv or "--save-timings" in sys.argv
+    if timings:
+        try:
+            from analytics import span, enable_timings, render_timings, timing_summary, update_project_record
+            enable_timings()
+            SAVE_TIMINGS = "--save-timings" in sys.argv
+        except ImportError:  # analytics.py missing: timings stay no-ops
+            timings = False
     
     try:
-        main()
+        with span("wizard"):
+            project_id = main()
+        if timings:
+            # Only now are the wizard total and the track_project span closed
+            if SAVE_TIMINGS and project_id and not update_project_record(project_id, {"timings": timing_summary()}):
+                print_error("Không lưu được timings vào analytics")
+            print("\n".join(render_timings()))
     except KeyboardInterrupt:
         print("\n\n  👋 Đã hủy.")
         sys.exit(0)
@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import analytics  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """analytics with ~/.vibecoding in a temp HOME and no background processes."""
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("USERPROFILE", str(home))
+    monkeypatch.setitem(analytics._lookup_state, "rebuild_started", True)
+    monkeypatch.setitem(analytics._store_state, "root", None)
+    monkeypatch.setitem(analytics._collector_state, "atexit_registered", True)
+    yield analytics
+    analytics.flush_error_log()  # Into the temp HOME, not at interpreter exit
+
+
+@pytest.fixture
+def track(store, tmp_path):
+    """track(name, path=None, **fields) -> id; creates the project directory by default."""
+    def track(name, path=None, **fields):
+        if path is None:
+            path = tmp_path / "Projects" / name
+            path.mkdir(parents=True, exist_ok=True)
+        project_id = store.track_project({"project_name": name, "project_path": str(path),
+                                          "project_types": ["saas-platform"], "tech_stack": {}, **fields})
+        assert project_id
+        return project_id
+    return track
@@ -0,0 +1,100 @@
+import io
+import sys
+import types
+
+import pytest
+
+
+class _Terminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+class _Kernel32:
+    def __init__(self, mode):
+        self.mode = mode
+        self.set_calls = []
+
+    def GetStdHandle(self, handle):
+        return 7
+
+    def GetConsoleMode(self, handle, mode_ref):
+        mode_ref._obj.value = self.mode
+        return 1
+
+    def SetConsoleMode(self, handle, mode):
+        self.set_calls.append(mode)
+        return 1
+
+
+def test_ansi_only_for_terminals(store, monkeypatch):
+    monkeypatch.setattr(sys, "stdout", io.StringIO())
+    assert store._configure_stdout(ansi=True) is False
+    monkeypatch.setattr(sys, "stdout", _Terminal())
+    assert store._configure_stdout(ansi=True) is True
+    assert store._configure_stdout() is False
+
+
+def test_windows_vt_mode_without_subprocess(store, monkeypatch):
+    kernel32 = _Kernel32(mode=0x0003)
+    monkeypatch.setattr(store.ctypes, "windll", types.SimpleNamespace(kernel32=kernel32), raising=False)
+    monkeypatch.setattr(store.os, "system", lambda command: _no_subprocess(command))
+    monkeypatch.setattr(sys, "platform", "win32")
+    monkeypatch.setattr(sys, "stdout", _Terminal())
+
+    assert store._configure_stdout(ansi=True) is True
+    assert kernel32.set_calls == [0x0003 | store.ENABLE_VIRTUAL_TERMINAL_PROCESSING]
+
+    monkeypatch.setattr(sys, "stdout", io.StringIO())
+    assert store._configure_stdout() is False  # --json and friends: console left alone
+    assert len(kernel32.set_calls) == 1
+
+
+def _no_subprocess(command):
+    raise AssertionError(f"unexpected subprocess: {command}")
+
+
+@pytest.mark.parametrize("argv", [
+    "--search x --context status",
+    "proj --search x",
+    "--since 2026-01-01 --since-last",
+    "--serve --watch",
+    "--search x --csv",
+    "proj --csv",
+    "--watch --json",
+    "--search thing --status paused",
+    "--context decisions --name zzz",
+    "--phase Testing",
+    "--gemini",
+    "--host 0.0.0.0",
+    "--json --sort name --page 3",
+    "--watch --page 2",
+    "--fields id",
+    "--only summary",
+    "--search x --report",
+])
+def test_unsupported_combinations_are_usage_errors(store, argv, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        store.run_stats_cli(argv.split())
+    assert exit_info.value.code == 2
+    assert "error:" in capsys.readouterr().err
+
+
+def test_supported_options_reach_their_view(store, track, monkeypatch):
+    calls = {}
+    monkeypatch.setattr(store, "print_dashboard", lambda *args, **kwargs: calls.setdefault("dashboard", (args, kwargs)))
+    monkeypatch.setattr(store, "search_projects", lambda *args: calls.setdefault("search", args) and [])
+    monkeypatch.setattr(store, "update_search_index", lambda *args: None)
+
+    assert store.run_stats_cli("--sort name --page 2 --page-size 3 --status paused".split()) == 0
+    assert store.run_stats_cli("--search redis --gemini --limit 2".split()) == 0
+
+    assert calls["dashboard"] == (("name", 2, 3, False, False), {"status": ["paused"]})
+    assert calls["search"] == ("redis", True, 2)
+
+
+def test_json_stats_apply_filters_and_fields(store, track, capsys):
+    track("alpha")
+    track("beta")
+    assert store.run_stats_cli("--jsonl --name alp --fields name --only projects".split()) == 0
+    assert capsys.readouterr().out.splitlines() == ['{"name":"alpha"}']
@@ -0,0 +1,84 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+ANALYTICS = str(Path(__file__).resolve().parent.parent / "analytics.py")
+
+
+@pytest.fixture
+def collector(tmp_path):
+    """A collector subprocess with its own HOME; yields (url, store dir, its HOME)."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    home = tmp_path / "collector-home"
+    home.mkdir()
+    store = tmp_path / "team-store"
+    env = {**os.environ, "HOME": str(home), "USERPROFILE": str(home)}
+    process = subprocess.Popen([sys.executable, ANALYTICS, "--collector", "serve", str(port), "--store", str(store)],
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            urllib.request.urlopen(url + "/health", timeout=1).read()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                process.kill()
+                raise
+            time.sleep(0.05)
+    yield url, store, home
+    process.kill()
+    process.wait()
+
+
+def test_collector_keeps_team_records_in_its_own_store(store, track, collector, tmp_path):
+    url, team_store, collector_home = collector
+    store.set_collector_url(url)
+    project_id = track("shared")
+
+    assert store.flush_outbox() == 1
+
+    store.use_store_dir(team_store)
+    try:
+        assert [r["id"] for r in store.iter_projects()] == [project_id]
+    finally:
+        store.use_store_dir(None)
+    assert not (collector_home / ".vibecoding" / "shards").exists()
+    stats = json.loads(urllib.request.urlopen(url + "/stats").read())
+    assert stats["total"] == 1
+
+
+def test_unreadable_outbox_file_is_set_aside(store, track, collector):
+    url = collector[0]
+    store.set_collector_url(url)
+    track("good")
+    outbox = store.get_outbox_dir()
+    broken = outbox / "0000-broken.json"
+    broken.write_bytes(b"{not json")
+
+    assert store.flush_outbox() == 1
+    assert store.flush_outbox() == 0
+
+    assert not broken.exists()
+    assert (outbox / "0000-broken.json.rejected").exists()
+    assert list(outbox.glob("*.json")) == []
+
+
+def test_outbox_kept_when_collector_is_unreachable(store, track):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    store.set_collector_url(f"http://127.0.0.1:{port}")
+    track("offline")
+
+    assert store.flush_outbox(retries=0, timeout=1) == 0
+    assert len(list(store.get_outbox_dir().glob("*.json"))) == 1
@@ -0,0 +1,50 @@
+import shutil
+import subprocess
+
+import pytest
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+@pytest.fixture
+def git_env(monkeypatch):
+    for name in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{name}_NAME", "Test")
+        monkeypatch.setenv(f"GIT_{name}_EMAIL", "test@example.com")
+
+
+def _repo(path, dirty=False):
+    path.mkdir(parents=True, exist_ok=True)
+    subprocess.run(["git", "init", "-q", str(path)], check=True)
+    subprocess.run(["git", "-C", str(path), "commit", "-q", "--allow-empty", "-m", "init"], check=True)
+    if dirty:
+        (path / "new.txt").write_text("x", encoding="utf-8")
+    return str(path)
+
+
+def test_batch_status_survives_a_failing_repo(store, git_env, tmp_path):
+    clean = _repo(tmp_path / "a")
+    broken = _repo(tmp_path / "b")
+    dirty = _repo(tmp_path / "c", dirty=True)
+    (tmp_path / "b" / ".git" / "index").write_bytes(b"junk")
+
+    assert store._git_batch_status([clean, broken, dirty]) == {clean: False, dirty: True}
+
+
+def test_dashboard_checks_git_only_for_the_page(store, track, git_env, tmp_path, monkeypatch, capsys):
+    for name in ("one", "two", "three"):
+        track(name, _repo(tmp_path / "Projects" / name, dirty=True))
+    checked = []
+    batch_status = store._git_batch_status
+    monkeypatch.setattr(store, "_git_batch_status", lambda repos: checked.append(len(repos)) or batch_status(repos))
+
+    store.print_dashboard(page_size=1)
+    assert checked == [1]
+    assert "*" in capsys.readouterr().out  # The row shown is marked dirty
+
+    checked.clear()
+    store.print_dashboard(sort="dirty", page_size=1)
+    assert checked == [2]  # The third repo's state is still cached
+
+    cache = store.get_git_cache_path().read_text(encoding="utf-8")
+    assert all(name in cache for name in ("one", "two", "three"))
@@ -0,0 +1,76 @@
+import shutil
+
+
+def _ids(records):
+    return sorted(r["id"] for r in records)
+
+
+def test_find_by_id_name_and_path(store, track, tmp_path):
+    project_id = track("My-Shop")
+    track("other")
+    assert store.rebuild_lookup_index()
+    assert store._lookup_is_current(store.load_shard_index())
+
+    assert _ids(store.find_projects(project_id)) == [project_id]
+    assert _ids(store.find_projects("my-shop")) == [project_id]
+    assert _ids(store.find_projects("  MY-SHOP ")) == [project_id]
+    path = tmp_path / "Projects" / "My-Shop"
+    assert _ids(store.find_projects(str(path))) == [project_id]
+    assert _ids(store.find_projects(str(path / ".." / "My-Shop"))) == [project_id]
+    assert store.find_projects("missing") == []
+    assert store.find_projects("") == []
+
+
+def test_shared_name_returns_every_record(store, track, tmp_path):
+    first = track("shop")
+    second = track("shop", path=tmp_path / "elsewhere" / "shop")
+    store.rebuild_lookup_index()
+
+    assert _ids(store.find_projects("shop")) == sorted([first, second])
+
+
+def test_commit_keeps_current_index_up_to_date(store, track):
+    track("first")
+    store.rebuild_lookup_index()
+
+    added = track("second")
+
+    assert store._lookup_is_current(store.load_shard_index())
+    assert _ids(store.find_projects("second")) == [added]
+
+
+def test_lagging_index_falls_back_to_scanning_changed_shards(store, track):
+    track("first")
+    store.rebuild_lookup_index()
+    data = store.load_analytics()
+    data["projects"].append(dict(data["projects"][0], id="written-directly", project_name="direct"))
+    assert store.save_analytics(data)  # Not through commit_pending: the index is behind now
+
+    assert not store._lookup_is_current(store.load_shard_index())
+    assert _ids(store.find_projects("direct")) == ["written-directly"]
+    assert _ids(store.find_projects("written-directly")) == ["written-directly"]
+
+
+def test_missing_index_still_finds_projects(store, track):
+    project_id = track("first")
+    shutil.rmtree(store.get_lookup_dir(), ignore_errors=True)
+
+    assert _ids(store.find_projects("first")) == [project_id]
+
+
+def test_entries_shifted_by_compaction_are_not_trusted(store, track):
+    gone = track("gone")
+    kept = track("kept")
+    store.rebuild_lookup_index()
+    shutil.rmtree(store.find_projects(gone)[0]["project_path"])
+
+    store.compact_analytics(purge=True)
+
+    assert _ids(store.iter_projects(include_expired=True)) == [kept]
+    assert _ids(store.find_projects("kept")) == [kept]
+    assert store.find_projects("gone") == []
+    assert store.find_projects(gone) == []
+
+    store.rebuild_lookup_index()
+    assert store._lookup_is_current(store.load_shard_index())
+    assert _ids(store.find_projects("kept")) == [kept]
@@ -0,0 +1,66 @@
+import json
+
+
+def _export(path, records):
+    path.write_text(json.dumps({"version": "1.0", "projects": records}), encoding="utf-8")
+    return path
+
+
+def _ids(store):
+    return sorted(r["id"] for r in store.iter_projects())
+
+
+def test_import_empty_export_keeps_recreated_project(store, track, tmp_path):
+    path = tmp_path / "Projects" / "app"
+    path.mkdir(parents=True)
+    first = track("app", path)
+    second = track("app", path)
+
+    stats = store.merge_analytics([str(_export(tmp_path / "empty.json", []))])
+
+    assert stats == {"read": 2, "duplicates": 0, "written": 2, "added": 0}
+    assert _ids(store) == sorted([first, second])
+
+
+def test_import_keeps_other_machine_project_at_same_path(store, track, tmp_path):
+    local = track("app")
+    local_path = next(store.iter_projects())["project_path"]
+    remote = {"id": "remote-1", "timestamp": "2026-01-05T10:00:00",
+              "project_name": "app", "project_path": local_path}
+
+    stats = store.merge_analytics([str(_export(tmp_path / "other.json", [remote]))])
+
+    assert stats["added"] == 1
+    assert _ids(store) == sorted([local, "remote-1"])
+    imported = [r for r in store.iter_projects() if r["id"] == "remote-1"][0]
+    assert imported["imported_from"] == str(tmp_path / "other.json")
+
+
+def test_import_same_id_keeps_local_copy(store, track, tmp_path):
+    local = track("app")
+    remote = {"id": local, "timestamp": "2020-01-01T00:00:00", "project_name": "renamed"}
+
+    stats = store.merge_analytics([str(_export(tmp_path / "other.json", [remote]))])
+
+    assert stats["duplicates"] == 1 and stats["added"] == 0
+    records = list(store.iter_projects())
+    assert [r["project_name"] for r in records] == ["app"]
+    assert "imported_from" not in records[0]
+
+
+def test_merge_to_output_dedups_by_id(store, tmp_path):
+    a = _export(tmp_path / "a.json", [
+        {"id": "1", "timestamp": "2025-11-01T00:00:00", "project_path": "/p"},
+        {"id": "2", "timestamp": "2025-12-01T00:00:00", "project_path": "/p"},
+    ])
+    b = _export(tmp_path / "b.json", [
+        {"id": "2", "timestamp": "2025-12-01T00:00:00", "project_path": "/p"},
+        {"id": "3", "timestamp": "20251110T100000", "project_path": "/q"},
+    ])
+    output = tmp_path / "merged.json"
+
+    stats = store.merge_analytics([str(a), str(b)], str(output))
+
+    assert stats == {"read": 4, "duplicates": 1, "written": 3}
+    merged = json.loads(output.read_text(encoding="utf-8"))["projects"]
+    assert [r["id"] for r in merged] == ["1", "3", "2"]
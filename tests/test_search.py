@@ -0,0 +1,61 @@
+import os
+import time
+
+
+def _write_context(store, project_id, text, name="CONTEXT.md"):
+    path = store.find_projects(project_id)[0]["project_path"]
+    os.makedirs(os.path.join(path, ".agent"), exist_ok=True)
+    target = os.path.join(path, ".agent", name)
+    with open(target, "w", encoding="utf-8") as f:
+        f.write(text)
+    return target
+
+
+def _hits(store, query, **kwargs):
+    return sorted(hit["id"] for hit in store.search_projects(query, **kwargs))
+
+
+def test_search_ranks_sections_and_keeps_symbol_terms(store, track):
+    api = track("api")
+    engine = track("engine")
+    _write_context(store, api, "# api\n\n## Important Decisions\n- Use PostgreSQL and Redis\n")
+    _write_context(store, engine, "# engine\n\n## Tech Stack\n- C++ core, C# tools\n\n## Notes\n- postgresql later\n")
+
+    assert store.update_search_index() == 2
+
+    results = store.search_projects("postgresql")
+    assert [hit["id"] for hit in results] == [api, engine]
+    assert results[0]["section"] == "important decisions"
+    assert _hits(store, "c++") == [engine]
+    assert _hits(store, "c#") == [engine]
+    assert _hits(store, "postgresql redis") == [api]
+    assert store.search_projects("") == []
+
+
+def test_only_changed_files_are_reindexed(store, track):
+    api = track("api")
+    engine = track("engine")
+    _write_context(store, api, "# api\n\nredis\n")
+    path = _write_context(store, engine, "# engine\n\nkafka\n")
+    store.update_search_index()
+
+    assert store.update_search_index() == 0
+
+    _write_context(store, engine, "# engine\n\nrabbitmq instead\n")
+    later = time.time() + 5
+    os.utime(path, (later, later))
+    assert store.update_search_index() == 1
+    assert _hits(store, "kafka") == []
+    assert _hits(store, "rabbitmq") == [engine]
+    assert _hits(store, "redis") == [api]
+
+
+def test_gemini_files_only_when_asked(store, track):
+    api = track("api")
+    _write_context(store, api, "# api\n\nredis\n")
+    _write_context(store, api, "# Gemini\n\nelasticsearch\n", name="GEMINI.md")
+
+    store.update_search_index(include_gemini=True)
+
+    assert _hits(store, "elasticsearch") == []
+    assert _hits(store, "elasticsearch", include_gemini=True) == [api]
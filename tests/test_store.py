@@ -0,0 +1,106 @@
+import json
+from datetime import datetime
+
+import pytest
+
+
+def _record(n, timestamp):
+    return {"id": f"rec-{n}", "timestamp": timestamp, "project_name": f"project-{n}",
+            "project_path": f"/nowhere/project-{n}", "project_types": ["saas-platform"], "tech_stack": {}}
+
+
+RECORDS = [_record(1, "2024-01-05T10:00:00"), _record(2, "2024-01-20T10:00:00"),
+           _record(3, "2024-03-02T10:00:00"), _record(4, "2024-06-30T10:00:00")]
+
+
+@pytest.fixture
+def months(store):
+    assert store.save_analytics({"projects": [dict(r) for r in RECORDS]})
+    return store
+
+
+def test_save_and_iter_round_trip_by_month(months):
+    index = months.load_shard_index()
+
+    assert sorted(index["shards"]) == ["2024-01", "2024-03", "2024-06"]
+    january = index["shards"]["2024-01"]
+    assert (january["count"], january["min_ts"], january["max_ts"]) == (2, RECORDS[0]["timestamp"], RECORDS[1]["timestamp"])
+    assert list(months.iter_projects()) == RECORDS
+    assert months.load_analytics()["projects"] == RECORDS
+    assert months.verify_shards() == []
+
+
+def test_date_bounds_open_only_matching_shards(months, monkeypatch):
+    opened = []
+    load_shard = months.load_shard
+    monkeypatch.setattr(months, "load_shard", lambda key, index=None: opened.append(key) or load_shard(key, index))
+
+    found = list(months.iter_projects(since=datetime(2024, 3, 1), until=datetime(2024, 5, 31)))
+
+    assert [r["id"] for r in found] == ["rec-3"]
+    assert opened == ["2024-03"]
+
+
+def test_group_commit_appends_without_duplicates(store, track):
+    first = track("first")
+    record = dict(store.find_projects(first)[0], id="queued", project_name="queued")
+    store._queue_record(record)
+    store._queue_record(dict(record))  # Same id queued twice (redone commit)
+
+    store.commit_pending()
+
+    assert sorted(r["id"] for r in store.iter_projects()) == sorted([first, "queued"])
+    assert not list(store.get_pending_dir().glob("*.json"))
+    assert store.load_summary()["total"] == 2
+    assert store.verify_shards() == []
+
+
+@pytest.mark.parametrize("method, suffix", [("gzip", ".gz"), ("lzma", ".xz")])
+def test_compressed_shards_read_back(months, method, suffix):
+    assert months.compress_old_shards(older_than_months=3, method=method) == 3
+
+    files = [entry["file"] for entry in months.load_shard_index()["shards"].values()]
+    assert all(name.endswith(suffix) for name in files)
+    assert list(months.iter_projects()) == RECORDS
+    assert months.verify_shards() == []
+    assert months.compress_old_shards(method=method) == 0
+
+
+def test_verify_detects_tampered_shard(months):
+    path = months.get_shards_dir() / "2024-03.json"
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["projects"][0]["project_name"] = "edited"
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+    assert months.verify_shards() == ["2024-03"]
+
+
+def test_truncated_shard_is_salvaged_and_copy_kept(months):
+    path = months.get_shards_dir() / "2024-01.json"
+    text = path.read_text(encoding="utf-8")
+    damaged = text[:text.index('"rec-2"') + 12]
+    path.write_text(damaged, encoding="utf-8")
+
+    assert [r["id"] for r in months.load_shard("2024-01")] == ["rec-1"]
+
+    assert path.with_name(path.name + ".corrupted").read_text(encoding="utf-8") == damaged
+    assert months.load_shard_index()["shards"]["2024-01"]["count"] == 1
+    assert months.verify_shards() == []
+
+
+def test_export_round_trip(months, tmp_path):
+    path = months.export_analytics(tmp_path / "export.json")
+
+    assert json.loads(path.read_text(encoding="utf-8"))["projects"] == RECORDS
+
+
+def test_lock_is_reentrant(store):
+    with store.analytics_lock():
+        with store.analytics_lock():
+            assert store.save_analytics({"projects": [dict(RECORDS[0])]})
+    assert [r["id"] for r in store.iter_projects()] == ["rec-1"]
+
+
+def test_concurrent_writers_lose_nothing(store, capsys):
+    assert store.run_stress_test(writers=4, count=5) == 0
+    assert "20/20 stored" in capsys.readouterr().out
@@ -0,0 +1,27 @@
+def test_timing_summary_includes_closed_spans(store, monkeypatch):
+    store.enable_timings()
+    try:
+        with store.span("wizard"):
+            with store.span("copy"):
+                pass
+            with store.span("track_project"):
+                pass
+        summary = store.timing_summary()
+    finally:
+        monkeypatch.setitem(store._timings, "enabled", False)
+
+    assert list(summary) == ["wizard", "wizard/copy", "wizard/track_project"]
+    assert all(calls == 1 for _, calls in summary.values())
+
+
+def test_update_project_record_saves_timings(store, track):
+    first = track("first")
+    second = track("second")
+    timings = {"wizard": [12.5, 1], "wizard/track_project": [3.0, 1]}
+
+    assert store.update_project_record(first, {"timings": timings})
+
+    records = {r["id"]: r for r in store.iter_projects()}
+    assert records[first]["timings"] == timings
+    assert "timings" not in records[second]
+    assert store.find_projects(first)[0]["timings"] == timings
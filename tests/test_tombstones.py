@@ -0,0 +1,89 @@
+import shutil
+from datetime import datetime, timedelta
+
+
+def _shard_checksums(store):
+    return {key: entry["checksum"] for key, entry in store.load_shard_index()["shards"].items()}
+
+
+def _remove_project(store, project_id):
+    record = store.find_projects(project_id)[0]
+    shutil.rmtree(record["project_path"])
+
+
+def test_read_paths_never_write(store, track):
+    track("kept")
+    gone = track("gone")
+    _remove_project(store, gone)
+    before = _shard_checksums(store)
+
+    first = store.get_stats_summary()
+    second = store.get_stats_summary()
+
+    assert first["total"] == second["total"] == 2
+    assert [p["status"] for p in first["projects"] if p["id"] == gone] == ["deleted"]
+    assert _shard_checksums(store) == before
+    assert not any(r.get("deleted_at") for r in store.iter_projects())
+
+
+def test_compact_records_tombstone_and_counts_stay_the_same(store, track):
+    track("kept")
+    gone = track("gone")
+    _remove_project(store, gone)
+
+    assert store.compact_analytics() == (2, 2)
+
+    record = store.find_projects(gone)[0]
+    assert record["deleted_at"]
+    assert store.load_summary()["total"] == 2
+    assert store.get_stats_summary(("total",))["total"] == 2
+    assert store.aggregate_stats(store.iter_projects(), ("total",))["total"] == 2
+
+
+def test_expired_tombstone_is_hidden_then_dropped(store, track, monkeypatch):
+    kept = track("kept")
+    gone = track("gone")
+    _remove_project(store, gone)
+    store.compact_analytics()
+    assert store.load_summary()["total"] == 2
+
+    later = datetime.now() + timedelta(days=store.TOMBSTONE_GRACE_DAYS + 1)
+    monkeypatch.setattr(store, "_tombstone_cutoff",
+                        lambda now=None: (later - timedelta(days=store.TOMBSTONE_GRACE_DAYS)).isoformat())
+
+    assert [r["id"] for r in store.iter_projects()] == [kept]
+    assert store.load_summary()["total"] == 1
+    assert store.compact_analytics() == (2, 1)
+    assert [r["id"] for r in store.iter_projects(include_expired=True)] == [kept]
+
+
+def test_compact_clears_tombstone_when_directory_returns(store, track):
+    gone = track("gone")
+    path = store.find_projects(gone)[0]["project_path"]
+    shutil.rmtree(path)
+    store.compact_analytics()
+    assert store.find_projects(gone)[0].get("deleted_at")
+
+    (store.Path(path) / ".agent").mkdir(parents=True)
+    store.compact_analytics()
+
+    assert "deleted_at" not in store.find_projects(gone)[0]
+
+
+def test_missing_mount_and_imported_records_are_not_tombstoned(store, tmp_path):
+    records = [
+        {"id": "a", "project_path": str(tmp_path / "no-such-drive" / "app")},
+        {"id": "b", "project_path": str(tmp_path / "gone"), "imported_from": "other.json"},
+        {"id": "c", "project_path": str(tmp_path / "gone")},
+    ]
+    assert [store.mark_project_presence(r) for r in records] == [False, False, True]
+    assert records[2]["deleted_at"]
+
+
+def test_purge_drops_projects_marked_in_the_same_run(store, track):
+    kept = track("kept")
+    gone = track("gone")
+    _remove_project(store, gone)
+
+    assert store.compact_analytics(purge=True) == (2, 1)
+    assert [r["id"] for r in store.iter_projects(include_expired=True)] == [kept]